@@ -0,0 +1,64 @@
+import argparse
+import sys
+from Data.Benchmark import *
+from Data.CommandLine import *
+
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description="Times every phase of the simulation on fields of several sizes.")
+    addSettingsArguments(parser)
+    parser.add_argument("--fields", default=",".join(str(area) for area in DEFAULT_AREAS),
+                        help="comma separated field areas, each optionally followed by :population, e.g. "
+                             "2500,10000:20000000. Without a population the density of the default settings is used")
+    parser.add_argument("--engines", default="0,1", help="comma separated SIMULATION_ENGINE values to benchmark")
+    parser.add_argument("--days", type=int, default=30, help="amount of days every case simulates")
+    parser.add_argument("--seed", type=int, default=1, help="seed of every case")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="times every case is run, the fastest time of every phase is kept")
+    parser.add_argument("--scenario", default=None,
+                        help="scenario file used by every case, one random cell in 1000 is infected if not given")
+    parser.add_argument("--output", default="benchmark.json", help="file the results are written to")
+    parser.add_argument("--compare", default=None,
+                        help="earlier results to compare with, the exit code is 1 if any phase got slower")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="a phase got slower when it takes more than this many times as long as before")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds after which a case is stopped")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    arguments = parseArguments(argv)
+    try:
+        config = loadSettings(arguments.settings, parseOverrides(arguments.set))
+        fields = parseLadder(arguments.fields)
+        engines = [int(engine) for engine in arguments.engines.split(",")]
+        scenario = Scenario.fromFile(arguments.scenario) if arguments.scenario is not None else None
+        baseline = loadBenchmarks(arguments.compare) if arguments.compare is not None else None
+    except (OSError, ValueError, TypeError) as error:
+        print("Could not load the benchmark: %s" % error, file=sys.stderr)
+        return EXIT_BAD_INPUT
+
+    logger = Logger(SUMMARY)
+    try:
+        results = runBenchmarks(config, fields, engines, arguments.days, arguments.output, arguments.seed, scenario,
+                                arguments.repeats, arguments.timeout, logger)
+    except ValueError as error:
+        print("Could not run the benchmark: %s" % error, file=sys.stderr)
+        return EXIT_BAD_INPUT
+    logger.log(SUMMARY, "Results written to %s.", arguments.output)
+    if baseline is None:
+        return EXIT_OK
+
+    regressions = 0
+    for comparison in compareBenchmarks(baseline, results, arguments.threshold):
+        if comparison["regression"]:
+            regressions += 1
+        logger.log(SUMMARY, "%s engine %s, %s cells: %s %.4f -> %.4f seconds (x%.3f)",
+                   "SLOWER" if comparison["regression"] else "      ", comparison["engine"], comparison["area"],
+                   comparison["phase"], comparison["before"], comparison["after"], comparison["ratio"])
+    logger.log(SUMMARY, "%s phases got slower than %s.", regressions, arguments.compare)
+    return EXIT_REGRESSION if regressions else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
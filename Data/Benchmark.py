@@ -0,0 +1,240 @@
+import json
+import platform
+import sys
+import tempfile
+import time
+from Data.Sweep import *
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where peak memory is not recorded
+    resource = None
+
+# Field areas benchmarked when no others are given, each with the population density of the default settings
+DEFAULT_AREAS = [2500, 10000, 40000, 160000]
+DEFAULT_DENSITY = (SimulationConfig.uPop + SimulationConfig.surrPop) / (SimulationConfig.uArea
+                                                                        + SimulationConfig.surrArea)
+
+# Keys of a benchmark case that have to match for two results to be compared
+CASE_KEYS = ["engine", "compiledKernels", "area", "population", "days"]
+
+
+def peakMemory():
+    """
+    :return: float = most memory this process has used so far in MB, None where it cannot be found out.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+
+def parseLadder(ladder):
+    """
+    :param ladder: str = comma separated field areas, each optionally followed by a colon and a population, e.g.
+    2500,10000:20000000. Fields without a population get the population density of the default settings.
+    :return: list(tuple(int, int)) = area and population of every field.
+    """
+    fields = []
+    for entry in ladder.split(","):
+        area, separator, population = entry.strip().partition(":")
+        area = int(area)
+        fields.append((area, int(population) if separator else int(round(area * DEFAULT_DENSITY))))
+    return fields
+
+
+def makeBenchmarkScenario(area):
+    """
+    :param area: int = area of the field.
+    :return: Scenario = one random cell per 1000 cells of the field infected, at least one.
+    """
+    return Scenario(randomCells=[(max(1, area // 1000), 0.05)])
+
+
+def makeBenchmarkJobs(baseConfig, fields, engines, days, seed, scenario=None):
+    """
+    Creates one job for every field and engine. The urban area is the same part of every field as in baseConfig,
+    and the urban and surrounding population are split in the same ratio. Every case is profiled, with its memory
+    traced too if PROFILE is 2 in baseConfig.
+    :param baseConfig: SimulationConfig = settings shared by every case.
+    :param fields: list(tuple(int, int)) = area and population of every field, see parseLadder.
+    :param engines: list(int) = SIMULATION_ENGINE values to benchmark.
+    :param days: int = amount of days to simulate.
+    :param seed: int = seed of every case, so every run of the benchmark simulates the same days.
+    :param scenario: Scenario = initially infected cells of every case, made by makeBenchmarkScenario if None.
+    :return: list(dict) = the jobs.
+    """
+    urbanShare = baseConfig.uArea / (baseConfig.uArea + baseConfig.surrArea)
+    urbanPopShare = baseConfig.uPop / max(baseConfig.uPop + baseConfig.surrPop, 1)
+    jobs = []
+    for area, population in fields:
+        uArea = max(1, int(round(area * urbanShare)))
+        uPop = int(round(population * urbanPopShare))
+        for engine in engines:
+            config = baseConfig.withSettings(SIMULATION_ENGINE=engine, URBAN_AREA=uArea,
+                                             SURROUNDING_AREA=area - uArea, URBAN_POPULATION=uPop,
+                                             SURROUNDING_POPULATION=population - uPop, SIMULATION_RUN_TIME=days,
+                                             CREATE_DATA_FILE=1, DRAW_SIMULATION=0, RUN_SLOWLY=0, VERBOSITY=0,
+                                             RECORD_SNAPSHOTS=0, CHECKPOINT_DAYS=0, EXPORT_FRAMES=0,
+                                             PROFILE=max(baseConfig.profile, PROFILE_TIME))
+            config.validate()
+            jobs.append({"run": len(jobs), "config": config, "area": area, "population": population,
+                         "scenario": scenario or makeBenchmarkScenario(area), "seed": seed})
+    return jobs
+
+
+def runBenchmarkCase(job):
+    """
+    Simulates one case with every phase profiled. The field is rendered every day, as it would be drawn, but
+    without a window.
+    :param job: dict = job made by makeBenchmarkJobs.
+    :return: dict = the case, the time taken by every phase and the memory used.
+    """
+    config = job["config"]
+    startMemory = peakMemory()
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as dataDir:
+        simulation = createSimulation(config, scenario=job["scenario"], seed=job["seed"],
+                                      dataFile=os.path.join(dataDir, "data.csv"), metricsFile=None)
+        simulation.openStats()
+        try:
+            for t in range(config.runTime):
+                simulation.renderRaster()
+                simulation.stepTime(t)
+        finally:
+            simulation.closeStats()
+            if hasattr(simulation, "closeTiles"):
+                simulation.closeTiles()
+    seconds = time.perf_counter() - start
+    profile = simulation.profiler.summary()
+    simulation.profiler.close()
+
+    return {"engine": config.engine, "compiledKernels": config.compiledKernels, "area": job["area"],
+            "population": job["population"], "days": config.runTime, "seed": job["seed"],
+            "simSizeX": simulation.simSizeX, "simSizeY": simulation.simSizeY, "seconds": round(seconds, 6),
+            "startMemoryMB": startMemory, "peakMemoryMB": peakMemory(),
+            "finalStats": [float(value) for value in simulation.getStats(config.runTime - 1)],
+            "phases": profile["phases"]}
+
+
+def mergeRepeats(results):
+    """
+    Combines the repeats of a case into one result. Other processes only ever slow a repeat down, so the fastest
+    time of every phase is kept, and the largest peak memory.
+    :param results: list(dict) = results of the finished repeats, as returned by runBenchmarkCase.
+    :return: dict = the combined result.
+    """
+    merged = dict(results[0])
+    merged["repeats"] = len(results)
+    merged["seconds"] = min(result["seconds"] for result in results)
+    if merged["peakMemoryMB"] is not None:
+        merged["peakMemoryMB"] = max(result["peakMemoryMB"] for result in results)
+    merged["phases"] = {}
+    for name, phase in results[0]["phases"].items():
+        merged["phases"][name] = dict(phase, seconds=min(result["phases"][name]["seconds"] for result in results))
+        if "memoryKB" in phase:
+            merged["phases"][name]["memoryKB"] = max(result["phases"][name]["memoryKB"] for result in results)
+    return merged
+
+
+def getEnvironment():
+    """
+    :return: dict = versions and machine the benchmark ran with.
+    """
+    try:
+        import numba
+        numbaVersion = numba.__version__
+    except ImportError:
+        numbaVersion = None
+    return {"python": platform.python_version(), "numpy": np.__version__, "numba": numbaVersion,
+            "platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+
+def runBenchmarks(baseConfig, fields, engines, days, outputPath, seed=1, scenario=None, repeats=3, timeout=None,
+                  logger=None):
+    """
+    Benchmarks every engine on every field, one case at a time and each in a process of its own, so the cases do
+    not slow each other down and the peak memory is that of the case alone. The results are written to outputPath
+    as JSON.
+    :param baseConfig: SimulationConfig = settings shared by every case.
+    :param fields: list(tuple(int, int)) = area and population of every field, see parseLadder.
+    :param engines: list(int) = SIMULATION_ENGINE values to benchmark.
+    :param days: int = amount of days to simulate.
+    :param outputPath: str = file the results are written to.
+    :param seed: int = seed of every case.
+    :param scenario: Scenario = initially infected cells of every case, see makeBenchmarkJobs.
+    :param repeats: int = amount of times every case is run, see mergeRepeats.
+    :param timeout: float = seconds after which a case is stopped, no limit if None.
+    :param logger: Logger = logger for progress messages.
+    :return: dict = the results, as written to outputPath.
+    """
+    logger = logger or Logger(SILENT)
+    jobs = makeBenchmarkJobs(baseConfig, fields, engines, days, seed, scenario)
+    # Compiled before the cases are started, so compiling the kernels is not timed
+    for job in jobs:
+        loadKernels(job["config"])
+    repeatedJobs = [dict(job, run=run) for run, job in enumerate(job for job in jobs for repeat in range(repeats))]
+    repeatResults = runJobs(repeatedJobs, runBenchmarkCase, 1, timeout, logger)
+
+    cases = []
+    for i, job in enumerate(jobs):
+        jobResults = repeatResults[i * repeats:(i + 1) * repeats]
+        finished = [{key: value for key, value in result.items() if key not in ("Run", "Status", "Seconds", "Error")}
+                    for result in jobResults if result["Status"] == "finished"]
+        if not finished:
+            result = {"engine": job["config"].engine, "compiledKernels": job["config"].compiledKernels,
+                      "area": job["area"], "population": job["population"], "days": days, "seed": seed,
+                      "error": "%s: %s" % (jobResults[0]["Status"], jobResults[0]["Error"])}
+        else:
+            result = mergeRepeats(finished)
+            logger.log(SUMMARY, "Engine %s, %s cells, %s people: %.3f seconds, %.3f seconds a day, peak memory %s MB",
+                       result["engine"], result["area"], result["population"], result["seconds"],
+                       result["phases"].get("stepTime", {}).get("seconds", 0) / max(days, 1),
+                       result["peakMemoryMB"])
+        cases.append(result)
+
+    results = {"environment": getEnvironment(), "settings": baseConfig.toDict(), "cases": cases}
+    with open(outputPath, "w") as outputFile:
+        json.dump(results, outputFile, indent=2)
+    return results
+
+
+def loadBenchmarks(path):
+    with open(path, "r") as benchmarkFile:
+        return json.load(benchmarkFile)
+
+
+def compareBenchmarks(baseline, results, threshold=1.25, minSeconds=0.01):
+    """
+    Compares the time taken by every method in two benchmark results of the same cases.
+    :param baseline: dict = earlier results, as returned by runBenchmarks or loadBenchmarks.
+    :param results: dict = later results.
+    :param threshold: float = a method is slower when it takes more than this many times as long as in baseline.
+    :param minSeconds: float = methods that took less than this in both results are not compared, as their time is
+    mostly noise.
+    :return: list(dict) = case, method, seconds in both results, their ratio and whether it is a regression, for
+    every method of every case found in both results.
+    """
+    def caseKey(case):
+        return tuple(case.get(key) for key in CASE_KEYS)
+
+    baselineCases = {caseKey(case): case for case in baseline["cases"] if "phases" in case}
+    comparisons = []
+    for case in results["cases"]:
+        baselineCase = baselineCases.get(caseKey(case))
+        if baselineCase is None or "phases" not in case:
+            continue
+        timings = {"total": (baselineCase["seconds"], case["seconds"])}
+        for name, phase in case["phases"].items():
+            if name in baselineCase["phases"]:
+                timings[name] = (baselineCase["phases"][name]["seconds"], phase["seconds"])
+        for name, (before, after) in timings.items():
+            if max(before, after) < minSeconds:
+                continue
+            ratio = after / before if before > 0 else float("inf")
+            comparisons.append({**{key: case[key] for key in CASE_KEYS}, "phase": name, "before": before,
+                                "after": after, "ratio": round(ratio, 3), "regression": ratio > threshold})
+    return comparisons
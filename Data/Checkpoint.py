@@ -0,0 +1,64 @@
+import json
+import os
+import numpy as np
+
+# Cell attributes saved in a checkpoint and the type they are stored as
+CHECKPOINT_FIELDS = {
+    "population": np.int64,
+    "infectedPop": np.int64,
+    "infFraction": np.float64,
+    "age": np.int64,
+    "isInfected": bool,
+    "isUrban": bool,
+    "amountOfMasksType1": np.int64,
+    "amountOfMasksType2": np.int64,
+    "amountOfMasksType3": np.int64,
+}
+
+# Name the infection cohorts (InfectionCohorts.counts) are stored under, next to the cell grids
+CHECKPOINT_COHORTS = "cohorts"
+
+# Simulation attributes that add up over the days and are saved in a checkpoint
+CHECKPOINT_COUNTERS = ["population", "totCases", "percentageInfected", "newInfected", "totInfected", "totDead",
+                       "newDead", "totRecovered", "newRecovered"]
+
+
+def saveCheckpoint(path, day, grids, counters, metadata, cohorts=None):
+    """
+    Writes everything needed to carry on a run to a compressed NumPy .npz file. Only plain arrays are stored, nothing
+    is pickled. The file is written next to path first and then moved over it, so an interrupted save never
+    destroys the previous checkpoint.
+    :param path: str = path of the checkpoint file.
+    :param day: int = first day that has not been simulated yet.
+    :param grids: dict = (simSizeY, simSizeX) array of every CHECKPOINT_FIELDS attribute.
+    :param counters: dict = value of every CHECKPOINT_COUNTERS attribute.
+    :param metadata: dict = settings, random generator state and anything else that can be stored as JSON.
+    :param cohorts: numpy.ndarray = infection cohorts of every cell, not saved if None.
+    :return: None
+    """
+    arrays = {"grid_" + name: np.asarray(grids[name], dtype=dtype) for name, dtype in CHECKPOINT_FIELDS.items()}
+    if cohorts is not None:
+        arrays[CHECKPOINT_COHORTS] = np.asarray(cohorts, dtype=np.int64)
+    header = dict(metadata)
+    header["day"] = day
+    header["counters"] = {name: np.asarray(value).item() for name, value in counters.items()}
+    arrays["header"] = np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8)
+
+    temporaryPath = path + ".tmp"
+    with open(temporaryPath, "wb") as checkpointFile:
+        np.savez_compressed(checkpointFile, **arrays)
+    os.replace(temporaryPath, path)
+
+
+def loadCheckpoint(path):
+    """
+    :param path: str = path of a checkpoint file written by saveCheckpoint.
+    :return: tuple(dict, dict) = the header, and the array of every CHECKPOINT_FIELDS attribute. The infection
+    cohorts are included under CHECKPOINT_COHORTS if they were saved.
+    """
+    with np.load(path, allow_pickle=False) as checkpoint:
+        header = json.loads(checkpoint["header"].tobytes().decode("utf-8"))
+        grids = {name: checkpoint["grid_" + name] for name in CHECKPOINT_FIELDS}
+        if CHECKPOINT_COHORTS in checkpoint.files:
+            grids[CHECKPOINT_COHORTS] = checkpoint[CHECKPOINT_COHORTS]
+    return header, grids
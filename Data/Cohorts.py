@@ -0,0 +1,83 @@
+import numpy as np
+
+
+class InfectionCohorts:
+    """
+    Ring buffer of the people infected in every cell on each of the last `window` days, so recovery and death can
+    depend on how long people have been infected. Slot day % window holds the people infected on that day. The
+    oldest slot also collects everyone infected before it, so the memory used only depends on the window length.
+    """
+    def __init__(self, window, simSizeX, simSizeY, counts=None):
+        """
+        :param window: int = amount of days tracked one by one.
+        :param simSizeX: int = side length of the simulation in x-direction.
+        :param simSizeY: int = side length of the simulation in y-direction.
+        :param counts: numpy.ndarray = (window, simSizeY, simSizeX) int64 array to use as it is, e.g. an array in
+        shared memory. A new array of zeros is made if None.
+        """
+        self.window = window
+        if counts is None:
+            counts = np.zeros((window, simSizeY, simSizeX), dtype=np.int64)
+        self.counts = counts
+        self.flatCounts = self.counts.reshape(window, -1)
+
+    @classmethod
+    def fromCounts(cls, counts):
+        """
+        :param counts: numpy.ndarray = (window, simSizeY, simSizeX) array, as stored in InfectionCohorts.counts.
+        :return: InfectionCohorts
+        """
+        window, simSizeY, simSizeX = np.shape(counts)
+        cohorts = cls(window, simSizeX, simSizeY)
+        np.copyto(cohorts.counts, counts)
+        return cohorts
+
+    def ages(self, day):
+        """
+        :param day: int = current day.
+        :return: numpy.ndarray = days since the people in every slot were infected. The oldest slot is window - 1 days
+        old, even though some of its people were infected earlier.
+        """
+        return (day - np.arange(self.window)) % self.window
+
+    def advance(self, day, cells):
+        """
+        Frees the slot of a new day by moving the people in it into the slot that becomes the oldest.
+        :param day: int = day that is starting.
+        :param cells: numpy.ndarray = flat indices of the cells to advance. Every other cell must be empty.
+        :return: None
+        """
+        slot = day % self.window
+        if self.window > 1:
+            self.flatCounts[(day + 1) % self.window, cells] += self.flatCounts[slot, cells]
+        self.flatCounts[slot, cells] = 0
+
+    def record(self, day, cells, newInfected):
+        """
+        :param day: int = day the people were infected on.
+        :param cells: numpy.ndarray = flat indices of cells.
+        :param newInfected: numpy.ndarray = people infected in each of the cells.
+        :return: None
+        """
+        self.flatCounts[day % self.window, cells] += newInfected
+
+    def slot(self, day):
+        """
+        :param day: int = day the people were infected on.
+        :return: numpy.ndarray = flat view of the slot of the day, which record adds to.
+        """
+        return self.flatCounts[day % self.window]
+
+    def remove(self, cells, fractions, rounding):
+        """
+        Takes a fraction of the people out of every cohort of some cells. Amounts are rounded down or up at random, so
+        on average exactly the fraction is taken out, even from small cohorts.
+        :param cells: numpy.ndarray = flat indices of cells.
+        :param fractions: numpy.ndarray = (window, len(cells)) fraction of every cohort to take out.
+        :param rounding: numpy.ndarray = random number in [0, 1) for each of the cells.
+        :return: numpy.ndarray = people taken out of each of the cells.
+        """
+        cohorts = self.flatCounts[:, cells]
+        removed = np.minimum(np.floor(cohorts * fractions + rounding).astype(np.int64), cohorts)
+        self.flatCounts[:, cells] = cohorts - removed
+        return removed.sum(axis=0)
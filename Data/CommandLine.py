@@ -0,0 +1,45 @@
+from Data.Settings import *
+
+# Exit codes of the command line scripts
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_REGRESSION = 1
+EXIT_BAD_INPUT = 2
+
+
+def addSettingsArguments(parser):
+    """
+    Adds the --settings and --set arguments read by loadSettings.
+    :param parser: argparse.ArgumentParser = parser of the script.
+    :return: None
+    """
+    parser.add_argument("--settings", default="SimulationSettings.csv", help="settings file to use")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="overrides a setting from the settings file, can be given more than once")
+
+
+def parseOverrides(assignments):
+    """
+    :param assignments: list(str) = NAME=VALUE strings, as given to --set.
+    :return: dict = value of every setting, keyed by setting name.
+    """
+    overrides = {}
+    for assignment in assignments:
+        name, separator, value = assignment.partition("=")
+        if not separator:
+            raise ValueError("Setting override %s is not of the form NAME=VALUE" % assignment)
+        overrides[name.strip()] = value.strip()
+    return overrides
+
+
+def loadSettings(path, overrides):
+    """
+    Reads a settings file and applies the overrides, refusing any setting that does not exist.
+    :param path: str = path of the settings file.
+    :param overrides: dict = value of every changed setting, keyed by setting name.
+    :return: SimulationConfig
+    """
+    config = SimulationConfig.fromFile(path)
+    for name in overrides:
+        config.getSetting(name)
+    return config.withSettings(**overrides)
@@ -0,0 +1,139 @@
+import numba
+import numpy as np
+
+# The kernels do the same arithmetic in the same order as the NumPy code in GridSimulation, and take the random
+# numbers it draws as arguments, so both give the same results for a seed.
+
+
+def compiled(signature):
+    """
+    Compiles a kernel for its signature as soon as this module is imported. The machine code is cached next to the
+    module, so later processes load it instead of compiling the kernel again.
+    :param signature: str = Numba signature of the kernel.
+    :return: function = decorator compiling the kernel.
+    """
+    return numba.njit(signature, cache=True, nogil=True)
+
+
+@compiled("int64[:](int64[:], int64[:], float64[:], int64[:], int64[:], int64[:], float64[:], float64, float64[:])")
+def newInfections(cells, population, infFraction, masks1, masks2, masks3, growthFactor, multiplier, maskFactors):
+    """
+    Works out how many people each cell infects, before they are split over its neighbourhood.
+    :param cells: numpy.ndarray = flat indices of the cells.
+    :param population: numpy.ndarray = flat population of the field.
+    :param infFraction: numpy.ndarray = flat infection fraction of the field.
+    :param masks1: numpy.ndarray = flat amount of masks of type 1, and likewise masks2 and masks3.
+    :param growthFactor: numpy.ndarray = random growth factor of each of the cells.
+    :param multiplier: float = quarantine multiplier, 1 before quarantine.
+    :param maskFactors: numpy.ndarray = how much each mask type reduces the spread.
+    :return: numpy.ndarray = people infected by each of the cells.
+    """
+    newPplInfected = np.zeros(len(cells), dtype=np.int64)
+    for i in range(len(cells)):
+        cell = cells[i]
+        pop = population[cell]
+        infected = np.trunc(((pop * infFraction[cell]) * multiplier) * growthFactor[i])
+        # Only the first mask type present in a cell has an effect
+        if masks1[cell] != 0:
+            amount, maskFactor = masks1[cell], maskFactors[0]
+        elif masks2[cell] != 0:
+            amount, maskFactor = masks2[cell], maskFactors[1]
+        elif masks3[cell] != 0:
+            amount, maskFactor = masks3[cell], maskFactors[2]
+        else:
+            amount, maskFactor = 0, 0.0
+        if amount != 0:
+            maskFraction = amount / pop if pop != 0 else 0.0
+            infected = np.trunc(infected - infected * maskFraction * maskFactor)
+        if infected > 0:
+            newPplInfected[i] = np.int64(infected)
+    return newPplInfected
+
+
+@compiled("int64[:](int64[:, :], int64[:], int64[:, :], int64[:])")
+def spreadAmongCells(peoplePerNeighbour, cells, targets, positions):
+    """
+    Adds up the people spread to each of the cells, dropping anything spread outside them.
+    :param peoplePerNeighbour: numpy.ndarray = (len(cells), len(NEIGHBOURS)) people each cell spreads in every
+    direction.
+    :param cells: numpy.ndarray = flat indices of the cells.
+    :param targets: numpy.ndarray = (len(NEIGHBOURS), simSizeX * simSizeY) array returned by neighbourTargets.
+    :param positions: numpy.ndarray = -1 for every cell of the field, used as scratch space and left as it was.
+    :return: numpy.ndarray = people infected in each of the cells.
+    """
+    for i in range(len(cells)):
+        positions[cells[i]] = i
+    incoming = np.zeros(len(cells), dtype=np.int64)
+    for i in range(len(cells)):
+        for direction in range(targets.shape[0]):
+            target = targets[direction, cells[i]]
+            if target >= 0 and positions[target] >= 0:
+                incoming[positions[target]] += peoplePerNeighbour[i, direction]
+    for i in range(len(cells)):
+        positions[cells[i]] = -1
+    return incoming
+
+
+@compiled("int64(int64[:], int64[:], int64[:], int64[:], float64[:], int64[:])")
+def infectCells(cells, incoming, population, infectedPop, infFraction, cohort):
+    """
+    Adds incoming infections to cells, capped at their population, and records them in today's cohort.
+    :param cells: numpy.ndarray = flat indices of the cells.
+    :param incoming: numpy.ndarray = people infected in each of the cells.
+    :param population: numpy.ndarray = flat population of the field, and likewise infectedPop and infFraction.
+    :param cohort: numpy.ndarray = flat slot of today in InfectionCohorts.flatCounts.
+    :return: int = amount of people actually infected.
+    """
+    newInfected = 0
+    for i in range(len(cells)):
+        cell = cells[i]
+        pop = population[cell]
+        infected = min(infectedPop[cell] + incoming[i], pop)
+        added = infected - infectedPop[cell]
+        infectedPop[cell] = infected
+        cohort[cell] += added
+        newInfected += added
+        if incoming[i] > 0:
+            infFraction[cell] = np.round(infected / pop, 4) if pop != 0 else 0.0
+    return newInfected
+
+
+@compiled("UniTuple(int64, 2)(int64[:], int64[:, :], float64[:], float64[:], float64[:], float64, float64, int64[:], "
+          "int64[:], float64[:])")
+def reduceCells(cells, counts, reached, reductionFactors, rounding, deathRate, recRate, infectedPop, population,
+                infFraction):
+    """
+    Does the same as Simulation.calcReductions followed by GridSimulation.killDisease. Empty cohorts are skipped, as
+    nothing can be taken out of them.
+    :param cells: numpy.ndarray = flat indices of the cells.
+    :param counts: numpy.ndarray = InfectionCohorts.flatCounts.
+    :param reached: numpy.ndarray = weight of every cohort, 0 for the people infected today.
+    :param reductionFactors: numpy.ndarray = random fraction of up to REDUCTION_RATE for each of the cells.
+    :param rounding: numpy.ndarray = random number in [0, 1) for each of the cells.
+    :param deathRate: float = DEATH_RATE setting.
+    :param recRate: float = RECOVERY_RATE setting.
+    :param infectedPop: numpy.ndarray = flat infected population of the field, and likewise population and infFraction.
+    :return: tuple(int, int) = people that died and recovered.
+    """
+    newDead = 0
+    newRecovered = 0
+    for i in range(len(cells)):
+        cell = cells[i]
+        reduction = 0
+        for slot in range(counts.shape[0]):
+            cohort = counts[slot, cell]
+            if cohort == 0:
+                continue
+            removed = min(np.int64(np.floor(cohort * (reached[slot] * reductionFactors[i]) + rounding[i])), cohort)
+            counts[slot, cell] = cohort - removed
+            reduction += removed
+        if reduction == 0:
+            continue
+        deaths = np.int64(np.trunc(reduction * deathRate))
+        newDead += deaths
+        newRecovered += np.int64(np.trunc(reduction * recRate))
+        infectedPop[cell] -= reduction
+        pop = max(population[cell] - deaths, 0)
+        population[cell] = pop
+        infFraction[cell] = np.round(infectedPop[cell] / pop, 4) if pop != 0 else 0.0
+    return newDead, newRecovered
@@ -0,0 +1,296 @@
+import csv
+import os
+from statistics import NormalDist
+from Data.Sweep import *
+
+# z value of a 95% confidence interval
+CONFIDENCE_Z = 1.96
+
+# Chance that compareKernels finds a difference between kernels that give equivalent results
+KERNEL_CHECK_SIGNIFICANCE = 0.01
+
+
+class RunningMoments:
+    """
+    Mean and variance of a stream of equally shaped arrays, updated one array at a time with Welford's algorithm.
+    """
+    def __init__(self, shape):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+
+    def update(self, values):
+        self.count += 1
+        delta = values - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (values - self.mean)
+
+    def std(self):
+        if self.count < 2:
+            return np.zeros_like(self.mean)
+        return np.sqrt(self.m2 / (self.count - 1))
+
+
+class StreamingQuantile:
+    """
+    Estimates one quantile of a stream of equally shaped arrays, element by element, with the P-squared algorithm.
+    Only five markers are kept per element, however many arrays are added.
+    """
+    def __init__(self, probability):
+        self.probability = probability
+        self.initial = []
+        self.heights = None
+        self.positions = None
+        self.desired = None
+        p = probability
+        self.increments = np.array([0, p / 2, p, (1 + p) / 2, 1])
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if self.heights is None:
+            self.initial.append(values)
+            if len(self.initial) == 5:
+                p = self.probability
+                self.heights = np.sort(np.array(self.initial), axis=0)
+                shape = (5,) + (1,) * values.ndim
+                self.positions = np.broadcast_to(np.arange(1, 6, dtype=np.float64).reshape(shape),
+                                                 self.heights.shape).copy()
+                self.desired = np.broadcast_to(np.array([1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]).reshape(shape),
+                                               self.heights.shape).copy()
+                self.increments = self.increments.reshape(shape)
+                self.initial = []
+            return
+
+        q = self.heights
+        n = self.positions
+        q[0] = np.minimum(q[0], values)
+        q[4] = np.maximum(q[4], values)
+        cell = (q[1:4] <= values).sum(axis=0)
+        markers = np.arange(5).reshape((5,) + (1,) * values.ndim)
+        n += markers > cell
+        self.desired += self.increments
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for i in (1, 2, 3):
+                d = self.desired[i] - n[i]
+                move = ((d >= 1) & (n[i + 1] - n[i] > 1)) | ((d <= -1) & (n[i - 1] - n[i] < -1))
+                d = np.sign(d)
+                parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                neighbourHeight = np.where(d > 0, q[i + 1], q[i - 1])
+                neighbourPosition = np.where(d > 0, n[i + 1], n[i - 1])
+                linear = q[i] + d * (neighbourHeight - q[i]) / (neighbourPosition - n[i])
+                useParabolic = (q[i - 1] < parabolic) & (parabolic < q[i + 1])
+                q[i] = np.where(move, np.where(useParabolic, parabolic, linear), q[i])
+                n[i] = np.where(move, n[i] + d, n[i])
+
+    def value(self):
+        if self.heights is None:
+            return np.quantile(np.array(self.initial), self.probability, axis=0)
+        return self.heights[2].copy()
+
+
+class EnsembleStats:
+    """
+    Per-day mean, standard deviation, confidence interval and quantiles of every data file column over the
+    replicates of an ensemble. Trajectories are added one at a time and not kept.
+    """
+    def __init__(self, days, quantiles):
+        self.columns = DATA_HEADER[1:]
+        self.days = days
+        self.moments = RunningMoments((days, len(self.columns)))
+        self.quantiles = [StreamingQuantile(p) for p in quantiles]
+
+    @property
+    def count(self):
+        return self.moments.count
+
+    def update(self, rows):
+        """
+        :param rows: list(list) = one replicate's data rows, as returned by Simulation.getStats.
+        :return: None
+        """
+        values = np.array([row[1:] for row in rows], dtype=np.float64)
+        self.moments.update(values)
+        for quantile in self.quantiles:
+            quantile.update(values)
+
+    def confidenceHalfWidth(self):
+        return CONFIDENCE_Z * self.moments.std() / np.sqrt(max(self.count, 1))
+
+    def relativeHalfWidth(self, columns):
+        """
+        :param columns: list(str) = data file columns to check.
+        :return: float = largest half width of the confidence interval of the mean, relative to the mean, over every
+        day of the given columns.
+        """
+        indices = [self.columns.index(column) for column in columns]
+        halfWidth = self.confidenceHalfWidth()[:, indices]
+        mean = np.abs(self.moments.mean[:, indices])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            relative = np.where(mean > 0, halfWidth / mean, np.where(halfWidth > 0, np.inf, 0))
+        return float(relative.max()) if relative.size else 0.0
+
+    def write(self, path):
+        header = ["Day"]
+        for column in self.columns:
+            header += ["%s Mean" % column, "%s Std" % column, "%s CI Low" % column, "%s CI High" % column]
+            header += ["%s Q%g" % (column, quantile.probability * 100) for quantile in self.quantiles]
+
+        mean = self.moments.mean
+        std = self.moments.std()
+        halfWidth = self.confidenceHalfWidth()
+        quantileValues = [quantile.value() for quantile in self.quantiles]
+        with open(path, "w", newline="") as ensembleFile:
+            csvWrite = csv.writer(ensembleFile)
+            csvWrite.writerow(header)
+            for day in range(self.days):
+                row = [day]
+                for i in range(len(self.columns)):
+                    row += [round(mean[day, i], 4), round(std[day, i], 4), round(mean[day, i] - halfWidth[day, i], 4),
+                            round(mean[day, i] + halfWidth[day, i], 4)]
+                    row += [round(values[day, i], 4) for values in quantileValues]
+                csvWrite.writerow(row)
+
+
+def makeReplicateJobs(baseConfig, scenario, replicates, seed=None):
+    seeds = [None] * replicates
+    if seed is not None:
+        seeds = spawnSeeds(seed, replicates)
+    config = baseConfig.withSettings(CREATE_DATA_FILE=0, DRAW_SIMULATION=0, RUN_SLOWLY=0, VERBOSITY=0, PROFILE=0)
+    return [{"run": run, "config": config, "scenario": scenario, "seed": seeds[run]} for run in range(replicates)]
+
+
+def runReplicate(job):
+    """
+    Runs one replicate and collects its daily stats without writing a data file.
+    :param job: dict = job made by makeReplicateJobs.
+    :return: dict = the daily stats under "rows".
+    """
+    simulation = createSimulation(job["config"], scenario=job["scenario"], seed=job["seed"])
+    rows = []
+    for t in range(simulation.runTime):
+        simulation.stepTime(t)
+        rows.append(simulation.getStats(t))
+    return {"rows": rows}
+
+
+def runEnsemble(baseConfig, scenario, outputDir, replicates, workers=None, timeout=None, seed=None,
+                quantiles=(0.05, 0.5, 0.95), tolerance=None, toleranceColumns=("Total Infection Cases",),
+                minReplicates=10, logger=None):
+    """
+    Runs replicates of the same simulation in parallel and writes per-day statistics of every data file column over
+    them to ensemble.csv in outputDir. Replicates are added to the statistics in order, so the result only depends on
+    the seed and not on how many workers there are.
+    :param baseConfig: SimulationConfig = settings of every replicate.
+    :param scenario: Scenario = initially infected cells of every replicate.
+    :param outputDir: str = directory the results are written to.
+    :param replicates: int = maximum amount of replicates.
+    :param workers: int = maximum amount of replicates at the same time, the amount of CPUs if None.
+    :param timeout: float = seconds after which a replicate is stopped, no limit if None.
+    :param seed: int = seed the seeds of the replicates are derived from, random if None.
+    :param quantiles: list(float) = quantiles to estimate.
+    :param tolerance: float = stop adding replicates once the confidence interval of the mean of every
+    toleranceColumns column is narrower than this fraction of the mean on every day. Never stop early if None.
+    :param toleranceColumns: list(str) = data file columns checked against the tolerance.
+    :param minReplicates: int = amount of replicates before the tolerance is checked.
+    :param logger: Logger = logger for progress messages.
+    :return: EnsembleStats
+    """
+    logger = logger or Logger(SILENT)
+    for column in toleranceColumns:
+        if column not in DATA_HEADER[1:]:
+            raise ValueError("Unknown data column %s" % column)
+    os.makedirs(outputDir, exist_ok=True)
+
+    stats = EnsembleStats(baseConfig.runTime, quantiles)
+    waiting = {}
+    progress = {"next": 0, "failed": 0}
+
+    def onResult(job, result):
+        waiting[job["run"]] = result.get("rows")
+        while progress["next"] in waiting:
+            rows = waiting.pop(progress["next"])
+            progress["next"] += 1
+            if rows is None:
+                progress["failed"] += 1
+                continue
+            stats.update(rows)
+            if tolerance is not None and stats.count >= minReplicates:
+                relative = stats.relativeHalfWidth(toleranceColumns)
+                logger.log(PHASE, "%s replicates, relative confidence interval %.4f", stats.count, relative)
+                if relative <= tolerance:
+                    logger.log(SUMMARY, "Tolerance reached after %s replicates.", stats.count)
+                    return True
+        return False
+
+    loadKernels(baseConfig)
+    jobs = makeReplicateJobs(baseConfig, scenario, replicates, seed)
+    runJobs(jobs, runReplicate, workers, timeout, logger, onResult)
+
+    if stats.count == 0:
+        # There is nothing to take statistics of, and the quantiles cannot be estimated
+        logger.log(SUMMARY, "Every one of the %s replicates failed, no ensemble written.", progress["failed"])
+        return stats
+    stats.write(os.path.join(outputDir, "ensemble.csv"))
+    logger.log(SUMMARY, "Ensemble of %s replicates written, %s replicates failed.", stats.count, progress["failed"])
+    return stats
+
+
+def compareKernels(baseConfig, scenario, replicates, workers=None, timeout=None, seed=None,
+                   significance=KERNEL_CHECK_SIGNIFICANCE, logger=None):
+    """
+    Runs the same replicates with the NumPy and the compiled kernels of the grid engines and checks that they give
+    statistically equivalent results. The per-day mean of every data file column must agree between the kernels
+    within a two-sided test at the significance, corrected for the amount of days and columns tested. With a seed,
+    the replicates of both kernels get the same seeds and should give the same rows.
+    :param baseConfig: SimulationConfig = settings of every replicate, run with the grid engine if it uses Cell
+    objects.
+    :param scenario: Scenario = initially infected cells of every replicate.
+    :param replicates: int = amount of replicates with each kernel.
+    :param workers: int = maximum amount of replicates at the same time, the amount of CPUs if None.
+    :param timeout: float = seconds after which a replicate is stopped, no limit if None.
+    :param seed: int = seed the seeds of the replicates are derived from, random if None.
+    :param significance: float = chance of finding a difference between equivalent kernels.
+    :param logger: Logger = logger for progress messages.
+    :return: dict = "equivalent" whether the kernels passed, "identical" the amount of replicates that gave the same
+    rows with both kernels, "largestZ" the largest difference between the means in standard errors, "criticalZ" the
+    largest difference allowed and "failed" the amount of replicates that failed.
+    """
+    logger = logger or Logger(SILENT)
+    engine = baseConfig.engine or 1
+    if loadKernels(baseConfig.withSettings(SIMULATION_ENGINE=engine, COMPILED_KERNELS=1)) is None:
+        raise ValueError("Numba is not installed, so there are no compiled kernels to check")
+
+    rows = []
+    stats = []
+    failed = 0
+    for compiledKernels in (0, 1):
+        logger.log(SUMMARY, "Running %s replicates with the %s kernels...", replicates,
+                   "compiled" if compiledKernels else "NumPy")
+        config = baseConfig.withSettings(SIMULATION_ENGINE=engine, COMPILED_KERNELS=compiledKernels)
+        jobs = makeReplicateJobs(config, scenario, replicates, seed)
+        results = runJobs(jobs, runReplicate, workers, timeout, logger)
+        kernelRows = {result["Run"]: result["rows"] for result in results if "rows" in result}
+        failed += replicates - len(kernelRows)
+        kernelStats = EnsembleStats(config.runTime, ())
+        for run in sorted(kernelRows):
+            kernelStats.update(kernelRows[run])
+        rows.append(kernelRows)
+        stats.append(kernelStats)
+
+    identical = sum(1 for run, runRows in rows[0].items() if rows[1].get(run) == runRows)
+    numpyStats, compiledStats = stats
+    difference = np.abs(numpyStats.moments.mean - compiledStats.moments.mean)
+    standardError = np.sqrt(numpyStats.moments.std() ** 2 / max(numpyStats.count, 1)
+                            + compiledStats.moments.std() ** 2 / max(compiledStats.count, 1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(standardError > 0, difference / standardError, np.where(difference > 0, np.inf, 0))
+    largestZ = float(z.max()) if z.size else 0.0
+    criticalZ = NormalDist().inv_cdf(1 - significance / (2 * max(z.size, 1)))
+    equivalent = failed == 0 and largestZ <= criticalZ
+    logger.log(SUMMARY, "%s of %s replicates identical, largest difference %.3g standard errors (at most %.3g "
+               "allowed), %s replicates failed.", identical, len(rows[0]), largestZ, criticalZ, failed)
+    return {"equivalent": equivalent, "identical": identical, "largestZ": largestZ, "criticalZ": criticalZ,
+            "failed": failed}
@@ -0,0 +1,134 @@
+import os
+import struct
+import zlib
+import numpy as np
+from Data.Rendering import *
+
+# Frame export formats (EXPORT_FRAMES setting)
+EXPORT_NONE = 0
+EXPORT_PNG = 1
+EXPORT_GIF = 2
+
+# A GIF has at most 256 colours, so index 0 is the urban outline and the reddest cells share index 1 with the next
+# shade. Every other index is the COLOUR_TABLE colour of the same index, so 255 is white like the other outlines.
+GIF_PALETTE = COLOUR_TABLE.copy()
+GIF_PALETTE[0] = URBAN_OUTLINE
+GIF_INDEX_TABLE = np.maximum(np.arange(256), 1).astype(np.uint8)
+GIF_URBAN_OUTLINE = np.uint8(0)
+GIF_SURROUNDING_OUTLINE = np.uint8(255)
+
+# Pixels sent between two LZW clear codes, few enough that the codes of a GIF never grow past 9 bits
+GIF_CLEAR_INTERVAL = 128
+
+
+def encodePng(frame, compression=1):
+    """
+    :param frame: numpy.ndarray = (height, width, 3) RGB image.
+    :param compression: int = zlib compression level, the frames compress well even at the fastest level.
+    :return: bytes = the image as a PNG file.
+    """
+    height, width = frame.shape[:2]
+    # Every row starts with filter type 0, the row is stored as it is
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = frame.reshape(height, width * 3)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows.tobytes(), compression))
+            + chunk(b"IEND", b""))
+
+
+def encodeGifImage(frame):
+    """
+    Encodes the pixels of one GIF frame. A clear code is sent every GIF_CLEAR_INTERVAL pixels, so every code is 9 bits
+    wide and the whole frame is packed with a few array operations instead of a dictionary search per pixel.
+    :param frame: numpy.ndarray = (height, width) GIF_PALETTE indices.
+    :return: bytes = the LZW minimum code size and the image data sub-blocks.
+    """
+    pixels = frame.ravel().astype(np.uint16)
+    codes = np.insert(pixels, np.arange(0, pixels.size, GIF_CLEAR_INTERVAL), 256)
+    codes = np.append(codes, 257)
+    bits = ((codes[:, None] >> np.arange(9, dtype=np.uint16)) & 1).astype(np.uint8)
+    data = np.packbits(bits.ravel(), bitorder="little").tobytes()
+    blocks = [bytes([len(data[i:i + 255])]) + data[i:i + 255] for i in range(0, len(data), 255)]
+    return b"\x08" + b"".join(blocks) + b"\x00"
+
+
+class PngExporter:
+    """
+    Writes every exported frame to its own numbered PNG file in a directory.
+    """
+    def __init__(self, path, isUrban, scale):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.renderer = FrameRenderer(isUrban, scale)
+
+    def write(self, t, indices):
+        with open(os.path.join(self.path, "day_%04d.png" % t), "wb") as frameFile:
+            frameFile.write(encodePng(self.renderer.render(indices)))
+
+    def close(self):
+        pass
+
+
+class GifExporter:
+    """
+    Writes the exported frames as one looping animated GIF. Frames are appended as they come, so only the last one
+    is kept in memory.
+    """
+    def __init__(self, path, isUrban, scale, frameDelay=10):
+        """
+        :param frameDelay: int = hundredths of a second every frame is shown for.
+        """
+        self.path = path
+        self.frameDelay = frameDelay
+        self.renderer = FrameRenderer(isUrban, scale, GIF_INDEX_TABLE, GIF_URBAN_OUTLINE, GIF_SURROUNDING_OUTLINE)
+        height, width = self.renderer.frame.shape[0] * scale, self.renderer.frame.shape[2] * scale
+        self.width = width
+        self.height = height
+        self.lastFrame = None
+        self.file = open(path, "wb")
+        self.file.write(b"GIF89a" + struct.pack("<HHBBB", width, height, 0xF7, 0, 0) + GIF_PALETTE.tobytes())
+        # Loop forever
+        self.file.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00")
+
+    def write(self, t, indices):
+        frame = self.renderer.render(indices)
+        # Only the rectangle that changed since the last frame is stored, the rest of the last frame stays shown
+        left, top, right, bottom = 0, 0, self.width, self.height
+        if self.lastFrame is not None:
+            changed = frame != self.lastFrame
+            rows = np.flatnonzero(changed.any(axis=1))
+            columns = np.flatnonzero(changed.any(axis=0))
+            if rows.size == 0:
+                rows = columns = np.zeros(1, dtype=np.int64)
+            top, bottom = rows[0], rows[-1] + 1
+            left, right = columns[0], columns[-1] + 1
+        self.lastFrame = frame.copy()
+
+        # Graphic control extension with disposal method 1, which leaves the frame in place for the next one
+        self.file.write(b"\x21\xf9\x04\x04" + struct.pack("<H", self.frameDelay) + b"\x00\x00")
+        self.file.write(b"\x2c" + struct.pack("<HHHHB", left, top, right - left, bottom - top, 0))
+        self.file.write(encodeGifImage(frame[top:bottom, left:right]))
+
+    def close(self):
+        if not self.file.closed:
+            self.file.write(b"\x3b")
+            self.file.close()
+
+
+FRAME_EXPORTERS = {EXPORT_PNG: PngExporter, EXPORT_GIF: GifExporter}
+DEFAULT_FRAME_PATHS = {EXPORT_PNG: "frames", EXPORT_GIF: "simulation.gif"}
+
+
+def makeFrameExporter(exportFormat, path, isUrban, scale):
+    """
+    :param exportFormat: int = EXPORT_PNG or EXPORT_GIF.
+    :param path: str = directory of the PNG files or path of the GIF, the DEFAULT_FRAME_PATHS entry if None.
+    :param isUrban: numpy.ndarray = whether every cell is urban.
+    :param scale: int = side length of a cell in pixels (COORD_SCALING setting).
+    :return: PngExporter or GifExporter
+    """
+    return FRAME_EXPORTERS[exportFormat](path or DEFAULT_FRAME_PATHS[exportFormat], isUrban, scale)
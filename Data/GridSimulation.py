@@ -0,0 +1,326 @@
+from Data.Simulation import *
+from Data.Kernels import *
+import numpy as np
+
+# Smallest field, in cells, for which COMPILED_KERNELS=2 loads the compiled kernels. Importing Numba and loading the
+# cached kernels takes most of a second, which smaller fields do not make up for unless they run for a long time
+COMPILED_KERNELS_MIN_CELLS = 100000
+
+
+class GridState:
+    """
+    Struct of arrays holding the whole playing field. Every attribute is a (simSizeY, simSizeX) array whose name
+    matches the Cell attribute it replaces.
+    """
+    def __init__(self, simSizeX, simSizeY, arrays=None):
+        """
+        :param simSizeX: int = side length of the simulation in x-direction.
+        :param simSizeY: int = side length of the simulation in y-direction.
+        :param arrays: dict = arrays to use as they are, keyed by attribute name, e.g. arrays in shared memory. New
+        arrays of zeros are made if None.
+        """
+        shape = (simSizeY, simSizeX)
+        self.population = np.zeros(shape, dtype=np.int64)
+        self.infectedPop = np.zeros(shape, dtype=np.int64)
+        self.infFraction = np.zeros(shape, dtype=np.float64)
+        self.age = np.zeros(shape, dtype=np.int64)
+        self.isInfected = np.zeros(shape, dtype=bool)
+        self.isUrban = np.zeros(shape, dtype=bool)
+        self.amountOfMasksType1 = np.zeros(shape, dtype=np.int64)
+        self.amountOfMasksType2 = np.zeros(shape, dtype=np.int64)
+        self.amountOfMasksType3 = np.zeros(shape, dtype=np.int64)
+        if arrays is not None:
+            for name in self.__dict__:
+                setattr(self, name, arrays[name])
+
+    def copyFrom(self, other, cells=None):
+        """
+        Overwrites this state with the contents of another state of the same size without allocating.
+        :param other: GridState = state to copy from.
+        :param cells: numpy.ndarray = flat indices of the cells to copy, every cell if None.
+        :return: None
+        """
+        for name, array in self.__dict__.items():
+            if cells is None:
+                np.copyto(array, getattr(other, name))
+            else:
+                array.reshape(-1)[cells] = getattr(other, name).reshape(-1)[cells]
+
+
+class GridSimulation(Simulation):
+    """
+    Runs the same model as Simulation, but stores the playing field as a GridState and performs every phase of a
+    day as whole-array operations instead of looping over Cell objects.
+    """
+    def __init__(self, simulationSettings, **kwargs):
+        if not isinstance(simulationSettings, SimulationConfig):
+            simulationSettings = SimulationConfig.fromList(simulationSettings)
+        self.state = None
+        self.backState = None
+        # -1 for every cell of the field, scratch space of the compiled spread kernel
+        self.positions = None
+        # Data.CompiledKernels, or None to step the days with NumPy. Loaded before the simulation is set up, so
+        # compiling them is not counted as part of the first day when it is profiled
+        self.kernels = loadKernels(simulationSettings, Logger(simulationSettings.verbosity))
+        super().__init__(simulationSettings, **kwargs)
+
+    def makeCellMatrix(self):
+        self.logger.log(PHASE, "Creating city grid...")
+        state = GridState(self.simSizeX, self.simSizeY)
+        np.copyto(state.isUrban, self.calcUrbanMask())
+        infFraction, isSeed = self.getSeedGrids()
+        np.copyto(state.infFraction, infFraction)
+        np.copyto(state.isInfected, isSeed)
+
+        self.state = state
+
+    def distributePopulation(self):
+        self.logger.log(PHASE, "Calculating population distribution...")
+        state = self.state
+
+        self.logger.log(PHASE, "Distributing urban population...")
+        self.population += self.distributeToCells(state.population, state.isUrban, self.uPop)
+        self.logger.log(PHASE, "Distributing surrounding population...")
+        self.population += self.distributeToCells(state.population, ~state.isUrban, self.surrPop)
+
+        self.logger.log(PHASE, "Calculating infected population...")
+        state.infectedPop[:] = state.population * state.infFraction
+        self.totInfected += int(state.infectedPop.sum())
+        self.totCases += int(state.infectedPop.sum())
+
+    def distributePreventionMethods(self):
+        state = self.state
+        config = self.simSettings
+        masks = [(config.mask1Amount, state.amountOfMasksType1),
+                 (config.mask2Amount, state.amountOfMasksType2),
+                 (config.mask3Amount, state.amountOfMasksType3)]
+
+        for type, (masksAvailable, amountOfMasks) in enumerate(masks, start=1):
+            self.logger.log(PHASE, "Distributing masks of type %s", type)
+            urbanMasks = int(0.6 * masksAvailable)
+            ruralMasks = int(masksAvailable - urbanMasks)
+
+            self.logger.log(PHASE, "Distributing masks to urban areas...")
+            self.distributeToCells(amountOfMasks, state.isUrban, urbanMasks)
+            self.logger.log(PHASE, "Distributing masks to surrounding areas...")
+            self.distributeToCells(amountOfMasks, ~state.isUrban, ruralMasks)
+
+    def distributeToCells(self, target, mask, amount):
+        """
+        Hands out an amount in groups of 10 to random cells, weighted by the population density setting.
+        :param target: numpy.ndarray = array to add the groups to.
+        :param mask: numpy.ndarray = boolean array of the cells allowed to receive groups.
+        :param amount: int = amount to hand out.
+        :return: int = amount actually handed out.
+        """
+        counts = allocateInGroups(amount, self.calcDensityWeights()[mask], self.rng)
+        target[mask] += counts
+        return int(counts.sum())
+
+    def makeBackBuffer(self):
+        self.backState = GridState(self.simSizeX, self.simSizeY)
+        self.backState.copyFrom(self.state)
+        self.findActiveCells()
+
+    def stepTime(self, t):
+        self.logger.log(PHASE, "Simulating day %s...", t)
+        front = self.state
+        back = self.backState
+        # Only the active cells can change, so every other cell is already the same in both states
+        cells = self.activeCells
+        self.steppedCells = len(cells)
+        back.copyFrom(front, cells)
+        self.cohorts.advance(t, cells)
+        self.newRecovered = 0
+        self.newInfected = 0
+        self.newDead = 0
+
+        self.spreadDisease(front, back, cells, t)
+        self.killDisease(back, cells, t)
+        self.updateCellData(back, cells)
+
+        self.state = back
+        self.backState = front
+
+        self.calcStats()
+
+        self.recordDay(t)
+        self.printStats(t)
+
+    def spreadDisease(self, front, back, cells, t):
+        self.logger.log(PHASE, "Spreading disease...")
+        self.infectCells(back, cells, self.calcIncoming(front, cells, t), t)
+
+    def calcIncoming(self, front, cells, t):
+        """
+        Works out how many people each cell infects and splits them over their neighbourhoods.
+        :param front: GridState = state at the start of the day.
+        :param cells: numpy.ndarray = sorted flat indices of the cells, including every cell that is spread to.
+        :param t: int = current day.
+        :return: numpy.ndarray = people infected in each of the cells.
+        """
+        growthFactor = self.rng.uniform(0, self.spreadRate, size=len(cells))
+        if self.kernels is not None:
+            multiplier = self.quarantineMultiplier if t > self.daysBeforeQuarantine else 1.0
+            newPplInfected = self.kernels.newInfections(
+                cells, front.population.reshape(-1), front.infFraction.reshape(-1),
+                front.amountOfMasksType1.reshape(-1), front.amountOfMasksType2.reshape(-1),
+                front.amountOfMasksType3.reshape(-1), growthFactor, multiplier, np.array(self.maskFactors))
+            return self.spreadCompiled(newPplInfected, cells)
+
+        population = front.population.reshape(-1)[cells]
+        infFraction = front.infFraction.reshape(-1)[cells]
+        if t > self.daysBeforeQuarantine:
+            newPplInfected = ((population * infFraction) * self.quarantineMultiplier) * growthFactor
+        else:
+            newPplInfected = population * infFraction * growthFactor
+        newPplInfected = np.trunc(newPplInfected)
+
+        # Only the first mask type present in a cell has an effect
+        masked = np.zeros(len(cells), dtype=bool)
+        for amountOfMasks, maskFactor in ((front.amountOfMasksType1, self.maskFactors[0]),
+                                          (front.amountOfMasksType2, self.maskFactors[1]),
+                                          (front.amountOfMasksType3, self.maskFactors[2])):
+            amountOfMasks = amountOfMasks.reshape(-1)[cells]
+            apply = (amountOfMasks != 0) & ~masked
+            maskFraction = np.divide(amountOfMasks, population, out=np.zeros(masked.shape), where=population != 0)
+            reduced = np.trunc(newPplInfected - newPplInfected * maskFraction * maskFactor)
+            newPplInfected = np.where(apply, reduced, newPplInfected)
+            masked |= apply
+        newPplInfected = np.maximum(newPplInfected, 0).astype(np.int64)
+
+        return spreadAmongCells(newPplInfected, cells, self.spreadTargets, self.rng)
+
+    def spreadCompiled(self, newPplInfected, cells):
+        """
+        Does the same as spreadAmongCells with the compiled kernel.
+        :param newPplInfected: numpy.ndarray = people infected by each of the cells.
+        :param cells: numpy.ndarray = sorted flat indices of the cells.
+        :return: numpy.ndarray = people infected in each of the cells.
+        """
+        if len(cells) == 0:
+            return np.zeros(0, dtype=np.int64)
+        if self.positions is None:
+            self.positions = np.full(self.simSizeX * self.simSizeY, -1, dtype=np.int64)
+        peoplePerNeighbour = self.rng.multinomial(newPplInfected, NEIGHBOUR_PROBABILITIES)
+        return self.kernels.spreadAmongCells(peoplePerNeighbour, cells,
+                                             self.spreadTargets.reshape(len(NEIGHBOURS), -1), self.positions)
+
+    def infectCells(self, back, cells, incoming, t):
+        """
+        Adds incoming infections to cells, capped at their population.
+        :param back: GridState = state of the new day.
+        :param cells: numpy.ndarray = flat indices of the cells.
+        :param incoming: numpy.ndarray = people infected in each of the cells.
+        :param t: int = current day.
+        :return: None
+        """
+        if self.kernels is not None:
+            self.newInfected += self.kernels.infectCells(cells, incoming, back.population.reshape(-1),
+                                                         back.infectedPop.reshape(-1), back.infFraction.reshape(-1),
+                                                         self.cohorts.slot(t))
+            return
+        backPopulation = back.population.reshape(-1)[cells]
+        infectedPop = back.infectedPop.reshape(-1)[cells]
+        infectedBefore = infectedPop.copy()
+        self.newInfected += addInfections(infectedPop, backPopulation, incoming)
+        back.infectedPop.reshape(-1)[cells] = infectedPop
+        self.cohorts.record(t, cells, infectedPop - infectedBefore)
+
+        newInfFraction = np.round(np.divide(infectedPop, backPopulation, out=np.zeros(incoming.shape),
+                                            where=backPopulation != 0), 4)
+        backInfFraction = back.infFraction.reshape(-1)
+        backInfFraction[cells] = np.where(incoming > 0, newInfFraction, backInfFraction[cells])
+
+    def killDisease(self, state, cells, t):
+        self.logger.log(PHASE, "Calculating reduction of disease...")
+        if self.kernels is not None:
+            reductionFactors, rounding = self.drawReductions(len(cells))
+            newDead, newRecovered = self.kernels.reduceCells(
+                cells, self.cohorts.flatCounts, self.calcCohortWeights(t), reductionFactors, rounding,
+                float(self.deathRate), float(self.recRate), state.infectedPop.reshape(-1),
+                state.population.reshape(-1), state.infFraction.reshape(-1))
+            self.newDead += newDead
+            self.newRecovered += newRecovered
+            return
+        reductionInInfectedPop = self.calcReductions(t, cells)
+        deaths = np.trunc(reductionInInfectedPop * self.deathRate).astype(np.int64)
+        self.newDead += int(deaths.sum())
+        self.newRecovered += int(np.trunc(reductionInInfectedPop * self.recRate).sum())
+
+        reduced = reductionInInfectedPop > 0
+        cells = cells[reduced]
+        infectedPop = state.infectedPop.reshape(-1)
+        population = state.population.reshape(-1)
+        infectedPop[cells] -= reductionInInfectedPop[reduced]
+        population[cells] = np.maximum(population[cells] - deaths[reduced], 0)
+        state.infFraction.reshape(-1)[cells] = np.round(np.divide(infectedPop[cells], population[cells],
+                                                                  out=np.zeros(len(cells)),
+                                                                  where=population[cells] != 0), 4)
+
+    def updateCellData(self, state, cells):
+        self.logger.log(PHASE, "Updating cell data...")
+        isInfected = state.isInfected.reshape(-1)
+        age = state.age.reshape(-1)
+        wasInfected = isInfected[cells]
+        nowInfected = wasInfected | (state.infectedPop.reshape(-1)[cells] != 0)
+        age[cells] = np.where(wasInfected, age[cells] + 1, np.where(nowInfected, age[cells], 0))
+        isInfected[cells] = nowInfected
+        self.addActiveCells(cells[nowInfected & ~wasInfected])
+
+    def getCellGrids(self, names):
+        # The state arrays are handed over as they are, so snapshots are copied straight into the snapshot file
+        return {name: getattr(self.state, name) for name in names}
+
+    def setCellGrids(self, grids):
+        self.state = GridState(self.simSizeX, self.simSizeY)
+        for name, grid in grids.items():
+            np.copyto(getattr(self.state, name), grid)
+        self.makeBackBuffer()
+
+
+def loadKernels(config, logger=None):
+    """
+    Loads the kernels chosen by the COMPILED_KERNELS setting. With COMPILED_KERNELS=2 they are only loaded for fields
+    of at least COMPILED_KERNELS_MIN_CELLS cells. They are compiled the first time a process loads them, so a process
+    that starts other simulations can load them first to spare its workers the compiling.
+    :param config: SimulationConfig = settings of the simulation.
+    :param logger: Logger = logger for a note when Numba is not installed.
+    :return: module = Data.CompiledKernels, or None to use the NumPy code.
+    """
+    if not config.compiledKernels or config.engine == 0:
+        return None
+    if config.compiledKernels == 2 and config.uArea + config.surrArea < COMPILED_KERNELS_MIN_CELLS:
+        return None
+    try:
+        from Data import CompiledKernels
+    except ImportError:
+        if logger is not None:
+            logger.log(PHASE, "Numba is not installed, stepping the days with NumPy.")
+        return None
+    return CompiledKernels
+
+
+def engineClass(config):
+    """
+    :param config: SimulationConfig = settings of the simulation.
+    :return: type = simulation class of the engine chosen by the SIMULATION_ENGINE setting.
+    """
+    if config.engine == 2:
+        # Imported here, as the tiled engine is built on this module
+        from Data.TiledSimulation import TiledSimulation
+        return TiledSimulation
+    if config.engine == 1:
+        return GridSimulation
+    return Simulation
+
+
+def createSimulation(config, **kwargs):
+    """
+    Creates a simulation using the engine chosen by the SIMULATION_ENGINE setting.
+    :param config: SimulationConfig = settings of the simulation.
+    :param kwargs: passed on to the simulation, see Simulation.__init__.
+    :return: Simulation
+    """
+    return engineClass(config).fromConfig(config, **kwargs)
+
@@ -0,0 +1,179 @@
+import numpy as np
+
+# What happens to infections that are spread past the edge of the playing field (SPREAD_BOUNDARY setting)
+BOUNDARY_RETAIN = 0
+BOUNDARY_ABSORB = 1
+BOUNDARY_REFLECT = 2
+BOUNDARY_PERIODIC = 3
+
+# Shapes of the urban area (URBAN_SHAPE setting), each measures the distance from the centre differently
+URBAN_CIRCLE = 0
+URBAN_SQUARE = 1
+URBAN_DIAMOND = 2
+
+# Offsets of the 3x3 neighbourhood a cell spreads the disease to, including the cell itself
+NEIGHBOURS = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+NEIGHBOUR_PROBABILITIES = np.full(len(NEIGHBOURS), 1 / len(NEIGHBOURS))
+
+
+def distanceFromCentre(simSizeX, simSizeY, shape=URBAN_CIRCLE):
+    """
+    Works out the distance of every cell from the centre of the playing field.
+    :param simSizeX: int = side length of the simulation in x-direction.
+    :param simSizeY: int = side length of the simulation in y-direction.
+    :param shape: int = one of the URBAN_* constants. Cells at the same distance lie on a circle, a square or a
+    diamond around the centre.
+    :return: numpy.ndarray = (simSizeY, simSizeX) array of distances.
+    """
+    yPos, xPos = np.ogrid[:simSizeY, :simSizeX]
+    dx = np.abs(xPos - simSizeX / 2)
+    dy = np.abs(yPos - simSizeY / 2)
+    if shape == URBAN_SQUARE:
+        return np.maximum(dx, dy).astype(np.float64)
+    elif shape == URBAN_DIAMOND:
+        return dx + dy
+    elif shape != URBAN_CIRCLE:
+        raise ValueError("Urban shape %s is not valid." % shape)
+    return np.sqrt(dx ** 2 + dy ** 2)
+
+
+def urbanMask(dist, urbanRadius, coins, borderWidth=3):
+    """
+    Works out which cells are urban. Cells within borderWidth of the edge of the urban area are decided by a coin.
+    :param dist: numpy.ndarray = distance of every cell from the centre, as returned by distanceFromCentre.
+    :param urbanRadius: float = radius of the urban area.
+    :param coins: numpy.ndarray = 0 or 1 for every cell, 1 makes a cell on the edge urban.
+    :param borderWidth: float = distance from the edge of the urban area within which cells are decided by the coin.
+    :return: numpy.ndarray = boolean array of the urban cells.
+    """
+    border = ((urbanRadius - borderWidth) < dist) & (dist <= (urbanRadius + borderWidth))
+    return (dist <= (urbanRadius - borderWidth)) | (border & (coins == 1))
+
+
+def allocateInGroups(amount, weights, rng, groupSize=10):
+    """
+    Hands out an amount in groups to cells picked at random with a probability proportional to their weight. This
+    gives the same distribution as picking a cell for one group at a time.
+    :param amount: int = amount to hand out, rounded up to a whole group.
+    :param weights: numpy.ndarray = relative weight of each cell.
+    :param rng: numpy.random.Generator = generator to draw from.
+    :param groupSize: int = size of each group.
+    :return: numpy.ndarray = amount handed to each cell.
+    """
+    groups = max(0, -(-amount // groupSize))
+    if groups == 0:
+        return np.zeros(len(weights), dtype=np.int64)
+    totalWeight = weights.sum()
+    if len(weights) == 0 or totalWeight <= 0:
+        raise ValueError("There are no cells to distribute %s to." % amount)
+    return rng.multinomial(groups, weights / totalWeight) * groupSize
+
+
+def neighbourTargets(simSizeX, simSizeY, boundary):
+    """
+    Works out which cell every cell spreads to in each direction of its neighbourhood.
+    :param simSizeX: int = side length of the simulation in x-direction.
+    :param simSizeY: int = side length of the simulation in y-direction.
+    :param boundary: int = one of the BOUNDARY_* constants.
+    :return: numpy.ndarray = (len(NEIGHBOURS), simSizeY, simSizeX) array of flat cell indices, -1 where the
+    infections leave the playing field.
+    """
+    yPos, xPos = np.indices((simSizeY, simSizeX))
+    targets = np.empty((len(NEIGHBOURS), simSizeY, simSizeX), dtype=np.int64)
+
+    for i, (dy, dx) in enumerate(NEIGHBOURS):
+        targetY = yPos + dy
+        targetX = xPos + dx
+        outside = (targetY < 0) | (targetY >= simSizeY) | (targetX < 0) | (targetX >= simSizeX)
+        if boundary == BOUNDARY_RETAIN:
+            targetY = np.where(outside, yPos, targetY)
+            targetX = np.where(outside, xPos, targetX)
+        elif boundary == BOUNDARY_REFLECT:
+            targetY = np.clip(targetY, 0, simSizeY - 1)
+            targetX = np.clip(targetX, 0, simSizeX - 1)
+        elif boundary == BOUNDARY_PERIODIC:
+            targetY = targetY % simSizeY
+            targetX = targetX % simSizeX
+        elif boundary != BOUNDARY_ABSORB:
+            raise ValueError("Spread boundary %s is not valid." % boundary)
+
+        targets[i] = targetY * simSizeX + targetX
+        if boundary == BOUNDARY_ABSORB:
+            targets[i][outside] = -1
+
+    return targets
+
+
+def spreadToNeighbours(newPplInfected, targets, rng):
+    """
+    Splits every cell's new infections over its neighbourhood with one batched multinomial draw.
+    :param newPplInfected: numpy.ndarray = (simSizeY, simSizeX) integer array of people infected by each cell.
+    :param targets: numpy.ndarray = array returned by neighbourTargets.
+    :param rng: numpy.random.Generator = generator to draw from.
+    :return: numpy.ndarray = (simSizeY, simSizeX) integer array of people infected in each cell.
+    """
+    peoplePerNeighbour = rng.multinomial(newPplInfected, NEIGHBOUR_PROBABILITIES)
+    peoplePerNeighbour = np.moveaxis(peoplePerNeighbour, -1, 0)
+
+    inside = targets >= 0
+    incoming = np.bincount(targets[inside], weights=peoplePerNeighbour[inside], minlength=newPplInfected.size)
+    return incoming.astype(np.int64).reshape(newPplInfected.shape)
+
+
+def addInfections(infectedPop, population, incoming):
+    """
+    Adds incoming infections to a field, capping every cell at its population.
+    :param infectedPop: numpy.ndarray = infected population of each cell, updated in place.
+    :param population: numpy.ndarray = population of each cell.
+    :param incoming: numpy.ndarray = people infected in each cell.
+    :return: int = amount of people actually infected.
+    """
+    newInfectedPop = np.minimum(infectedPop + incoming, population)
+    newInfected = int((newInfectedPop - infectedPop).sum())
+    infectedPop[:] = newInfectedPop
+    return newInfected
+
+
+def neighbourhoodCells(cells, targets):
+    """
+    Works out which cells the given cells spread to, themselves included.
+    :param cells: numpy.ndarray = flat indices of cells.
+    :param targets: numpy.ndarray = array returned by neighbourTargets.
+    :return: numpy.ndarray = sorted flat indices of the cells and every cell they spread to.
+    """
+    neighbours = targets.reshape(len(NEIGHBOURS), -1)[:, cells]
+    return np.unique(neighbours[neighbours >= 0])
+
+
+def spreadAmongCells(newPplInfected, cells, targets, rng):
+    """
+    Does the same as spreadToNeighbours for only some cells of the field. The cells must include every cell that
+    people are spread to, anything spread outside them is dropped.
+    :param newPplInfected: numpy.ndarray = integer array of people infected by each of the cells.
+    :param cells: numpy.ndarray = sorted flat indices of the cells.
+    :param targets: numpy.ndarray = array returned by neighbourTargets.
+    :param rng: numpy.random.Generator = generator to draw from.
+    :return: numpy.ndarray = integer array of people infected in each of the cells.
+    """
+    if len(cells) == 0:
+        return np.zeros(0, dtype=np.int64)
+    peoplePerNeighbour = rng.multinomial(newPplInfected, NEIGHBOUR_PROBABILITIES).T
+
+    # Position of every target among the cells
+    cellTargets = targets.reshape(len(NEIGHBOURS), -1)[:, cells]
+    positions = np.minimum(np.searchsorted(cells, cellTargets), len(cells) - 1)
+    inside = (cellTargets >= 0) & (cells[positions] == cellTargets)
+    incoming = np.bincount(positions[inside], weights=peoplePerNeighbour[inside], minlength=len(cells))
+    return incoming.astype(np.int64)
+
+
+def lifetimeReached(ages, minIncubation, maxLifetime):
+    """
+    Works out the chance that people infected a number of days ago have been ill for longer than their disease
+    lifetime, which is picked evenly from minIncubation to maxLifetime days.
+    :param ages: numpy.ndarray = days since infection.
+    :param minIncubation: int = shortest disease lifetime (MIN_INCUBATION_PERIOD setting).
+    :param maxLifetime: int = longest disease lifetime (MAX_INCUBATION_PERIOD + RECOVERY_TIME settings).
+    :return: numpy.ndarray = chance for every age.
+    """
+    return np.clip((ages - minIncubation + 1) / (maxLifetime - minIncubation + 1), 0, 1)
@@ -0,0 +1,120 @@
+import sys
+import time
+
+# Verbosity levels, each one prints everything the levels below it print
+SILENT = 0
+SUMMARY = 1
+PHASE = 2
+CELL = 3
+
+
+class Logger:
+    """
+    Prints messages depending on how verbose the simulation has been asked to be (VERBOSITY setting).
+    """
+    def __init__(self, verbosity=SUMMARY, stream=None):
+        self.verbosity = verbosity
+        self.stream = stream
+        self.progressBar = None
+
+    def isEnabled(self, level):
+        """
+        :param level: int = verbosity level of a message.
+        :return: bool = whether messages of this level are printed. Check this before building expensive messages.
+        """
+        return self.verbosity >= level
+
+    def log(self, level, message, *args):
+        """
+        Prints a message if the verbosity is high enough. The message is only formatted with args when it is printed.
+        :param level: int = verbosity level of the message.
+        :param message: str = message, optionally with % placeholders.
+        :param args: values for the placeholders.
+        :return: None
+        """
+        if self.verbosity < level:
+            return
+        if args:
+            message = message % args
+        if self.progressBar is not None:
+            self.progressBar.clear()
+        print(message, file=self.stream or sys.stdout)
+
+    def makeProgressBar(self, total, refreshRate=4):
+        """
+        Creates a progress bar that is drawn on stderr when it is a terminal and the verbosity is not silent.
+        :param total: int = amount of steps.
+        :param refreshRate: float = maximum amount of times per second the bar is redrawn.
+        :return: ProgressBar
+        """
+        stream = sys.stderr
+        enabled = self.verbosity >= SUMMARY and stream.isatty()
+        self.progressBar = ProgressBar(total, refreshRate, stream, enabled)
+        return self.progressBar
+
+
+class ProgressBar:
+    """
+    Shows how far a run is, its speed in cells per second and the estimated time left. Redraws are limited to
+    refreshRate per second so updating it every step costs next to nothing.
+    """
+    WIDTH = 30
+
+    def __init__(self, total, refreshRate, stream, enabled):
+        self.total = total
+        # Cells processed by the steps so far, only the active cells of a day are processed
+        self.cells = 0
+        self.minInterval = 1 / refreshRate
+        self.stream = stream
+        self.enabled = enabled
+        self.startTime = time.perf_counter()
+        self.lastDrawTime = 0
+        self.done = 0
+        self.shown = False
+
+    def update(self, done, cells=0):
+        """
+        :param done: int = amount of steps finished.
+        :param cells: int = amount of cells processed by the step just finished, used to show the cells per second.
+        :return: None
+        """
+        self.done = done
+        self.cells += cells
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if now - self.lastDrawTime >= self.minInterval or done >= self.total:
+            self.lastDrawTime = now
+            self.draw(now)
+
+    def draw(self, now):
+        elapsed = now - self.startTime
+        fraction = self.done / self.total if self.total else 1
+        filled = int(fraction * self.WIDTH)
+        cellsPerSecond = self.cells / elapsed if elapsed > 0 else 0
+        if self.done > 0:
+            eta = "%ds" % (elapsed / self.done * (self.total - self.done))
+        else:
+            eta = "?"
+        self.stream.write("\r[%s%s] %s/%s %3d%% %.0f cells/s ETA %s " % ("#" * filled, "." * (self.WIDTH - filled),
+                                                                        self.done, self.total, fraction * 100,
+                                                                        cellsPerSecond, eta))
+        self.stream.flush()
+        self.shown = True
+
+    def clear(self):
+        """
+        Removes the bar from the terminal so another line can be printed. It comes back on the next redraw.
+        :return: None
+        """
+        if self.shown:
+            self.stream.write("\r\033[K")
+            self.stream.flush()
+            self.shown = False
+
+    def finish(self):
+        if self.enabled:
+            self.draw(time.perf_counter())
+            self.stream.write("\n")
+            self.stream.flush()
+            self.shown = False
@@ -0,0 +1,232 @@
+import csv
+import json
+import os
+import time
+import tracemalloc
+from Data.Logger import *
+import numpy as np
+
+# Values of the PROFILE setting
+PROFILE_OFF = 0
+PROFILE_TIME = 1
+PROFILE_MEMORY = 2
+
+# Methods of a simulation that are profiled. Each one includes the time of the profiled methods it calls. The Cell
+# engine calls the step phases once for every active cell, the grid engines once a day, and the tiled engine steps
+# its tiles inside stepTime, where the random numbers are drawn from RowStreams and are not counted.
+SETUP_PHASES = ["makeSimulation", "restoreCheckpoint", "makeCellMatrix", "distributePopulation",
+                "distributePreventionMethods", "makeBackBuffer", "makeCohorts"]
+STEP_PHASES = ["stepTime", "spreadDisease", "killDisease", "calcReductions", "updateCellData", "calcStats",
+               "recordDay", "printStats"]
+OUTPUT_PHASES = ["openStats", "writeStats", "closeStats", "recordSnapshot", "exportFrame", "saveCheckpoint",
+                 "drawSimulation", "renderRaster"]
+PROFILED_PHASES = SETUP_PHASES + STEP_PHASES + OUTPUT_PHASES
+
+# Generator methods whose random numbers are counted
+DRAW_METHODS = {"uniform", "multinomial", "integers", "choice", "random", "binomial", "normal", "poisson"}
+
+
+class CountingGenerator:
+    """
+    Stands in for a numpy.random.Generator and counts the random numbers drawn from it.
+    """
+    def __init__(self, generator):
+        self.generator = generator
+        self.draws = 0
+
+    def __getattr__(self, name):
+        attribute = getattr(self.generator, name)
+        if name not in DRAW_METHODS:
+            return attribute
+
+        def draw(*args, **kwargs):
+            values = attribute(*args, **kwargs)
+            self.draws += int(np.size(values))
+            return values
+        return draw
+
+
+class Profiler:
+    """
+    Times the phases of a simulation and counts the work done in them. A row of metrics is written for every day
+    and a summary when the run ends. The phases are wrapped on the simulation itself, so a simulation that is not
+    profiled runs exactly the code it would without this class.
+    """
+    def __init__(self, path=None, traceMemory=False, logger=None):
+        """
+        :param path: str = file the metrics of every day are written to, None to only keep the totals.
+        :param traceMemory: bool = whether to also trace the memory every phase allocates with tracemalloc, which
+        slows the simulation down.
+        :param logger: Logger = logger the summary is printed by.
+        """
+        self.path = path
+        self.traceMemory = traceMemory
+        self.logger = logger or Logger(SILENT)
+        self.phases = []
+        self.dayPhases = []
+        self.seconds = {}
+        self.calls = {}
+        self.memory = {}
+        self.daySeconds = {}
+        self.dayCalls = {}
+        self.dayMemory = {}
+        self.days = 0
+        self.cells = 0
+        self.generator = None
+        self.metricsFile = None
+        self.csvWrite = None
+        self.startTime = time.perf_counter()
+        self.dayStart = self.startTime
+        self.startedTracing = traceMemory and not tracemalloc.is_tracing()
+        if self.startedTracing:
+            tracemalloc.start()
+
+    def instrument(self, simulation):
+        """
+        Wraps the profiled methods and the random number generator of a simulation.
+        :param simulation: Simulation = simulation to profile.
+        :return: None
+        """
+        self.phases = [name for name in PROFILED_PHASES if hasattr(simulation, name)]
+        self.dayPhases = [name for name in self.phases if name not in SETUP_PHASES]
+        for name in self.phases:
+            self.seconds[name] = 0.0
+            self.calls[name] = 0
+            self.memory[name] = 0
+            setattr(simulation, name, self.wrap(name, getattr(simulation, name)))
+        self.resetDay()
+
+        stepTime = simulation.stepTime
+
+        def profiledStep(t):
+            draws = self.generator.draws
+            stepTime(t)
+            self.endDay(t, simulation.steppedCells, self.generator.draws - draws)
+        simulation.stepTime = profiledStep
+        simulation.rng = self.countDraws(simulation.rng)
+
+    def endSetup(self, simulation):
+        """
+        Starts the metrics of the first day once the simulation has been set up.
+        :param simulation: Simulation = the profiled simulation.
+        :return: None
+        """
+        # Restoring a checkpoint replaces the generator
+        simulation.rng = self.countDraws(simulation.rng)
+        if self.traceMemory:
+            tracemalloc.reset_peak()
+        self.dayStart = time.perf_counter()
+
+    def countDraws(self, generator):
+        """
+        :param generator: numpy.random.Generator = generator of the simulation.
+        :return: CountingGenerator = the generator, counting the random numbers drawn from it on top of those drawn
+        from the generators counted before.
+        """
+        if isinstance(generator, CountingGenerator):
+            return generator
+        counting = CountingGenerator(generator)
+        if self.generator is not None:
+            counting.draws = self.generator.draws
+        self.generator = counting
+        return counting
+
+    def wrap(self, name, method):
+        def profiled(*args, **kwargs):
+            memoryBefore = tracemalloc.get_traced_memory()[0] if self.traceMemory else 0
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.daySeconds[name] += time.perf_counter() - start
+                self.dayCalls[name] += 1
+                if self.traceMemory:
+                    self.dayMemory[name] += tracemalloc.get_traced_memory()[0] - memoryBefore
+        return profiled
+
+    def resetDay(self):
+        for name in self.phases:
+            self.seconds[name] += self.daySeconds.get(name, 0.0)
+            self.calls[name] += self.dayCalls.get(name, 0)
+            self.memory[name] += self.dayMemory.get(name, 0)
+        self.daySeconds = {name: 0.0 for name in self.phases}
+        self.dayCalls = {name: 0 for name in self.phases}
+        self.dayMemory = {name: 0 for name in self.phases}
+
+    def makeHeader(self):
+        header = ["Day", "Cells", "Draws", "Seconds"]
+        if self.traceMemory:
+            header.append("Traced Peak KB")
+        for name in self.dayPhases:
+            header += ["%s Seconds" % name, "%s Calls" % name]
+            if self.traceMemory:
+                header.append("%s Memory KB" % name)
+        return header
+
+    def endDay(self, t, cells, draws):
+        """
+        Writes the metrics of a day. Every phase profiled since the previous day counts towards it, such as drawing
+        the field before it is stepped.
+        :param t: int = day that has just been simulated.
+        :param cells: int = amount of cells the day worked on.
+        :param draws: int = amount of random numbers the day drew.
+        :return: None
+        """
+        now = time.perf_counter()
+        self.days += 1
+        self.cells += cells
+        if self.path is not None:
+            if self.csvWrite is None:
+                # Line buffered, so the metrics of a run can be followed while it runs
+                self.metricsFile = open(self.path, "w", newline="", buffering=1)
+                self.csvWrite = csv.writer(self.metricsFile)
+                self.csvWrite.writerow(self.makeHeader())
+            row = [t, cells, draws, round(now - self.dayStart, 6)]
+            if self.traceMemory:
+                row.append(round(tracemalloc.get_traced_memory()[1] / 1024, 1))
+                tracemalloc.reset_peak()
+            for name in self.dayPhases:
+                row += [round(self.daySeconds[name], 6), self.dayCalls[name]]
+                if self.traceMemory:
+                    row.append(round(self.dayMemory[name] / 1024, 1))
+            self.csvWrite.writerow(row)
+        self.resetDay()
+        self.dayStart = now
+
+    def summary(self):
+        """
+        :return: dict = days profiled, seconds since profiling started, cells worked on, random numbers drawn and
+        the calls, seconds and memory of every phase that was called.
+        """
+        self.resetDay()
+        phases = {}
+        for name in self.phases:
+            if self.calls[name] == 0:
+                continue
+            phases[name] = {"calls": self.calls[name], "seconds": round(self.seconds[name], 6)}
+            if self.traceMemory:
+                phases[name]["memoryKB"] = round(self.memory[name] / 1024, 1)
+        return {"days": self.days, "seconds": round(time.perf_counter() - self.startTime, 6), "cells": self.cells,
+                "draws": self.generator.draws if self.generator is not None else 0, "phases": phases}
+
+    def close(self):
+        """
+        Prints the summary, writes it next to the metrics file and stops profiling.
+        :return: None
+        """
+        summary = self.summary()
+        self.logger.log(SUMMARY, "Profile of %s days in %.3f seconds, %s cells worked on, %s random numbers drawn:",
+                        summary["days"], summary["seconds"], summary["cells"], summary["draws"])
+        for name, phase in summary["phases"].items():
+            self.logger.log(SUMMARY, "    %-28s %10s calls %10.3f seconds %6.1f%%", name, phase["calls"],
+                            phase["seconds"], 100 * phase["seconds"] / max(summary["seconds"], 1e-9))
+        if self.metricsFile is not None:
+            self.metricsFile.close()
+            self.metricsFile = None
+            self.csvWrite = None
+        if self.path is not None:
+            with open(os.path.splitext(self.path)[0] + "_summary.json", "w") as summaryFile:
+                json.dump(summary, summaryFile, indent=2)
+        if self.startedTracing:
+            tracemalloc.stop()
+            self.startedTracing = False
@@ -0,0 +1,100 @@
+import numpy as np
+
+
+def makeSeedSequence(seed=None):
+    """
+    :param seed: int, numpy.random.SeedSequence or None = seed of a stream. None picks fresh entropy.
+    :return: numpy.random.SeedSequence
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
+
+
+def makeGenerator(seed=None):
+    """
+    Creates the random number generator a simulation draws all of its random numbers from.
+    :param seed: int, numpy.random.SeedSequence or None = seed of the stream.
+    :return: numpy.random.Generator
+    """
+    return np.random.Generator(np.random.PCG64(makeSeedSequence(seed)))
+
+
+def spawnSeeds(seed, amount):
+    """
+    Derives independent child streams from one seed, one for every run of a sweep or ensemble. Child i only depends
+    on the seed and i, so run i gives the same trajectory whether it is run on its own or in parallel with others.
+    :param seed: int, numpy.random.SeedSequence or None = seed the children are derived from.
+    :param amount: int = amount of children.
+    :return: list(numpy.random.SeedSequence)
+    """
+    return makeSeedSequence(seed).spawn(amount)
+
+
+# Spawn key of the streams RowStreams draws from, kept apart from the children made by spawnSeeds
+ROW_STREAMS_KEY = 0x524F57
+
+
+class RowStreams:
+    """
+    Random numbers drawn from a separate stream for every row of the playing field on every day. The numbers a cell
+    gets only depend on the seed, the day and the cells drawn for before it in its row, so any split of the field
+    into bands of rows draws exactly the same numbers.
+    """
+    def __init__(self, seedSequence, day, simSizeX):
+        """
+        :param seedSequence: numpy.random.SeedSequence = seed of the simulation.
+        :param day: int = day the numbers are drawn for.
+        :param simSizeX: int = side length of the simulation in x-direction.
+        """
+        daySeed = np.random.SeedSequence(seedSequence.entropy,
+                                         spawn_key=tuple(seedSequence.spawn_key) + (ROW_STREAMS_KEY, day))
+        self.key = daySeed.generate_state(2, dtype=np.uint64)
+        self.simSizeX = simSizeX
+        self.generators = {}
+
+    def getGenerator(self, row):
+        """
+        :param row: int = row of the playing field.
+        :return: numpy.random.Generator = stream of the row, which carries on where it was left on later calls.
+        """
+        generator = self.generators.get(row)
+        if generator is None:
+            generator = np.random.Generator(np.random.Philox(counter=[0, row, 0, 0], key=self.key))
+            self.generators[row] = generator
+        return generator
+
+    def select(self, cells):
+        """
+        :param cells: numpy.ndarray = sorted flat indices of cells.
+        :return: RowStreamSelection = draws one number, or one row of numbers, for each of the cells.
+        """
+        return RowStreamSelection(self, cells)
+
+
+class RowStreamSelection:
+    """
+    Stands in for a numpy.random.Generator whose draws have one entry for each of some cells. Every cell's entries come
+    from the stream of its row.
+    """
+    def __init__(self, streams, cells):
+        rows, starts = np.unique(np.asarray(cells) // streams.simSizeX, return_index=True)
+        stops = np.append(starts[1:], len(cells))
+        self.amount = len(cells)
+        self.segments = [(streams.getGenerator(row), start, stop)
+                         for row, start, stop in zip(rows.tolist(), starts.tolist(), stops.tolist())]
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        if size != self.amount:
+            raise ValueError("Row streams draw one number for each of the %s cells, not %s." % (self.amount, size))
+        if self.amount == 0:
+            return np.zeros(0)
+        return np.concatenate([generator.uniform(low, high, size=stop - start)
+                               for generator, start, stop in self.segments])
+
+    def multinomial(self, n, pvals):
+        if len(n) != self.amount:
+            raise ValueError("Row streams draw for each of the %s cells, not %s." % (self.amount, len(n)))
+        if self.amount == 0:
+            return np.zeros((0, len(pvals)), dtype=np.int64)
+        return np.concatenate([generator.multinomial(n[start:stop], pvals) for generator, start, stop in self.segments])
@@ -0,0 +1,84 @@
+import numpy as np
+
+# Colour of every cell, indexed by its green (and blue) value. Cells go from white to red as the drawn value rises.
+COLOUR_TABLE = np.stack([np.full(256, 255), np.arange(256), np.arange(256)], axis=1).astype(np.uint8)
+
+# Outline colours of urban and surrounding cells
+URBAN_OUTLINE = np.array([0, 0, 0], dtype=np.uint8)
+SURROUNDING_OUTLINE = np.array([255, 255, 255], dtype=np.uint8)
+
+
+def loadGraphics():
+    """
+    Imports the Tk based graphics module the first time something is drawn in a window. Runs that do not open a
+    window never import tkinter, so they start quickly and work without a display.
+    :return: module = the graphics module.
+    """
+    import graphics
+    return graphics
+
+
+def colourIndices(infFraction, population, graphMode, maxPop):
+    """
+    Works out the COLOUR_TABLE index of every cell, matching Simulation.calcCellColour.
+    :param infFraction: numpy.ndarray = fraction of every cell's population that is infected.
+    :param population: numpy.ndarray = population of every cell.
+    :param graphMode: int = 0 to draw the infection, 1 to draw the population (WHAT_TO_GRAPH setting).
+    :param maxPop: float = population drawn at full intensity.
+    :return: numpy.ndarray = index of every cell's colour.
+    """
+    if graphMode == 1:
+        colVariable = np.asarray(population) / maxPop * 255
+    else:
+        colVariable = np.asarray(infFraction) * 255
+    return np.clip(np.trunc(255 - colVariable), 0, 255).astype(np.uint8)
+
+
+class FrameRenderer:
+    """
+    Turns the colour indices of every cell into an image with each cell drawn as a scale x scale square, outlined
+    like the rectangles of the cell by cell drawing. Everything that stays the same from day to day is worked out
+    once, so rendering a frame is a table lookup and a few whole-array operations.
+    """
+    def __init__(self, isUrban, scale, colourTable=COLOUR_TABLE, urbanOutline=URBAN_OUTLINE,
+                 surroundingOutline=SURROUNDING_OUTLINE):
+        """
+        :param isUrban: numpy.ndarray = whether every cell is urban.
+        :param scale: int = side length of a cell in pixels (COORD_SCALING setting).
+        :param colourTable: numpy.ndarray = pixel value of every colour index, RGB by default.
+        :param urbanOutline: numpy.ndarray = pixel value of the outline of urban cells.
+        :param surroundingOutline: numpy.ndarray = pixel value of the outline of the other cells.
+        """
+        isUrban = np.asarray(isUrban, dtype=bool)
+        simSizeY, simSizeX = isUrban.shape
+        self.colourTable = colourTable
+        pixelShape = colourTable.shape[1:]
+        # The frame is kept as (y, row in cell, x, column in cell, colour), so a cell's pixels are one broadcast away
+        self.frame = np.empty((simSizeY, scale, simSizeX, scale) + pixelShape, dtype=colourTable.dtype)
+        urban = isUrban.reshape(isUrban.shape + (1,) * len(pixelShape))
+        self.outlineColours = np.where(urban, urbanOutline, surroundingOutline)[:, None, :, None]
+        # Cells of one or two pixels would be all outline, so they are drawn without one
+        self.drawOutline = scale > 2
+
+    def render(self, indices):
+        """
+        :param indices: numpy.ndarray = colour table index of every cell, as returned by colourIndices.
+        :return: numpy.ndarray = (height, width) image, with a last axis of 3 for RGB. The array is reused by the
+        next render.
+        """
+        frame = self.frame
+        frame[...] = self.colourTable[indices][:, None, :, None]
+        if self.drawOutline:
+            frame[:, [0, -1]] = self.outlineColours
+            frame[:, :, :, [0, -1]] = self.outlineColours
+        simSizeY, scale, simSizeX = frame.shape[:3]
+        return frame.reshape((simSizeY * scale, simSizeX * scale) + frame.shape[4:])
+
+
+def encodePpm(frame):
+    """
+    :param frame: numpy.ndarray = (height, width, 3) RGB image.
+    :return: bytes = the image as a binary PPM file, which Tk photo images read without any extra packages.
+    """
+    height, width = frame.shape[:2]
+    return b"P6 %d %d 255\n" % (width, height) + np.ascontiguousarray(frame, dtype=np.uint8).tobytes()
@@ -0,0 +1,102 @@
+import csv
+import numpy as np
+
+
+class Scenario:
+    """
+    Describes which cells are infected when a simulation starts, so a run does not need to ask the user.
+
+    A scenario file is made of lines like the ones below. Lines beginning with a hash (#) are ignored.
+    CELL=x,y,fraction                infects one cell
+    RANDOM=amount,fraction           infects an amount of cells picked at random
+    REGION=x1,y1,x2,y2,fraction      infects every cell in the rectangle from (x1, y1) to (x2, y2), inclusive
+    Regions are applied first, then random cells, then single cells, so later kinds override earlier ones.
+    """
+    def __init__(self, cells=(), randomCells=(), regions=()):
+        self.cells = list(cells)
+        self.randomCells = list(randomCells)
+        self.regions = list(regions)
+
+    @classmethod
+    def fromUserInput(cls, posArray, infArray):
+        """
+        :param posArray: list(list(str)) = x and y coordinates, as returned by Simulation.getUserInput.
+        :param infArray: list(str) = fraction of people infected in each cell.
+        :return: Scenario
+        """
+        return cls(cells=[(int(pos[0]), int(pos[1]), float(inf)) for pos, inf in zip(posArray, infArray)])
+
+    @classmethod
+    def fromFile(cls, path):
+        """
+        :param path: str = path of the scenario file.
+        :return: Scenario
+        """
+        scenario = cls()
+        with open(path, "r") as scenarioFile:
+            rows = csv.reader(scenarioFile, delimiter="=")
+            for lineNumber, row in enumerate(rows, start=1):
+                if len(row) == 0 or row[0].strip() == "" or row[0].startswith("#"):
+                    continue
+                try:
+                    scenario.addLine(row[0].strip(), row[1])
+                except (IndexError, ValueError) as error:
+                    reason = " (%s)" % error if str(error) else ""
+                    raise ValueError("Invalid line %s in %s: %s%s" % (lineNumber, path, "=".join(row), reason))
+        return scenario
+
+    def addLine(self, kind, values):
+        """
+        Adds one line of a scenario file.
+        :param kind: str = CELL, RANDOM or REGION.
+        :param values: str = comma separated values of the line.
+        :return: None
+        """
+        values = [value.strip() for value in values.split(",")]
+        if kind == "CELL" and len(values) == 3:
+            line = (int(values[0]), int(values[1]), float(values[2]))
+            lines = self.cells
+        elif kind == "RANDOM" and len(values) == 2:
+            line = (int(values[0]), float(values[1]))
+            lines = self.randomCells
+            if line[0] < 0:
+                raise ValueError("the amount of cells must not be negative")
+        elif kind == "REGION" and len(values) == 5:
+            line = (int(values[0]), int(values[1]), int(values[2]), int(values[3]), float(values[4]))
+            lines = self.regions
+        else:
+            raise ValueError
+        # More people than live in a cell cannot be infected
+        if not 0 <= line[-1] <= 1:
+            raise ValueError("the fraction of people infected must be between 0 and 1")
+        lines.append(line)
+
+    def getSeedGrids(self, simSizeX, simSizeY, rng):
+        """
+        Works out the initially infected cells for a playing field. Cells outside of the field are ignored.
+        :param simSizeX: int = side length of the simulation in x-direction.
+        :param simSizeY: int = side length of the simulation in y-direction.
+        :param rng: numpy.random.Generator = generator used to pick random cells.
+        :return:
+        infFraction: numpy.ndarray = (simSizeY, simSizeX) array of the fraction of people infected, rounded to 4 places.
+        isSeed: numpy.ndarray = (simSizeY, simSizeX) boolean array of the initially infected cells.
+        """
+        infFraction = np.zeros((simSizeY, simSizeX))
+        isSeed = np.zeros((simSizeY, simSizeX), dtype=bool)
+        for x1, y1, x2, y2, fraction in self.regions:
+            region = (slice(max(min(y1, y2), 0), max(min(max(y1, y2) + 1, simSizeY), 0)),
+                      slice(max(min(x1, x2), 0), max(min(max(x1, x2) + 1, simSizeX), 0)))
+            infFraction[region] = fraction
+            isSeed[region] = True
+
+        for amount, fraction in self.randomCells:
+            positions = rng.choice(simSizeX * simSizeY, size=min(amount, simSizeX * simSizeY), replace=False)
+            infFraction.reshape(-1)[positions] = fraction
+            isSeed.reshape(-1)[positions] = True
+
+        for x, y, fraction in self.cells:
+            if 0 <= x < simSizeX and 0 <= y < simSizeY:
+                infFraction[y, x] = fraction
+                isSeed[y, x] = True
+
+        return np.round(infFraction, 4), isSeed
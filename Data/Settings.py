@@ -0,0 +1,254 @@
+import csv
+from dataclasses import dataclass, field, fields, replace
+from math import pi, sqrt
+
+# Area of the urban area of every URBAN_SHAPE setting, divided by its radius squared
+URBAN_SHAPE_AREAS = {0: pi, 1: 4, 2: 2}
+
+# Names used in the settings file and the SimulationConfig attribute each one is stored in
+SETTING_NAMES = {
+    "COORD_SCALING": "coordScale",
+    "CREATE_DATA_FILE": "createFile",
+    "DATA_FILE_FORMAT": "dataFormat",
+    "DATA_FILE_FLUSH_DAYS": "dataFlushDays",
+    "RECORD_SNAPSHOTS": "recordSnapshots",
+    "CHECKPOINT_DAYS": "checkpointDays",
+    "EXPORT_FRAMES": "exportFrames",
+    "EXPORT_FRAME_DAYS": "exportFrameDays",
+    "SIMULATION_RUN_TIME": "runTime",
+    "DRAW_SIMULATION": "drawSim",
+    "DRAW_MODE": "drawMode",
+    "RUN_SLOWLY": "slowRun",
+    "WHAT_TO_GRAPH": "graphMode",
+    "VERBOSITY": "verbosity",
+    "SIMULATION_ENGINE": "engine",
+    "TILES": "tiles",
+    "COMPILED_KERNELS": "compiledKernels",
+    "PROFILE": "profile",
+    "URBAN_POPULATION": "uPop",
+    "SURROUNDING_POPULATION": "surrPop",
+    "URBAN_AREA": "uArea",
+    "SURROUNDING_AREA": "surrArea",
+    "FIELD_ASPECT_RATIO": "fieldAspect",
+    "URBAN_SHAPE": "urbanShape",
+    "POPULATION_DENSITY_FALLOFF": "densityFalloff",
+    "SPREAD_RATE": "spreadRate",
+    "REDUCTION_RATE": "reductionRate",
+    "DEATH_RATE": "deathRate",
+    "RECOVERY_RATE": "recRate",
+    "MIN_INCUBATION_PERIOD": "minIncubation",
+    "MAX_INCUBATION_PERIOD": "maxIncubation",
+    "RECOVERY_TIME": "recTime",
+    "SPREAD_BOUNDARY": "spreadBoundary",
+    "FRACTION_TO_QUARANTINE": "fracToQuarantine",
+    "DAYS_BEFORE_QUARANTINE": "daysBeforeQuarantine",
+    "AMOUNT_OF_MASKS_TYPE_1": "mask1Amount",
+    "AMOUNT_OF_MASKS_TYPE_2": "mask2Amount",
+    "AMOUNT_OF_MASKS_TYPE_3": "mask3Amount",
+    "MASK_1_INFECTION_PROBABILITY": "mask1Prob",
+    "MASK_2_INFECTION_PROBABILITY": "mask2Prob",
+    "MASK_3_INFECTION_PROBABILITY": "mask3Prob",
+}
+
+
+@dataclass(frozen=True)
+class SimulationConfig:
+    """
+    The simulation settings, parsed and checked once. A config is never modified, so a single one is shared by the
+    simulation and all of its cells. Use withSettings to make a changed copy.
+    """
+    coordScale: int = 8
+    createFile: int = 1
+    dataFormat: int = 0
+    dataFlushDays: int = 0
+    recordSnapshots: int = 0
+    checkpointDays: int = 0
+    exportFrames: int = 0
+    exportFrameDays: int = 1
+    runTime: int = 100
+    drawSim: int = 0
+    drawMode: int = 1
+    slowRun: int = 0
+    graphMode: int = 0
+    verbosity: int = 1
+    engine: int = 0
+    tiles: int = 0
+    compiledKernels: int = 2
+    profile: int = 0
+    uPop: int = 8896900
+    surrPop: int = 2183100
+    uArea: int = 1500
+    surrArea: int = 8500
+    fieldAspect: float = 1.0
+    urbanShape: int = 0
+    densityFalloff: float = 0.0
+    spreadRate: float = 3.25
+    reductionRate: float = 0.05
+    deathRate: float = 0.11
+    recRate: float = 0.89
+    minIncubation: int = 2
+    maxIncubation: int = 14
+    recTime: int = 7
+    spreadBoundary: int = 0
+    fracToQuarantine: float = 0.98
+    daysBeforeQuarantine: int = 7
+    mask1Amount: int = 0
+    mask2Amount: int = 0
+    mask3Amount: int = 0
+    mask1Prob: float = 0.85
+    mask2Prob: float = 0.20
+    mask3Prob: float = 0.05
+
+    # Constants worked out from the settings above
+    urbanRadius: float = field(init=False, repr=False, compare=False)
+    quarantineMultiplier: float = field(init=False, repr=False, compare=False)
+    maskFactors: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        for setting in fields(self):
+            if setting.init:
+                value = getattr(self, setting.name)
+                try:
+                    object.__setattr__(self, setting.name, self.convert(setting.type, value))
+                except ValueError:
+                    raise ValueError("Setting %s has invalid value %r" % (self.settingName(setting.name), value))
+        self.validate()
+
+        object.__setattr__(self, "urbanRadius", sqrt(self.uArea / URBAN_SHAPE_AREAS[self.urbanShape]))
+        object.__setattr__(self, "quarantineMultiplier", 1 - self.fracToQuarantine)
+        object.__setattr__(self, "maskFactors", (1 - self.mask1Prob, 1 - self.mask2Prob, 1 - self.mask3Prob))
+
+    @staticmethod
+    def convert(settingType, value):
+        if settingType is int:
+            return int(value)
+        return float(value)
+
+    @staticmethod
+    def settingName(attribute):
+        for name, attributeName in SETTING_NAMES.items():
+            if attributeName == attribute:
+                return name
+        return attribute
+
+    def validate(self):
+        """
+        Checks that the settings make sense together.
+        :return: None
+        """
+        problems = []
+        if self.uArea <= 0 or self.surrArea < 0:
+            problems.append("URBAN_AREA must be positive and SURROUNDING_AREA must not be negative")
+        if self.fieldAspect <= 0:
+            problems.append("FIELD_ASPECT_RATIO must be positive")
+        elif int(sqrt((self.uArea + self.surrArea) * min(self.fieldAspect, 1 / self.fieldAspect))) < 1:
+            problems.append("FIELD_ASPECT_RATIO is too far from 1 for a field of this area")
+        if self.urbanShape not in URBAN_SHAPE_AREAS:
+            problems.append("URBAN_SHAPE must be 0, 1 or 2")
+        if self.coordScale <= 0:
+            problems.append("COORD_SCALING must be positive")
+        if min(self.uPop, self.surrPop, self.runTime, self.mask1Amount, self.mask2Amount, self.mask3Amount) < 0:
+            problems.append("populations, amounts of masks and SIMULATION_RUN_TIME must not be negative")
+        elif self.uPop + self.surrPop == 0:
+            problems.append("URBAN_POPULATION and SURROUNDING_POPULATION must not both be 0")
+        for name in ("reductionRate", "deathRate", "recRate", "fracToQuarantine", "mask1Prob", "mask2Prob",
+                     "mask3Prob"):
+            if not 0 <= getattr(self, name) <= 1:
+                problems.append("%s must be between 0 and 1" % self.settingName(name))
+        # Everyone taken out of the infected either dies or recovers, and not both
+        if self.deathRate + self.recRate > 1 + 1e-9:
+            problems.append("DEATH_RATE and RECOVERY_RATE must not add up to more than 1")
+        if self.spreadRate < 0 or self.densityFalloff < 0:
+            problems.append("SPREAD_RATE and POPULATION_DENSITY_FALLOFF must not be negative")
+        if not 0 <= self.minIncubation <= self.maxIncubation:
+            problems.append("MIN_INCUBATION_PERIOD must be between 0 and MAX_INCUBATION_PERIOD")
+        if self.recTime < 0:
+            problems.append("RECOVERY_TIME must not be negative")
+        if self.dataFormat not in (0, 1, 2):
+            problems.append("DATA_FILE_FORMAT must be 0, 1 or 2")
+        if self.dataFlushDays < 0 or self.checkpointDays < 0:
+            problems.append("DATA_FILE_FLUSH_DAYS and CHECKPOINT_DAYS must not be negative")
+        if self.exportFrames not in (0, 1, 2) or self.exportFrameDays < 1:
+            problems.append("EXPORT_FRAMES must be 0, 1 or 2 and EXPORT_FRAME_DAYS must be at least 1")
+        if self.drawMode not in (0, 1):
+            problems.append("DRAW_MODE must be 0 or 1")
+        if self.verbosity not in (0, 1, 2, 3):
+            problems.append("VERBOSITY must be 0, 1, 2 or 3")
+        if self.engine not in (0, 1, 2):
+            problems.append("SIMULATION_ENGINE must be 0, 1 or 2")
+        if self.tiles < 0:
+            problems.append("TILES must not be negative")
+        if self.compiledKernels not in (0, 1, 2):
+            problems.append("COMPILED_KERNELS must be 0, 1 or 2")
+        if self.profile not in (0, 1, 2):
+            problems.append("PROFILE must be 0, 1 or 2")
+        if self.spreadBoundary not in (0, 1, 2, 3):
+            problems.append("SPREAD_BOUNDARY must be 0, 1, 2 or 3")
+        if problems:
+            raise ValueError("Invalid simulation settings: " + "; ".join(problems))
+
+    def getSetting(self, setting):
+        """
+        Looks a setting up by the name used in the settings file.
+        :param setting: str = name of the setting, e.g. URBAN_AREA.
+        :return: int or float = value of the setting.
+        """
+        try:
+            return getattr(self, SETTING_NAMES[setting])
+        except KeyError:
+            raise ValueError("Unknown setting %s" % setting)
+
+    def withSettings(self, **settings):
+        """
+        Makes a copy of this config with some settings changed.
+        :param settings: new values, keyed by either the settings file name or the attribute name.
+        :return: SimulationConfig = the changed copy.
+        """
+        changes = {SETTING_NAMES.get(name, name): value for name, value in settings.items()}
+        return replace(self, **changes)
+
+    def toDict(self):
+        """
+        :return: dict = every setting keyed by the name used in the settings file.
+        """
+        return {name: getattr(self, attribute) for name, attribute in SETTING_NAMES.items()}
+
+    @classmethod
+    def fromDict(cls, settings):
+        """
+        :param settings: dict = settings keyed by the names used in the settings file.
+        :return: SimulationConfig
+        """
+        values = {}
+        for name, value in settings.items():
+            if name not in SETTING_NAMES:
+                raise ValueError("Unknown setting %s" % name)
+            values[SETTING_NAMES[name]] = value
+        return cls(**values)
+
+    @classmethod
+    def fromList(cls, settings):
+        """
+        :param settings: list = alternating setting names and values, as StartSimulation used to pass them.
+        :return: SimulationConfig
+        """
+        settings = list(settings)
+        return cls.fromDict(dict(zip(settings[0::2], settings[1::2])))
+
+    @classmethod
+    def fromFile(cls, path):
+        """
+        Reads a settings file made of NAME=value lines. Lines beginning with a hash (#) are ignored.
+        :param path: str = path of the settings file.
+        :return: SimulationConfig
+        """
+        settings = {}
+        with open(path, "r") as settingsFile:
+            rows = csv.reader(settingsFile, delimiter="=")
+            for row in rows:
+                if len(row) == 0 or row[0].startswith("#"):
+                    continue
+                if len(row) != 2:
+                    raise ValueError("Invalid line in %s: %s" % (path, "=".join(row)))
+                settings[row[0].strip()] = row[1].strip()
+        return cls.fromDict(settings)
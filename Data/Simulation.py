@@ -1,16 +1,71 @@
 from Data.Cell import *
-import csv
+from Data.Kernels import *
+from Data.Settings import *
+from Data.Logger import *
+from Data.Scenario import *
+from Data.RandomStreams import *
+from Data.StatsWriter import *
+from Data.SnapshotRecorder import *
+from Data.Checkpoint import *
+from Data.Cohorts import *
+from Data.Rendering import *
+from Data.FrameExport import *
+from Data.Profiler import *
+import numpy as np
+import base64
 import copy
-import random
+import os
+from math import sqrt
+
+# Columns of the data file
+DATA_HEADER = ["Day", "Current Population", "Total Infection Cases", "Currently Infected",
+               "Percentage Currently Infected", "New Infected Today", "Total Dead", "New Dead Today",
+               "Total Recovered", "New Recovered Today"]
 
 
 class Simulation:
-    def __init__(self, simulationSettings):
+    def __init__(self, simulationSettings, scenario=None, seed=None, dataFile=None, snapshotFile="snapshots.dat",
+                 checkpointFile="checkpoint.npz", checkpoint=None, framePath=None, metricsFile="metrics.csv"):
         # Create object attributes
+        if not isinstance(simulationSettings, SimulationConfig):
+            simulationSettings = SimulationConfig.fromList(simulationSettings)
         self.simSettings = simulationSettings
         self.simSizeX = 0
         self.simSizeY = 0
         self.cells = []
+        self.backCells = []
+        self.spreadTargets = None
+        # Flat indices of the cells stepTime works on, see findActiveCells
+        self.activeCells = np.zeros(0, dtype=np.int64)
+        # Amount of cells the last day worked on
+        self.steppedCells = 0
+        self.scenario = scenario
+        if dataFile is None:
+            dataFile = "data" + DATA_FILE_EXTENSIONS[simulationSettings.dataFormat]
+        self.dataFile = dataFile
+        self.statsWriter = None
+        self.snapshotFile = snapshotFile
+        self.snapshotRecorder = None
+        self.checkpointFile = checkpointFile
+        self.framePath = framePath
+        self.frameExporter = None
+        self.metricsFile = metricsFile
+        # Times every phase of the simulation when the PROFILE setting is on, see Data.Profiler
+        self.profiler = None
+        # First day runSimulation simulates, later than 0 when resumed from a checkpoint
+        self.startDay = 0
+        self.resumeFrom = None
+        # Every random number of the simulation comes from this generator, so a seed fixes the whole run
+        self.seedSequence = makeSeedSequence(seed)
+        self.rng = makeGenerator(self.seedSequence)
+        self.growthFactors = []
+        self.peoplePerNeighbour = []
+        self.reductions = []
+        # People infected in every cell on each day of the disease lifetime, see makeCohorts
+        self.cohorts = None
+        self.logger = Logger(simulationSettings.verbosity)
+        self.logCells = self.logger.isEnabled(CELL)
+        self.logger.log(PHASE, "Random seed entropy is %s", self.seedSequence.entropy)
 
         # Stats to track
         self.population = 0
@@ -24,31 +79,74 @@ class Simulation:
         self.newRecovered = 0
 
         # Load Settings
-        self.uArea = int(self.getSetting("URBAN_AREA"))
-        self.surrArea = int(self.getSetting("SURROUNDING_AREA"))
-        self.uPop = int(self.getSetting("URBAN_POPULATION"))
-        self.surrPop = int(self.getSetting("SURROUNDING_POPULATION"))
-        self.graphMode = int(self.getSetting("WHAT_TO_GRAPH"))
-        self.coordScale = int(self.getSetting("COORD_SCALING"))
-        self.createFile = int(self.getSetting("CREATE_DATA_FILE"))
-        self.spreadRate = float(self.getSetting("SPREAD_RATE"))
-        self.minIncubation = int(self.getSetting("MIN_INCUBATION_PERIOD"))
-        self.maxIncubation = int(self.getSetting("MAX_INCUBATION_PERIOD"))
-        self.recTime = int(self.getSetting("RECOVERY_TIME"))
-        self.deathRate = float(self.getSetting("DEATH_RATE"))
-        self.recRate = float(self.getSetting("RECOVERY_RATE"))
-        self.reductionRate = float(self.getSetting("REDUCTION_RATE"))
-        self.runTime = int(self.getSetting("SIMULATION_RUN_TIME"))
-        self.slowRun = int(self.getSetting("RUN_SLOWLY"))
-        self.drawSim = int(self.getSetting("DRAW_SIMULATION"))
-        self.mask1Prob = float(self.getSetting("MASK_1_INFECTION_PROBABILITY"))
-        self.mask2Prob = float(self.getSetting("MASK_2_INFECTION_PROBABILITY"))
-        self.mask3Prob = float(self.getSetting("MASK_3_INFECTION_PROBABILITY"))
-        self.fracToQuarantine = float(self.getSetting("FRACTION_TO_QUARANTINE"))
-        self.daysBeforeQuarantine = int(self.getSetting("DAYS_BEFORE_QUARANTINE"))
+        config = self.simSettings
+        self.uArea = config.uArea
+        self.surrArea = config.surrArea
+        self.uPop = config.uPop
+        self.surrPop = config.surrPop
+        self.graphMode = config.graphMode
+        self.coordScale = config.coordScale
+        self.createFile = config.createFile
+        self.recordSnapshots = config.recordSnapshots
+        self.checkpointDays = config.checkpointDays
+        self.exportFrames = config.exportFrames
+        self.exportFrameDays = config.exportFrameDays
+        self.spreadRate = config.spreadRate
+        self.minIncubation = config.minIncubation
+        self.maxIncubation = config.maxIncubation
+        self.recTime = config.recTime
+        self.deathRate = config.deathRate
+        self.recRate = config.recRate
+        self.reductionRate = config.reductionRate
+        self.runTime = config.runTime
+        self.slowRun = config.slowRun
+        self.drawSim = config.drawSim
+        self.drawMode = config.drawMode
+        self.frameRenderer = None
+        self.rasterView = None
+        self.cellViews = []
+        self.mask1Prob = config.mask1Prob
+        self.mask2Prob = config.mask2Prob
+        self.mask3Prob = config.mask3Prob
+        self.maskFactors = config.maskFactors
+        self.fracToQuarantine = config.fracToQuarantine
+        self.quarantineMultiplier = config.quarantineMultiplier
+        self.daysBeforeQuarantine = config.daysBeforeQuarantine
+        self.spreadBoundary = config.spreadBoundary
+        self.densityFalloff = config.densityFalloff
+        self.fieldAspect = config.fieldAspect
+        self.urbanShape = config.urbanShape
+
+        if config.profile != PROFILE_OFF:
+            self.profiler = Profiler(metricsFile, config.profile == PROFILE_MEMORY, self.logger)
+            self.profiler.instrument(self)
 
         # Initialise Simulation
-        self.makeSimulation()
+        if checkpoint is None:
+            self.makeSimulation()
+        else:
+            self.restoreCheckpoint(checkpoint)
+        if self.profiler is not None:
+            self.profiler.endSetup(self)
+
+    @classmethod
+    def fromConfig(cls, config, **kwargs):
+        """
+        Creates a simulation from settings that have already been parsed, so many simulations can be built from
+        one config without reading the settings file again.
+        :param config: SimulationConfig = settings of the simulation.
+        :param kwargs: scenario, seed, dataFile, snapshotFile, checkpointFile, checkpoint, framePath and metricsFile,
+        see __init__.
+        :return: Simulation
+        """
+        return cls(config, **kwargs)
+
+    def spawnSeeds(self, amount):
+        """
+        :param amount: int = amount of child streams.
+        :return: list(numpy.random.SeedSequence) = independent streams derived from this simulation's seed.
+        """
+        return self.seedSequence.spawn(amount)
 
     def makeSimulation(self):
         """
@@ -59,20 +157,163 @@ class Simulation:
         sizes = self.calcSimSize()
         self.simSizeX = sizes[0]
         self.simSizeY = sizes[1]
+        self.spreadTargets = neighbourTargets(self.simSizeX, self.simSizeY, self.spreadBoundary)
 
         # Create matrix of Cell objects
         self.makeCellMatrix()
 
         # Distribute population
         self.distributePopulation()
-        print("The city's population is %s" % self.population)
+        self.logger.log(SUMMARY, "The city's population is %s", self.population)
 
         # Distribute prevention methods
         self.distributePreventionMethods()
 
+        # Create the buffer each day is written into
+        self.makeBackBuffer()
+        self.makeCohorts()
+
         # Calculate initial stats
         self.percentageInfected = self.totInfected / self.population
 
+    def restoreCheckpoint(self, checkpoint):
+        """
+        Sets the simulation up from a checkpoint instead of building it from the settings, so it carries on exactly
+        where the checkpointed run stopped.
+        :param checkpoint: tuple(dict, dict) = header and grids, as returned by loadCheckpoint.
+        :return: None
+        """
+        header, grids = checkpoint
+        self.simSizeY, self.simSizeX = grids["population"].shape
+        self.spreadTargets = neighbourTargets(self.simSizeX, self.simSizeY, self.spreadBoundary)
+        self.setCellGrids({name: grids[name] for name in CHECKPOINT_FIELDS})
+        for name, value in header["counters"].items():
+            setattr(self, name, value)
+        self.startDay = header["day"]
+        if CHECKPOINT_COHORTS in grids:
+            if len(grids[CHECKPOINT_COHORTS]) != self.maxIncubation + self.recTime + 1:
+                raise ValueError("The checkpoint was saved with different incubation and recovery periods.")
+            self.cohorts = InfectionCohorts.fromCounts(grids[CHECKPOINT_COHORTS])
+        else:
+            self.makeCohorts()
+
+        self.seedSequence = np.random.SeedSequence(header["seed"], spawn_key=tuple(header["spawnKey"]))
+        self.rng = makeGenerator(self.seedSequence)
+        self.rng.bit_generator.state = header["rng"]
+        self.resumeFrom = header
+        self.logger.log(SUMMARY, "Resumed from a checkpoint at day %s", self.startDay)
+
+    def saveCheckpoint(self, day):
+        """
+        Saves the simulation to self.checkpointFile. The data and snapshot files are written out first, so they
+        match the checkpoint.
+        :param day: int = first day that has not been simulated yet.
+        :return: None
+        """
+        metadata = {"settings": self.simSettings.toDict(), "seed": self.seedSequence.entropy,
+                    "spawnKey": list(self.seedSequence.spawn_key), "rng": self.rng.bit_generator.state,
+                    "dataFile": None, "dataPath": None, "snapshotPath": None}
+        if self.statsWriter is not None:
+            metadata["dataFile"] = self.statsWriter.position()
+            metadata["dataPath"] = self.dataFile
+        if self.snapshotRecorder is not None:
+            self.snapshotRecorder.flush()
+            metadata["snapshotPath"] = self.snapshotFile
+        counters = {name: getattr(self, name) for name in CHECKPOINT_COUNTERS}
+        saveCheckpoint(self.checkpointFile, day, self.getCellGrids(CHECKPOINT_FIELDS), counters, metadata,
+                       self.cohorts.counts)
+        self.logger.log(PHASE, "Checkpoint saved to %s", self.checkpointFile)
+
+    def getCellGrids(self, names):
+        """
+        :param names: list(str) = Cell attributes to collect.
+        :return: dict = grid of every attribute, keyed by attribute name.
+        """
+        return {name: [[getattr(cell, name) for cell in row] for row in self.cells] for name in names}
+
+    def setCellGrids(self, grids):
+        """
+        Creates the cells from grids of their attributes.
+        :param grids: dict = (simSizeY, simSizeX) array of every CHECKPOINT_FIELDS attribute.
+        :return: None
+        """
+        self.cells = [[Cell(x, y, 0) for x in range(self.simSizeX)] for y in range(self.simSizeY)]
+        values = {name: np.asarray(grid).tolist() for name, grid in grids.items()}
+        for y, row in enumerate(self.cells):
+            for x, cell in enumerate(row):
+                for name, grid in values.items():
+                    setattr(cell, name, grid[y][x])
+        self.makeBackBuffer()
+
+    def makeBackBuffer(self):
+        """
+        Creates a second matrix of cells that the next day is written into while the current day is read from
+        self.cells. The two are swapped at the end of every day.
+        :return: None
+        """
+        self.backCells = copy.deepcopy(self.cells)
+        self.findActiveCells()
+
+    def makeCohorts(self):
+        """
+        Creates the infection cohorts. Everyone infected when the simulation starts counts as infected the day before.
+        :return: None
+        """
+        self.cohorts = InfectionCohorts(self.maxIncubation + self.recTime + 1, self.simSizeX, self.simSizeY)
+        infectedPop = np.asarray(self.getCellGrids(["infectedPop"])["infectedPop"], dtype=np.int64).reshape(-1)
+        self.cohorts.record(self.startDay - 1, np.arange(infectedPop.size), infectedPop)
+
+    def calcReductions(self, t, cells):
+        """
+        Takes the people whose disease has run its course out of the infection cohorts of some cells. Every cohort
+        loses a random fraction of up to REDUCTION_RATE of its people, weighted by the chance that they have been
+        infected for longer than their disease lifetime. People infected today are never taken out.
+        :param t: int = current day.
+        :param cells: numpy.ndarray = flat indices of the cells.
+        :return: numpy.ndarray = people taken out of each of the cells.
+        """
+        reductionFactors, rounding = self.drawReductions(len(cells))
+        return self.cohorts.remove(cells, self.calcCohortWeights(t)[:, None] * reductionFactors, rounding)
+
+    def calcCohortWeights(self, t):
+        """
+        :param t: int = current day.
+        :return: numpy.ndarray = chance that the people in every infection cohort have been infected for longer than
+        their disease lifetime, 0 for the people infected today.
+        """
+        ages = self.cohorts.ages(t)
+        reached = lifetimeReached(ages, self.minIncubation, self.maxIncubation + self.recTime)
+        reached[ages == 0] = 0
+        return reached
+
+    def drawReductions(self, amount):
+        """
+        :param amount: int = amount of cells.
+        :return: tuple(numpy.ndarray, numpy.ndarray) = random fraction of up to REDUCTION_RATE and random number in
+        [0, 1) for rounding, for each of the cells.
+        """
+        reductionFactors = self.rng.uniform(0, self.reductionRate, size=amount)
+        rounding = self.rng.uniform(size=amount)
+        return reductionFactors, rounding
+
+    def findActiveCells(self):
+        """
+        Works out the active cells: the infected cells and every cell they spread to. Nothing else can change on the
+        next day, so stepTime only works on these. Cells never stop being infected, so the active cells only grow.
+        :return: None
+        """
+        isInfected = np.asarray(self.getCellGrids(["isInfected"])["isInfected"], dtype=bool)
+        self.activeCells = neighbourhoodCells(np.flatnonzero(isInfected), self.spreadTargets)
+
+    def addActiveCells(self, newlyInfected):
+        """
+        Adds cells that have just been infected, and every cell they spread to, to the active cells.
+        :param newlyInfected: numpy.ndarray = flat indices of the newly infected cells.
+        :return: None
+        """
+        if len(newlyInfected) > 0:
+            self.activeCells = np.union1d(self.activeCells, neighbourhoodCells(newlyInfected, self.spreadTargets))
+
     def getUserInput(self):
         """
         Asks the user to input things that would be too cumbersome for the settings file or things
@@ -104,57 +345,36 @@ class Simulation:
 
     def calcSimSize(self):
         """
-        Takes square root of tot area of the simulation to work out the side length. Able to handle non-square fields.
+        Takes square root of tot area of the simulation to work out the side length. Able to handle non-square fields,
+        whose width is FIELD_ASPECT_RATIO times their height.
         :return:
         x: int = side length of the simulation in x-direction
         y: int = side length of the simulation in y-direction
         """
-        print("Calculating simulation size...")
+        self.logger.log(PHASE, "Calculating simulation size...")
         uArea = self.uArea
         surrArea = self.surrArea
 
         totArea = uArea + surrArea
-        sideLength = int(sqrt(totArea))
 
-        x = sideLength
-        y = sideLength
+        x = int(sqrt(totArea * self.fieldAspect))
+        y = int(sqrt(totArea / self.fieldAspect))
 
-        print("Simulation size set to %s by %s." % (x, y))
+        self.logger.log(SUMMARY, "Simulation size set to %s by %s.", x, y)
         return x, y
 
     def distributePopulation(self):
-        print("Calculating population distribution...")
+        self.logger.log(PHASE, "Calculating population distribution...")
         cells = self.cells
-        # Urban population
-        urbanCells = []
-        surrCells = []
-        for y in range(self.simSizeY):
-            for x in range(self.simSizeX):
-                cell = cells[y][x]
-                if cell.isUrban:
-                    urbanCells.append(cell)
-                else:
-                    surrCells.append(cell)
+        urbanCells, surrCells = self.splitUrbanCells()
 
-        urbanPop = self.uPop
-        print("Distributing urban population...")
-        while urbanPop > 0:
-            rand = randint(0, len(urbanCells) - 1)
-            cellToIncrease = urbanCells[rand]
-            cellToIncrease.population += 10
-            self.population += 10
-            urbanPop -= 10
-
-        surrPop = self.surrPop
-        print("Distributing surrounding population...")
-        while surrPop > 0:
-            rand = randint(0, len(surrCells) - 1)
-            cellToIncrease = surrCells[rand]
-            cellToIncrease.population += 10
-            self.population += 10
-            surrPop -= 10
-
-        print("Calculating infected population...")
+        self.logger.log(PHASE, "Distributing urban population...")
+        self.population += self.distributeToCells(urbanCells, "population", self.uPop)
+
+        self.logger.log(PHASE, "Distributing surrounding population...")
+        self.population += self.distributeToCells(surrCells, "population", self.surrPop)
+
+        self.logger.log(PHASE, "Calculating infected population...")
         for y in range(self.simSizeY):
             for x in range(self.simSizeX):
                 cell = cells[y][x]
@@ -163,294 +383,349 @@ class Simulation:
                 self.totCases += cell.infectedPop
 
     def distributePreventionMethods(self):
-        maskType1Available = int(self.getSetting("AMOUNT_OF_MASKS_TYPE_1"))
-        maskType2Available = int(self.getSetting("AMOUNT_OF_MASKS_TYPE_2"))
-        maskType3Available = int(self.getSetting("AMOUNT_OF_MASKS_TYPE_3"))
-
-        for type in range(1, 4):
-            print("Distributing masks of type %s" % (type))
-            if type == 1:
-                masksAvailable = maskType1Available
-            elif type == 2:
-                masksAvailable = maskType2Available
-            elif type == 3:
-                masksAvailable = maskType3Available
-            else:
-                raise ValueError
+        maskType1Available = self.simSettings.mask1Amount
+        maskType2Available = self.simSettings.mask2Amount
+        maskType3Available = self.simSettings.mask3Amount
+        urbanCells, ruralCells = self.splitUrbanCells()
 
+        for type, masksAvailable in ((1, maskType1Available), (2, maskType2Available), (3, maskType3Available)):
+            self.logger.log(PHASE, "Distributing masks of type %s", type)
             urbanMasks = int(0.6 * masksAvailable)
             ruralMasks = int(masksAvailable - urbanMasks)
 
-            urbanCells = []
-            ruralCells = []
-
-            for y in range(self.simSizeY):
-                for x in range(self.simSizeX):
-                    cell = self.cells[y][x]
-                    if cell.isUrban:
-                        urbanCells.append(cell)
-                    else:
-                        ruralCells.append(cell)
-
-            print("Distributing masks to urban areas...")
-            while urbanMasks > 0:
-                rand = randint(0, len(urbanCells) - 1)
-                cellToIncrease = urbanCells[rand]
-                if type == 1:
-                    cellToIncrease.amountOfMasksType1 += 10
-                elif type == 2:
-                    cellToIncrease.amountOfMasksType2 += 10
-                elif type == 3:
-                    cellToIncrease.amountOfMasksType3 += 10
-                else:
-                    raise ValueError
-                urbanMasks -= 10
-
-            print("Distributing masks to surrounding areas...")
-            while ruralMasks > 0:
-                rand = randint(0, len(ruralCells) - 1)
-                cellToIncrease = ruralCells[rand]
-                if type == 1:
-                    cellToIncrease.amountOfMasksType1 += 10
-                elif type == 2:
-                    cellToIncrease.amountOfMasksType2 += 10
-                elif type == 3:
-                    cellToIncrease.amountOfMasksType3 += 10
+            self.logger.log(PHASE, "Distributing masks to urban areas...")
+            self.distributeToCells(urbanCells, "amountOfMasksType%s" % type, urbanMasks)
+
+            self.logger.log(PHASE, "Distributing masks to surrounding areas...")
+            self.distributeToCells(ruralCells, "amountOfMasksType%s" % type, ruralMasks)
+
+    def splitUrbanCells(self):
+        """
+        Sorts the cells into urban and surrounding cells.
+        :return:
+        urbanCells: list(Cell) = cells in the urban area.
+        surrCells: list(Cell) = cells in the surrounding area.
+        """
+        urbanCells = []
+        surrCells = []
+        for y in range(self.simSizeY):
+            for x in range(self.simSizeX):
+                cell = self.cells[y][x]
+                if cell.isUrban:
+                    urbanCells.append(cell)
                 else:
-                    raise ValueError
-                ruralMasks -= 10
+                    surrCells.append(cell)
+        return urbanCells, surrCells
+
+    def distributeToCells(self, cells, attribute, amount):
+        """
+        Hands out an amount in groups of 10 to random cells, weighted by the population density setting.
+        :param cells: list(Cell) = cells that can receive groups.
+        :param attribute: str = name of the cell attribute to increase.
+        :param amount: int = amount to hand out.
+        :return: int = amount actually handed out.
+        """
+        positions = [int(cell.yPos) * self.simSizeX + int(cell.xPos) for cell in cells]
+        weights = self.calcDensityWeights().ravel()[positions]
+        counts = allocateInGroups(amount, weights, self.rng)
+        for cell, count in zip(cells, counts.tolist()):
+            setattr(cell, attribute, getattr(cell, attribute) + count)
+        return int(counts.sum())
+
+    def calcDensityWeights(self):
+        """
+        Works out how likely each cell is to receive a group of people or masks compared to the others.
+        :return: numpy.ndarray = (simSizeY, simSizeX) array of relative densities.
+        """
+        dist = distanceFromCentre(self.simSizeX, self.simSizeY)
+        if self.densityFalloff == 0:
+            return np.ones_like(dist)
+        return 0.5 ** (dist / self.densityFalloff)
 
     def makeCellMatrix(self):
-        print("Creating city cells...")
-        # Get inputs from user
-        userInput = self.getUserInput()
-        posArray = userInput[0]
-        infArray = userInput[1]
+        self.logger.log(PHASE, "Creating city cells...")
+        infFraction, isSeed = self.getSeedGrids()
+        isUrban = self.calcUrbanMask()
 
-        cellsRow = []
         cells = []
-        count = 0
-
-        for y in range(self.simSizeY):
-            for x in range(self.simSizeX):
-                try:
-                    if (x == int(posArray[count][0])) and (y == int(posArray[count][1])):
-                        cell = self.makeCell(x, y, infArray[count], self.simSettings)
-                        cell.isInfected = True
-                        count += 1
-                        cellsRow.append(cell)
-                    else:
-                        cell = self.makeCell(x, y, 0, self.simSettings)
-                        cellsRow.append(cell)
-                except IndexError:
-                    cell = self.makeCell(x, y, 0, self.simSettings)
-                    cellsRow.append(cell)
+        for y, (fractionRow, seedRow, urbanRow) in enumerate(zip(infFraction.tolist(), isSeed.tolist(),
+                                                                 isUrban.tolist())):
+            cellsRow = [self.makeCell(x, y, fraction, urban) for x, (fraction, urban) in
+                        enumerate(zip(fractionRow, urbanRow))]
+            for cell, seed in zip(cellsRow, seedRow):
+                cell.isInfected = seed
             cells.append(cellsRow)
-            cellsRow = []
         self.cells = cells
 
+    def calcUrbanDistance(self):
+        """
+        Works out how far every cell is from the centre, measured so that the cells within the urban radius form the
+        URBAN_SHAPE setting. Override this to give the urban area any other shape.
+        :return: numpy.ndarray = (simSizeY, simSizeX) array of distances.
+        """
+        return distanceFromCentre(self.simSizeX, self.simSizeY, self.urbanShape)
+
+    def calcUrbanMask(self):
+        """
+        Works out which cells are urban. Cells on the edge of the urban area are randomly assigned.
+        :return: numpy.ndarray = (simSizeY, simSizeX) boolean array of the urban cells.
+        """
+        coins = self.rng.integers(0, 2, size=(self.simSizeY, self.simSizeX))
+        return urbanMask(self.calcUrbanDistance(), self.simSettings.urbanRadius, coins)
+
+    def getSeedGrids(self):
+        """
+        Works out which cells start infected, from the scenario if there is one and otherwise by asking the user.
+        :return: tuple(numpy.ndarray, numpy.ndarray) = fraction of people infected in every cell, and whether every
+        cell starts infected. See Scenario.getSeedGrids.
+        """
+        scenario = self.scenario
+        if scenario is None:
+            userInput = self.getUserInput()
+            scenario = Scenario.fromUserInput(userInput[0], userInput[1])
+        return scenario.getSeedGrids(self.simSizeX, self.simSizeY, self.rng)
+
     def drawSimulation(self, graphics, initialise):
-        cells = self.cells
-        drawSetting = self.graphMode
-        uPop = self.uPop
-        surrPop = self.surrPop
-        maxPop = ((uPop + surrPop) / (self.simSizeX * self.simSizeY)) * 5
+        if self.drawMode == 1:
+            self.drawRaster(graphics, initialise)
+        else:
+            self.drawCells(graphics, initialise)
+
+    def drawRaster(self, graphics, initialise):
+        """
+        Draws the whole field as one image, which is replaced in a single step every day.
+        :param graphics: GraphWin = window to draw in.
+        :param initialise: bool = whether this is the first day drawn.
+        :return: None
+        """
         if initialise:
-            print("Drawing cells...")
-            for y in range(self.simSizeY):
-                for x in range(self.simSizeX):
-                    cell = cells[y][x]
-
-                    if cell.isUrban:
-                        cell.setOutline("Black")
-                    else:
-                        cell.setOutline("White")
-
-                    if drawSetting == 0:
-                        colVariable = cell.infFraction * 255
-                    elif drawSetting == 1:
-                        colVariable = (cell.population / maxPop) * 255
-                    else:
-                        print("Draw setting invalid, fall back to infection drawing.")
-                        colVariable = cell.infFraction * 255
-
-                    red = 255
-                    green = int(255 - colVariable)
-                    blue = int(255 - colVariable)
-                    colour = color_rgb(red, green, blue)
-                    cell.setFill(colour)
-                    cell.draw(graphics)
+            self.logger.log(PHASE, "Drawing cells...")
+            c = self.coordScale
+            width = self.simSizeX * c
+            height = self.simSizeY * c
+            self.frameRenderer = None
+            graphicsModule = loadGraphics()
+            self.rasterView = graphicsModule.Image(graphicsModule.Point(width / 2, height / 2), width, height)
         else:
-            print("Updating cells...")
-            for y in range(self.simSizeY):
-                for x in range(self.simSizeX):
-                    cell = cells[y][x]
-                    if drawSetting == 0:
-                        colVariable = cell.infFraction * 255
-                    elif drawSetting == 1:
-                        colVariable = (cell.population / maxPop) * 255
-                    else:
-                        print("Draw setting invalid, fall back to infection drawing.")
-                        colVariable = cell.infFraction * 255
-
-                    red = 255
-                    green = int(255 - colVariable)
-                    blue = int(255 - colVariable)
-                    colour = color_rgb(red, green, blue)
-                    cell.setFill(colour)
-
-    def makeCell(self, x, y, infectionFraction, settings):
+            self.logger.log(PHASE, "Updating cells...")
+
+        self.rasterView.img.configure(data=base64.b64encode(self.renderRaster()).decode("ascii"), format="ppm")
+        if initialise:
+            self.rasterView.draw(graphics)
+        graphics.flush()
+
+    def renderRaster(self):
+        """
+        Renders the image drawRaster shows, without needing a window.
+        :return: bytes = the field as a PPM image.
+        """
+        if self.frameRenderer is None:
+            self.frameRenderer = FrameRenderer(self.getCellGrids(["isUrban"])["isUrban"], self.coordScale)
+        return encodePpm(self.frameRenderer.render(self.calcColourIndices()))
+
+    def calcColourIndices(self):
+        """
+        :return: numpy.ndarray = (simSizeY, simSizeX) index into the colour table of every cell, see colourIndices.
+        """
+        grids = self.getCellGrids(["infFraction", "population"])
+        maxPop = ((self.uPop + self.surrPop) / (self.simSizeX * self.simSizeY)) * 5
+        return colourIndices(grids["infFraction"], grids["population"], self.graphMode, maxPop)
+
+    def drawCells(self, graphics, initialise):
+        """
+        Draws every cell as its own rectangle, outlined black if it is urban.
+        :param graphics: GraphWin = window to draw in.
+        :param initialise: bool = whether this is the first day drawn.
+        :return: None
+        """
+        graphicsModule = loadGraphics()
+        grids = self.getCellGrids(["infFraction", "population", "isUrban"])
+        maxPop = ((self.uPop + self.surrPop) / (self.simSizeX * self.simSizeY)) * 5
         c = self.coordScale
-        p1 = Point(x * c, y * c)
-        p2 = Point((x * c) + c, (y * c) + c)
-        newCell = Cell(p1, p2, infectionFraction, settings, [self.simSizeX, self.simSizeY])
-        print("New cell at %s, %s created with infection fraction of %s" % (x, y, infectionFraction))
+        # Autoflush is held back until every cell has been changed
+        with graphics.batch():
+            if initialise:
+                self.logger.log(PHASE, "Drawing cells...")
+                self.cellViews = []
+                for y in range(self.simSizeY):
+                    row = []
+                    for x in range(self.simSizeX):
+                        view = graphicsModule.Rectangle(graphicsModule.Point(x * c, y * c),
+                                                        graphicsModule.Point((x * c) + c, (y * c) + c))
+                        if grids["isUrban"][y][x]:
+                            view.setOutline("Black")
+                        else:
+                            view.setOutline("White")
+                        view.setFill(self.calcCellColour(grids["infFraction"][y][x], grids["population"][y][x],
+                                                         maxPop))
+                        view.draw(graphics)
+                        row.append(view)
+                    self.cellViews.append(row)
+            else:
+                self.logger.log(PHASE, "Updating cells...")
+                for y in range(self.simSizeY):
+                    for x in range(self.simSizeX):
+                        colour = self.calcCellColour(grids["infFraction"][y][x], grids["population"][y][x], maxPop)
+                        self.cellViews[y][x].setFill(colour)
+
+    def calcCellColour(self, infFraction, population, maxPop):
+        """
+        Works out the colour a cell should be drawn with for the current graph mode.
+        :param infFraction: float = fraction of the cell's population that is infected.
+        :param population: int = population of the cell.
+        :param maxPop: float = population drawn at full intensity.
+        :return: str = Tk colour string.
+        """
+        drawSetting = self.graphMode
+        if drawSetting == 0:
+            colVariable = infFraction * 255
+        elif drawSetting == 1:
+            colVariable = (population / maxPop) * 255
+        else:
+            self.logger.log(SUMMARY, "Draw setting invalid, fall back to infection drawing.")
+            colVariable = infFraction * 255
+
+        red = 255
+        green = int(255 - colVariable)
+        blue = int(255 - colVariable)
+        colour = loadGraphics().color_rgb(red, green, blue)
+        return colour
+
+    def makeCell(self, x, y, infectionFraction, isUrban):
+        newCell = Cell(x, y, infectionFraction, isUrban)
+        if self.logCells:
+            self.logger.log(CELL, "New cell at %s, %s created with infection fraction of %s", x, y, infectionFraction)
 
         return newCell
 
     def getSetting(self, setting):
-        value = self.simSettings[self.simSettings.index(setting) + 1]
+        value = self.simSettings.getSetting(setting)
 
         return value
 
     def stepTime(self, t):
-        print("Simulating day %s..." % t)
-        writeToFile = self.createFile
+        self.logger.log(PHASE, "Simulating day %s...", t)
         cells = self.cells
-        newCells = copy.deepcopy(cells)
+        newCells = self.backCells
         self.newRecovered = 0
         self.newInfected = 0
         self.newDead = 0
 
-        for y in range(self.simSizeY):
-            for x in range(self.simSizeX):
-                cell = cells[y][x]
-                self.spreadDisease(cell, newCells, x, y, t)
-
-        for y in range(self.simSizeY):
-            for x in range(self.simSizeX):
-                cell = cells[y][x]
-                self.killDisease(cell, x, y, t)
-
-        for y in range(self.simSizeY):
-            for x in range(self.simSizeX):
-                cell = newCells[y][x]
-                self.updateCellData(cell, x, y)
-
-        self.cells.clear()
-        self.cells = copy.deepcopy(newCells)
+        # Only the active cells can change, so every other cell is already the same in both matrices
+        positions = [divmod(i, self.simSizeX) for i in self.activeCells.tolist()]
+        self.steppedCells = len(positions)
+        for y, x in positions:
+            newCells[y][x].copyStateFrom(cells[y][x])
+        self.cohorts.advance(t, self.activeCells)
+
+        # The random numbers of every phase are drawn for all active cells at once
+        amount = len(positions)
+        self.growthFactors = self.rng.uniform(0, self.spreadRate, size=amount).tolist()
+        newPplInfected = [self.calcNewInfections(cells[y][x], i, t) for i, (y, x) in enumerate(positions)]
+        # Split every cell's new infections over its 3x3 neighbourhood
+        self.peoplePerNeighbour = self.rng.multinomial(np.array(newPplInfected, dtype=np.int64),
+                                                       NEIGHBOUR_PROBABILITIES).tolist()
+
+        for i, (y, x) in enumerate(positions):
+            cell = cells[y][x]
+            self.spreadDisease(cell, newCells, i, x, y, t)
+        newInfected = [newCells[y][x].infectedPop - cells[y][x].infectedPop for y, x in positions]
+        self.cohorts.record(t, self.activeCells, np.array(newInfected, dtype=np.int64))
+
+        self.reductions = self.calcReductions(t, self.activeCells).tolist()
+        for i, (y, x) in enumerate(positions):
+            cell = newCells[y][x]
+            self.killDisease(cell, i, x, y, t)
+
+        newlyInfected = []
+        for y, x in positions:
+            cell = newCells[y][x]
+            if self.updateCellData(cell, x, y):
+                newlyInfected.append(y * self.simSizeX + x)
+        self.addActiveCells(np.array(newlyInfected, dtype=np.int64))
+
+        self.cells = newCells
+        self.backCells = cells
 
         self.calcStats()
 
-        if writeToFile == 1:
-            self.writeStats(t)
-        print("Day = %s, Current Population = %s, Total Infection Cases = %s, Currently Infected = %s, Percentage "
-              "Currently Infected = %s, New Infected Today = %s, Total Dead = %s, New Dead Today = %s, "
-              "Total Recovered = %s, New Recovered Today = %s" % (t, self.population, self.totCases,
-                                                                  self.totInfected, self.percentageInfected,
-                                                                  self.newInfected, self.totDead, self.newDead,
-                                                                  self.totRecovered, self.newRecovered))
+        self.recordDay(t)
+        self.printStats(t)
+
+    def printStats(self, t):
+        self.logger.log(SUMMARY, "Day = %s, Current Population = %s, Total Infection Cases = %s, "
+                        "Currently Infected = %s, Percentage Currently Infected = %s, New Infected Today = %s, "
+                        "Total Dead = %s, New Dead Today = %s, Total Recovered = %s, New Recovered Today = %s",
+                        t, self.population, self.totCases, self.totInfected, self.percentageInfected, self.newInfected,
+                        self.totDead, self.newDead, self.totRecovered, self.newRecovered)
 
-    def spreadDisease(self, cell, newCells, x, y, t):
-        print("Spreading disease on cell at %s, %s..." % (x, y), end="\r")
-        growthFactor = random.uniform(0, self.spreadRate)
+    def calcNewInfections(self, cell, i, t):
+        growthFactor = self.growthFactors[i]
 
         if t > self.daysBeforeQuarantine:
-            newPplInfected = int(((cell.population * cell.infFraction) * (1 - self.fracToQuarantine)) * growthFactor)
+            newPplInfected = int(((cell.population * cell.infFraction) * self.quarantineMultiplier) * growthFactor)
         else:
             newPplInfected = int(cell.population * cell.infFraction * growthFactor)
 
-        if cell.amountOfMasksType1 != 0:
-            newPplInfected -= newPplInfected * (cell.amountOfMasksType1 / cell.population) * (1 - self.mask1Prob)
-            newPplInfected = int(newPplInfected)
-        elif cell.amountOfMasksType2 != 0:
-            newPplInfected -= newPplInfected * (cell.amountOfMasksType2 / cell.population) * (1 - self.mask2Prob)
-            newPplInfected = int(newPplInfected)
-        elif cell.amountOfMasksType3 != 0:
-            newPplInfected -= newPplInfected * (cell.amountOfMasksType3 / cell.population) * (1 - self.mask3Prob)
-            newPplInfected = int(newPplInfected)
-        else:
-            pass
-
-        checkNewPplInfected = newPplInfected
-        quotient = 1
-        power = - 1
-        while quotient != 0:
-            quotient = int(checkNewPplInfected / 10)
-            checkNewPplInfected = quotient
-            power += 1
-
-        amountOfPeopleToAdd = int(10 ** (power - 1))
-        if power - 1 < 0:
-            amountOfPeopleToAdd = 1
+        # Only the first mask type present in a cell has an effect. Masks left in a cell nobody lives in any more
+        # cover nobody, as in GridSimulation.calcIncoming
+        for amountOfMasks, maskFactor in ((cell.amountOfMasksType1, self.maskFactors[0]),
+                                          (cell.amountOfMasksType2, self.maskFactors[1]),
+                                          (cell.amountOfMasksType3, self.maskFactors[2])):
+            if amountOfMasks != 0:
+                maskFraction = amountOfMasks / cell.population if cell.population != 0 else 0.0
+                newPplInfected = int(newPplInfected - newPplInfected * maskFraction * maskFactor)
+                break
 
-        for i in range(0, newPplInfected, amountOfPeopleToAdd):
-            randX = randint(-1, 1)
-            randY = randint(-1, 1)
-            newInfectedAdded = amountOfPeopleToAdd
+        return max(newPplInfected, 0)
 
-            try:
-                if x + randX == -1 or y + randY == -1:
-                    raise IndexError
+    def spreadDisease(self, cell, newCells, i, x, y, t):
+        if self.logCells:
+            self.logger.log(CELL, "Spreading disease on cell at %s, %s...", x, y)
+        peoplePerNeighbour = self.peoplePerNeighbour[i]
+        targets = self.spreadTargets[:, y, x]
 
-                editedCell = newCells[y + randY][x + randX]
+        for newInfectedAdded, target in zip(peoplePerNeighbour, targets.tolist()):
+            if newInfectedAdded == 0 or target < 0:
+                continue
 
-                if newInfectedAdded + editedCell.infectedPop > editedCell.population:
-                    newInfectedAdded = abs(editedCell.population - editedCell.infectedPop)
-                    editedCell.infectedPop += newInfectedAdded
-                    self.newInfected += newInfectedAdded
-                else:
-                    editedCell.infectedPop += newInfectedAdded
-                    self.newInfected += newInfectedAdded
-
-                try:
-                    editedCell.infFraction = round(editedCell.infectedPop / editedCell.population, 4)
-                except ZeroDivisionError:
-                    editedCell.infFraction = 0
-
-            except IndexError:
-                editedCell = newCells[y][x]
-                newInfectedAdded = amountOfPeopleToAdd
-
-                if newInfectedAdded + editedCell.infectedPop > editedCell.population:
-                    newInfectedAdded = abs(editedCell.population - editedCell.infectedPop)
-                    editedCell.infectedPop += newInfectedAdded
-                    self.newInfected += newInfectedAdded
-                else:
-                    editedCell.infectedPop += newInfectedAdded
-                    self.newInfected += newInfectedAdded
+            editedCell = newCells[target // self.simSizeX][target % self.simSizeX]
+            if newInfectedAdded + editedCell.infectedPop > editedCell.population:
+                newInfectedAdded = abs(editedCell.population - editedCell.infectedPop)
+            editedCell.infectedPop += newInfectedAdded
+            self.newInfected += newInfectedAdded
 
-                try:
-                    editedCell.infFraction = round(editedCell.infectedPop / editedCell.population, 4)
-                except ZeroDivisionError:
-                    editedCell.infFraction = 0
+            try:
+                editedCell.infFraction = round(editedCell.infectedPop / editedCell.population, 4)
+            except ZeroDivisionError:
+                editedCell.infFraction = 0
 
     def updateCellData(self, cell, x, y):
-        print("Updating cell data for cell at %s, %s..." % (x, y), end="\r")
+        """
+        :return: bool = whether the cell has just been infected.
+        """
+        if self.logCells:
+            self.logger.log(CELL, "Updating cell data for cell at %s, %s...", x, y)
         if cell.isInfected:
             cell.age += 1
         elif not cell.isInfected and cell.infectedPop != 0:
             cell.isInfected = True
+            return True
         elif not cell.isInfected and cell.infectedPop == 0:
             cell.isInfected = False
             cell.age = 0
+        return False
 
-    def killDisease(self, cell, x, y, t):
-        print("Calculating reduction of disease at %s, %s..." % (x, y), end="\r")
-        minIncPeriod = self.minIncubation
-        maxIncPeriod = self.maxIncubation
-        recTime = self.recTime
+    def killDisease(self, cell, i, x, y, t):
+        if self.logCells:
+            self.logger.log(CELL, "Calculating reduction of disease at %s, %s...", x, y)
         deathRate = self.deathRate
         recRate = self.recRate
-        reductionRate = self.reductionRate
-        diseaseLifetime = randint(minIncPeriod, maxIncPeriod + recTime)
+        # Taken out of the cell's infection cohorts by calcReductions
+        reductionInInfectedPop = self.reductions[i]
 
-        if t >= diseaseLifetime:
-            reductionInInfectedPop = cell.infectedPop * random.uniform(0, reductionRate)
+        if reductionInInfectedPop > 0:
             cell.infectedPop -= reductionInInfectedPop
-            if cell.infectedPop < 0:
-                reductionInInfectedPop = cell.infectedPop
-                cell.infectedPop = 0
 
             deaths = int(reductionInInfectedPop * deathRate)
             self.newDead += deaths
@@ -476,12 +751,94 @@ class Simulation:
         self.totRecovered += self.newRecovered
         self.percentageInfected = round(100 * self.totInfected / self.population, 4)
 
-    def writeStats(self, t):
-        data = [t, self.population, self.totCases, self.totInfected, self.percentageInfected, self.newInfected,
+    def getStats(self, t):
+        """
+        :param t: int = day the stats are for.
+        :return: list = the stats of the day, in the order of the data file columns (DATA_HEADER).
+        """
+        return [t, self.population, self.totCases, self.totInfected, self.percentageInfected, self.newInfected,
                 self.totDead, self.newDead, self.totRecovered, self.newRecovered]
-        with open("data.csv", "a", newline="") as dataFile:
-            csvWrite = csv.writer(dataFile)
-            csvWrite.writerow(data)
+
+    def recordDay(self, t):
+        """
+        Writes the outputs of a day that were asked for in the settings.
+        :param t: int = day that has just been simulated.
+        :return: None
+        """
+        if self.createFile == 1:
+            self.writeStats(t)
+        if self.recordSnapshots == 1:
+            self.recordSnapshot(t)
+        if self.exportFrames != EXPORT_NONE and t % self.exportFrameDays == 0:
+            self.exportFrame(t)
+
+    def openStats(self):
+        """
+        Creates the data file and writes its header. Rows are written by writeStats until closeStats is called.
+        :return: None
+        """
+        self.closeStats()
+        resumeFrom = None
+        if self.resumeFrom is not None and os.path.exists(self.dataFile):
+            resumeFrom = self.resumeFrom["dataFile"]
+        self.statsWriter = makeStatsWriter(self.dataFile, DATA_HEADER, self.simSettings.dataFormat,
+                                           self.simSettings.dataFlushDays, resumeFrom)
+
+    def writeStats(self, t):
+        if self.statsWriter is None:
+            self.openStats()
+        self.statsWriter.write(self.getStats(t))
+
+    def closeStats(self):
+        if self.statsWriter is not None:
+            self.statsWriter.close()
+            self.statsWriter = None
+
+    def openSnapshots(self):
+        """
+        Creates the snapshot file with room for every day of the run. A resumed run carries on the file of the run it
+        was saved from, grown if it now runs for longer.
+        :return: None
+        """
+        self.closeSnapshots()
+        if self.resumeFrom is not None and os.path.exists(self.snapshotFile):
+            header = loadSnapshots(self.snapshotFile)[0]
+            if (header.get("seed"), header.get("spawnKey"), header["shape"][1:]) != (
+                    self.seedSequence.entropy, list(self.seedSequence.spawn_key), [self.simSizeY, self.simSizeX]):
+                raise ValueError("The snapshot file %s was recorded by another run, so it is not continued"
+                                 % self.snapshotFile)
+            self.snapshotRecorder = SnapshotRecorder.fromFile(self.snapshotFile, self.runTime)
+            return
+        metadata = {"settings": self.simSettings.toDict(), "seed": self.seedSequence.entropy,
+                    "spawnKey": list(self.seedSequence.spawn_key)}
+        self.snapshotRecorder = SnapshotRecorder(self.snapshotFile, self.runTime, self.simSizeX, self.simSizeY,
+                                                 metadata)
+
+    def recordSnapshot(self, t):
+        if self.snapshotRecorder is None:
+            self.openSnapshots()
+        self.snapshotRecorder.record(t, self.getCellGrids(SNAPSHOT_FIELDS))
+
+    def closeSnapshots(self):
+        if self.snapshotRecorder is not None:
+            self.snapshotRecorder.close()
+            self.snapshotRecorder = None
+
+    def exportFrame(self, t):
+        """
+        Saves a picture of the field, coloured the same way as drawSimulation, without using Tk.
+        :param t: int = day the picture is of.
+        :return: None
+        """
+        if self.frameExporter is None:
+            self.frameExporter = makeFrameExporter(self.exportFrames, self.framePath,
+                                                   self.getCellGrids(["isUrban"])["isUrban"], self.coordScale)
+        self.frameExporter.write(t, self.calcColourIndices())
+
+    def closeFrames(self):
+        if self.frameExporter is not None:
+            self.frameExporter.close()
+            self.frameExporter = None
 
     def runSimulation(self):
         runTime = self.runTime
@@ -496,22 +853,32 @@ class Simulation:
             pass
 
         if writeFile == 1:
-            header = ["Day", "Current Population", "Total Infection Cases", "Currently Infected",
-                      "Percentage Currently Infected", "New Infected Today", "Total Dead", "New Dead Today",
-                      "Total Recovered", "New Recovered Today"]
-            with open("data.csv", "w", newline="") as dataFile:
-                csvWrite = csv.writer(dataFile)
-                csvWrite.writerow(header)
+            self.openStats()
+        if self.recordSnapshots == 1:
+            self.openSnapshots()
 
         if drawSim == 1:
-            win = GraphWin("Coronavirus", self.simSizeX * coordScaling, self.simSizeY * coordScaling)
-
-        for t in range(runTime):
-            if t == 0 and drawSim:
-                self.drawSimulation(win, initialise=True)
-            elif t != 0 and drawSim:
-                self.drawSimulation(win, initialise=False)
-            self.stepTime(t)
-            if slowRun:
-                input("Press enter to continue.")
-                continue
+            win = loadGraphics().GraphWin("Coronavirus", self.simSizeX * coordScaling, self.simSizeY * coordScaling)
+
+        progress = self.logger.makeProgressBar(runTime)
+        try:
+            for t in range(self.startDay, runTime):
+                if t == self.startDay and drawSim:
+                    self.drawSimulation(win, initialise=True)
+                elif t != self.startDay and drawSim:
+                    self.drawSimulation(win, initialise=False)
+                self.stepTime(t)
+                if self.checkpointDays and (t + 1) % self.checkpointDays == 0:
+                    self.saveCheckpoint(t + 1)
+                progress.update(t + 1, self.steppedCells)
+                if slowRun:
+                    input("Press enter to continue.")
+                    continue
+        finally:
+            # Written out even if the run is interrupted
+            self.closeStats()
+            self.closeSnapshots()
+            self.closeFrames()
+            if self.profiler is not None:
+                self.profiler.close()
+        progress.finish()
@@ -0,0 +1,132 @@
+import json
+import os
+import numpy as np
+
+# First bytes of a snapshot file
+SNAPSHOT_MAGIC = b"DISEASE-SNAPSHOTS\n"
+# The header is padded to a multiple of this, so the arrays after it are page aligned
+SNAPSHOT_ALIGNMENT = 4096
+
+# Cell attributes recorded every day and the type they are stored as
+SNAPSHOT_FIELDS = {"infectedPop": np.int64, "population": np.int64, "infFraction": np.float64}
+
+
+class SnapshotRecorder:
+    """
+    Records the per cell grids of every day of a run to one memory mapped file, so long runs can be analysed cell by
+    cell afterwards without keeping every day in memory or simulating them again.
+
+    The file starts with SNAPSHOT_MAGIC and a JSON header holding the settings, seed, shape, dtype and offset of
+    every field, padded to SNAPSHOT_ALIGNMENT bytes. Every field follows as a (days, simSizeY, simSizeX) array. The
+    file is created at full size when the recorder is made, and each day is copied straight from the engine's
+    arrays into the mapped file.
+    """
+    def __init__(self, path, days, simSizeX, simSizeY, metadata=None):
+        """
+        :param path: str = path of the snapshot file, overwritten if it exists.
+        :param days: int = amount of days room is made for.
+        :param simSizeX: int = side length of the simulation in x-direction.
+        :param simSizeY: int = side length of the simulation in y-direction.
+        :param metadata: dict = extra header entries, such as the settings and seed of the run.
+        """
+        self.path = path
+        self.days = days
+        shape = (days, simSizeY, simSizeX)
+        header = dict(metadata or {})
+        header["shape"] = list(shape)
+        header["fields"] = {}
+        offset = 0
+        for name, dtype in SNAPSHOT_FIELDS.items():
+            dtype = np.dtype(dtype)
+            header["fields"][name] = {"dtype": dtype.str, "offset": offset}
+            offset += int(np.prod(shape)) * dtype.itemsize
+
+        headerBytes = SNAPSHOT_MAGIC + json.dumps(header).encode("utf-8") + b"\n"
+        headerBytes += b" " * (-len(headerBytes) % SNAPSHOT_ALIGNMENT)
+        with open(path, "wb") as snapshotFile:
+            snapshotFile.write(headerBytes)
+            snapshotFile.truncate(len(headerBytes) + offset)
+
+        self.header = header
+        self.arrays = mapFields(path, header, len(headerBytes), "r+")
+
+    @classmethod
+    def fromFile(cls, path, days=None):
+        """
+        Opens an existing snapshot file to record more days into it, for example after resuming from a checkpoint.
+        :param path: str = path of the snapshot file.
+        :param days: int = amount of days room is needed for. The file is grown if it has room for fewer days.
+        :return: SnapshotRecorder
+        """
+        if days is not None and days > loadSnapshots(path)[0]["shape"][0]:
+            growSnapshots(path, days)
+        recorder = cls.__new__(cls)
+        recorder.path = path
+        recorder.header, recorder.arrays = loadSnapshots(path, "r+")
+        recorder.days = recorder.header["shape"][0]
+        return recorder
+
+    def flush(self):
+        for array in self.arrays.values():
+            array.flush()
+
+    def record(self, t, grids):
+        """
+        :param t: int = day the grids are for.
+        :param grids: dict = (simSizeY, simSizeX) array or nested list of every SNAPSHOT_FIELDS attribute.
+        :return: None
+        """
+        if t >= self.days:
+            raise ValueError("The snapshot file %s only has room for %s days, not day %s" % (self.path, self.days, t))
+        for name, array in self.arrays.items():
+            array[t] = grids[name]
+
+    def close(self):
+        self.flush()
+        self.arrays = {}
+
+
+def growSnapshots(path, days):
+    """
+    Rewrites a snapshot file with room for more days. The days recorded so far are copied one at a time, so the file
+    is never read into memory as a whole.
+    :param path: str = path of the snapshot file.
+    :param days: int = amount of days room is made for.
+    :return: None
+    """
+    header, arrays = loadSnapshots(path)
+    recordedDays, simSizeY, simSizeX = header["shape"]
+    metadata = {key: value for key, value in header.items() if key not in ("shape", "fields")}
+    grownPath = path + ".grow"
+    grown = SnapshotRecorder(grownPath, days, simSizeX, simSizeY, metadata)
+    for t in range(recordedDays):
+        grown.record(t, {name: array[t] for name, array in arrays.items()})
+    grown.close()
+    # The old file has to be unmapped before it is replaced
+    del arrays
+    os.replace(grownPath, path)
+
+
+def mapFields(path, header, dataOffset, mode="r"):
+    arrays = {}
+    shape = tuple(header["shape"])
+    for name, field in header["fields"].items():
+        arrays[name] = np.memmap(path, dtype=np.dtype(field["dtype"]), mode=mode, offset=dataOffset + field["offset"],
+                                 shape=shape)
+    return arrays
+
+
+def loadSnapshots(path, mode="r"):
+    """
+    Opens a snapshot file without reading the grids into memory.
+    :param path: str = path of the snapshot file.
+    :param mode: str = "r" for read only, "r+" to change the file.
+    :return: tuple(dict, dict) = the header, and a (days, simSizeY, simSizeX) memory mapped array of every field.
+    """
+    with open(path, "rb") as snapshotFile:
+        if snapshotFile.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError("%s is not a snapshot file" % path)
+        header = json.loads(snapshotFile.readline().decode("utf-8"))
+        headerLength = snapshotFile.tell()
+    dataOffset = headerLength + (-headerLength % SNAPSHOT_ALIGNMENT)
+    return header, mapFields(path, header, dataOffset, mode)
@@ -0,0 +1,246 @@
+import csv
+import hashlib
+import io
+import json
+import numpy as np
+
+# Formats of the data file (DATA_FILE_FORMAT setting)
+FORMAT_CSV = 0
+FORMAT_JSON_LINES = 1
+FORMAT_BINARY = 2
+
+DATA_FILE_EXTENSIONS = {FORMAT_CSV: ".csv", FORMAT_JSON_LINES: ".jsonl", FORMAT_BINARY: ".npy"}
+
+
+class StatsWriter:
+    """
+    Writes the daily stats of one run to its data file. The file is opened once, rows are kept in memory and written
+    out every flushDays rows and when the writer is closed.
+    """
+    newline = None
+    binary = False
+
+    def __init__(self, path, header, flushDays=0, resumeFrom=None):
+        """
+        :param path: str = path of the data file, overwritten if it exists.
+        :param header: list(str) = names of the columns.
+        :param flushDays: int = rows kept before they are written out, only when closed if 0.
+        :param resumeFrom: tuple(int, int, str) = size of the file, amount of rows written and digest of the rows, as
+        returned by position when a checkpoint was saved. The file is cut back to that size and continued instead of
+        overwritten. A file that does not start with the header and those rows is left alone and ValueError is
+        raised.
+        """
+        self.path = path
+        self.header = list(header)
+        self.flushDays = flushDays
+        self.rows = []
+        self.rowsWritten = 0
+        mode = "w" if resumeFrom is None else "r+"
+        if self.binary:
+            self.file = open(path, mode + "b")
+        else:
+            self.file = open(path, mode, newline=self.newline)
+        self.prepare()
+        if resumeFrom is None:
+            self.writeHeader()
+            return
+        size, self.rowsWritten = resumeFrom[:2]
+        with open(path, "rb") as dataFile:
+            start = dataFile.read(size)
+        # Checkpoints saved before the digest was added only have the size and rows to go by
+        digest = resumeFrom[2] if len(resumeFrom) > 2 else None
+        if (len(start) != size or not self.matchesStart(start, self.rowsWritten)
+                or digest not in (None, self.digest(start))):
+            self.file.close()
+            raise ValueError("The data file %s does not hold the rows of the checkpoint, so it is not continued" % path)
+        self.resume(size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def prepare(self):
+        pass
+
+    def writeHeader(self):
+        pass
+
+    def matchesStart(self, start, rows):
+        """
+        :param start: bytes = start of an existing data file.
+        :param rows: int = amount of rows the start should hold.
+        :return: bool = whether start is the header and rows written by this kind of writer.
+        """
+        return start.count(b"\n") == rows
+
+    def digest(self, start):
+        """
+        :param start: bytes = start of the data file.
+        :return: str = digest of the rows in it, which no later write changes.
+        """
+        return hashlib.sha1(start).hexdigest()
+
+    def resume(self, size):
+        self.file.truncate(size)
+        self.file.seek(size)
+
+    def writeRows(self, rows):
+        raise NotImplementedError
+
+    def write(self, row):
+        """
+        :param row: list = one day's stats, in the order of the header.
+        :return: None
+        """
+        self.rows.append(row)
+        if self.flushDays and len(self.rows) >= self.flushDays:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.writeRows(self.rows)
+            self.rowsWritten += len(self.rows)
+            self.rows = []
+        self.file.flush()
+
+    def position(self):
+        """
+        Writes out every row kept in memory.
+        :return: tuple(int, int, str) = size of the file, amount of rows written and digest of the rows, for resuming
+        the file later.
+        """
+        self.flush()
+        size = self.file.tell()
+        with open(self.path, "rb") as dataFile:
+            return size, self.rowsWritten, self.digest(dataFile.read(size))
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+
+
+class CsvStatsWriter(StatsWriter):
+    newline = ""
+
+    def prepare(self):
+        self.csvWrite = csv.writer(self.file)
+
+    def writeHeader(self):
+        self.csvWrite.writerow(self.header)
+
+    def matchesStart(self, start, rows):
+        header = io.StringIO(newline="")
+        csv.writer(header).writerow(self.header)
+        return start.startswith(header.getvalue().encode("utf-8")) and start.count(b"\n") == rows + 1
+
+    def writeRows(self, rows):
+        self.csvWrite.writerows(rows)
+
+
+class JsonLinesStatsWriter(StatsWriter):
+    """
+    Writes one JSON object per day, keyed by column name.
+    """
+    def matchesStart(self, start, rows):
+        if not super().matchesStart(start, rows):
+            return False
+        return rows == 0 or list(json.loads(start.split(b"\n", 1)[0])) == self.header
+
+    def writeRows(self, rows):
+        self.file.write("".join(json.dumps(dict(zip(self.header, row))) + "\n" for row in rows))
+
+
+class BinaryStatsWriter(StatsWriter):
+    """
+    Writes a NumPy .npy file of records with one field per column, so the data file can be read with numpy.load and
+    every column taken out by name. The header is rewritten with the amount of rows at every flush, so the file can
+    be read while the simulation is still running.
+    """
+    binary = True
+    # Room for the amount of rows in the header, so the header keeps the same length as the file grows
+    SHAPE_WIDTH = 20
+
+    def prepare(self):
+        self.dtype = np.dtype([(name, np.float64 if "Percentage" in name else np.int64) for name in self.header])
+
+    def writeHeader(self):
+        self.file.write(self.makeHeader(0))
+
+    def matchesStart(self, start, rows):
+        startFile = io.BytesIO(start)
+        try:
+            np.lib.format.read_magic(startFile)
+            dtype = np.lib.format.read_array_header_1_0(startFile)[2]
+        except ValueError:
+            return False
+        return dtype == self.dtype and len(start) == startFile.tell() + rows * self.dtype.itemsize
+
+    def digest(self, start):
+        # The header counts the rows, which grows after the checkpoint
+        return super().digest(start[len(self.makeHeader(0)):])
+
+    def resume(self, size):
+        super().resume(size)
+        # The header may count rows written after the checkpoint
+        self.file.seek(0)
+        self.file.write(self.makeHeader(self.rowsWritten))
+        self.file.seek(size)
+
+    def makeHeader(self, rows):
+        header = "{'descr': %r, 'fortran_order': False, 'shape': (%*d,), }" % (
+            np.lib.format.dtype_to_descr(self.dtype), self.SHAPE_WIDTH, rows)
+        # The magic string, version and header length take 10 bytes and the whole header is padded to 64 bytes
+        header += " " * (-(10 + len(header) + 1) % 64) + "\n"
+        return np.lib.format.magic(1, 0) + np.uint16(len(header)).tobytes() + header.encode("latin1")
+
+    def writeRows(self, rows):
+        records = np.array([tuple(row) for row in rows], dtype=self.dtype)
+        self.file.write(records.tobytes())
+        end = self.file.tell()
+        self.file.seek(0)
+        self.file.write(self.makeHeader(self.rowsWritten + len(rows)))
+        self.file.seek(end)
+
+
+STATS_WRITERS = {FORMAT_CSV: CsvStatsWriter, FORMAT_JSON_LINES: JsonLinesStatsWriter,
+                 FORMAT_BINARY: BinaryStatsWriter}
+
+
+def makeStatsWriter(path, header, dataFormat=FORMAT_CSV, flushDays=0, resumeFrom=None):
+    """
+    :param path: str = path of the data file.
+    :param header: list(str) = names of the columns.
+    :param dataFormat: int = FORMAT_CSV, FORMAT_JSON_LINES or FORMAT_BINARY.
+    :param flushDays: int = rows kept before they are written out, only when closed if 0.
+    :param resumeFrom: tuple(int, int) = position of the file to continue from, see StatsWriter.
+    :return: StatsWriter
+    """
+    return STATS_WRITERS[dataFormat](path, header, flushDays, resumeFrom)
+
+
+def readStats(path, dataFormat=FORMAT_CSV):
+    """
+    Reads a data file written by a StatsWriter.
+    :param path: str = path of the data file.
+    :param dataFormat: int = format the file was written in.
+    :return: list(list) = the rows of the file, without the header, as numbers.
+    """
+    if dataFormat == FORMAT_BINARY:
+        return [list(record) for record in np.load(path).tolist()]
+
+    rows = []
+    with open(path, "r", newline="") as dataFile:
+        if dataFormat == FORMAT_JSON_LINES:
+            for line in dataFile:
+                if line.strip():
+                    rows.append(list(json.loads(line).values()))
+        else:
+            reader = csv.reader(dataFile)
+            next(reader, None)
+            for row in reader:
+                rows.append([float(value) if "." in value else int(value) for value in row])
+    return rows
@@ -0,0 +1,209 @@
+import csv
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import time
+import traceback
+from Data.GridSimulation import *
+
+SUMMARY_HEADER = ["Run", "Status", "Seconds", "Final Population", "Total Infection Cases", "Total Dead",
+                  "Total Recovered", "Peak Currently Infected", "Peak Day", "Error"]
+
+
+def loadSweepGrid(path):
+    """
+    Reads a sweep file made of NAME=value1,value2,... lines, using the same names as the settings file. Lines
+    beginning with a hash (#) are ignored. Every combination of the values is simulated.
+    :param path: str = path of the sweep file.
+    :return: dict = list of values, keyed by setting name.
+    """
+    grid = {}
+    with open(path, "r") as sweepFile:
+        rows = csv.reader(sweepFile, delimiter="=")
+        for row in rows:
+            if len(row) == 0 or row[0].strip() == "" or row[0].startswith("#"):
+                continue
+            if len(row) != 2:
+                raise ValueError("Invalid line in %s: %s" % (path, "=".join(row)))
+            grid[row[0].strip()] = [value.strip() for value in row[1].split(",") if value.strip() != ""]
+    return grid
+
+
+def makeSweepJobs(baseConfig, grid, scenario, outputDir, seed=None):
+    """
+    Creates one job for every combination of settings in the grid.
+    :param baseConfig: SimulationConfig = settings shared by every run.
+    :param grid: dict = list of values, keyed by setting name.
+    :param scenario: Scenario = initially infected cells of every run.
+    :param outputDir: str = directory the data file of every run is written to.
+    :param seed: int = seed the seeds of the runs are derived from, random if None. Run i uses
+    spawnSeeds(seed, amount of runs)[i], so it can be repeated on its own with that seed.
+    :return: list(dict) = the jobs, in the order of the summary table. A combination of settings that is not valid gets
+    a job without a config, which fails with the reason under "error" when it is run.
+    """
+    names = list(grid)
+    combinations = list(itertools.product(*(grid[name] for name in names)))
+    seeds = [None] * len(combinations)
+    if seed is not None:
+        seeds = spawnSeeds(seed, len(combinations))
+
+    jobs = []
+    for run, (values, runSeed) in enumerate(zip(combinations, seeds)):
+        settings = dict(zip(names, values))
+        try:
+            config = baseConfig.withSettings(CREATE_DATA_FILE=1, DRAW_SIMULATION=0, RUN_SLOWLY=0, VERBOSITY=0,
+                                             **settings)
+        except (ValueError, TypeError) as error:
+            # Reported as a failed run, so the other combinations are still simulated
+            jobs.append({"run": run, "settings": settings, "config": None, "error": str(error)})
+            continue
+        runPath = os.path.join(outputDir, "run_%s" % run)
+        jobs.append({"run": run, "settings": settings, "config": config, "scenario": scenario, "seed": runSeed,
+                     "dataFile": runPath + DATA_FILE_EXTENSIONS[config.dataFormat], "snapshotFile": runPath + ".dat",
+                     "framePath": runPath + (".gif" if config.exportFrames == EXPORT_GIF else "_frames"),
+                     "metricsFile": runPath + "_metrics.csv"})
+    return jobs
+
+
+def runJob(job):
+    """
+    Runs the simulation of one job and summarises its data file.
+    :param job: dict = job made by makeSweepJobs.
+    :return: dict = final statistics of the run.
+    """
+    if job["config"] is None:
+        raise ValueError(job["error"])
+    simulation = createSimulation(job["config"], scenario=job["scenario"], seed=job["seed"],
+                                  dataFile=job["dataFile"], snapshotFile=job["snapshotFile"],
+                                  framePath=job["framePath"], metricsFile=job["metricsFile"])
+    simulation.runSimulation()
+
+    peakInfected = 0
+    peakDay = 0
+    for row in readStats(job["dataFile"], job["config"].dataFormat):
+        if row[3] > peakInfected:
+            peakInfected = int(row[3])
+            peakDay = int(row[0])
+
+    return {"Final Population": simulation.population, "Total Infection Cases": simulation.totCases,
+            "Total Dead": simulation.totDead, "Total Recovered": simulation.totRecovered,
+            "Peak Currently Infected": peakInfected, "Peak Day": peakDay}
+
+
+def jobProcess(worker, job, connection):
+    """
+    Runs a job in a process started by runJobs and sends (status, results, error) back through connection.
+    :param worker: function(job) = runs a job and returns its results.
+    :param job: dict = job to run.
+    :param connection: multiprocessing.connection.Connection = end of the pipe runJobs reads from.
+    :return: None
+    """
+    try:
+        connection.send(("finished", worker(job), ""))
+    except Exception:
+        connection.send(("failed", {}, traceback.format_exc().strip().splitlines()[-1]))
+    finally:
+        connection.close()
+
+
+def runJobs(jobs, worker, workers=None, timeout=None, logger=None, onResult=None):
+    """
+    Runs jobs in separate processes, at most workers at a time. A job that raises an exception or runs for longer
+    than the timeout is reported without stopping the others.
+    :param jobs: list(dict) = jobs to run, every job needs a "run" number.
+    :param worker: function(job) = runs a job and returns a dict of its results. Exceptions are reported as the error
+    of the job.
+    :param workers: int = maximum amount of processes, the amount of CPUs if None.
+    :param timeout: float = seconds after which a job is stopped, no limit if None.
+    :param logger: Logger = logger for progress messages.
+    :param onResult: function(job, result) = called as every job ends. When it returns True, the jobs that are still
+    running are stopped and the ones that have not started are skipped.
+    :return: list(dict) = results of every job that ended, in the order of jobs.
+    """
+    workers = workers or os.cpu_count() or 1
+    logger = logger or Logger(SILENT)
+    pending = list(jobs)
+    running = {}
+    results = {}
+
+    while pending or running:
+        while pending and len(running) < workers:
+            job = pending.pop(0)
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=jobProcess, args=(worker, job, sender), daemon=True)
+            process.start()
+            sender.close()
+            running[receiver] = (job, process, time.perf_counter())
+
+        multiprocessing.connection.wait(list(running), timeout=1)
+        now = time.perf_counter()
+        for receiver, (job, process, startTime) in list(running.items()):
+            seconds = now - startTime
+            if receiver.poll():
+                try:
+                    status, result, error = receiver.recv()
+                except EOFError:
+                    status, result, error = "failed", {}, "worker exited with code %s" % process.exitcode
+            elif not process.is_alive():
+                status, result, error = "failed", {}, "worker exited with code %s" % process.exitcode
+            elif timeout is not None and seconds > timeout:
+                process.terminate()
+                status, result, error = "timed out", {}, "stopped after %s seconds" % timeout
+            else:
+                continue
+
+            process.join()
+            receiver.close()
+            del running[receiver]
+            result.update({"Run": job["run"], "Status": status, "Seconds": round(seconds, 3), "Error": error})
+            results[job["run"]] = result
+            if error:
+                logger.log(SUMMARY, "Run %s %s after %.1f seconds: %s", job["run"], status, seconds, error)
+            else:
+                logger.log(SUMMARY, "Run %s %s after %.1f seconds.", job["run"], status, seconds)
+
+            if onResult is not None and onResult(job, result):
+                for otherJob, otherProcess, otherStartTime in running.values():
+                    otherProcess.terminate()
+                    otherProcess.join()
+                for otherReceiver in running:
+                    otherReceiver.close()
+                running.clear()
+                pending.clear()
+                break
+
+    return [results[job["run"]] for job in jobs if job["run"] in results]
+
+
+def runSweep(baseConfig, grid, scenario, outputDir, workers=None, timeout=None, seed=None, logger=None):
+    """
+    Simulates every combination of settings in the grid in parallel. Every run writes its own data file to outputDir
+    and one line of summary.csv.
+    :param baseConfig: SimulationConfig = settings shared by every run.
+    :param grid: dict = list of values, keyed by setting name.
+    :param scenario: Scenario = initially infected cells of every run.
+    :param outputDir: str = directory the results are written to.
+    :param workers: int = maximum amount of runs at the same time, the amount of CPUs if None.
+    :param timeout: float = seconds after which a run is stopped, no limit if None.
+    :param seed: int = seed the seeds of the runs are derived from, random if None.
+    :param logger: Logger = logger for progress messages.
+    :return: list(dict) = summary of every run.
+    """
+    os.makedirs(outputDir, exist_ok=True)
+    jobs = makeSweepJobs(baseConfig, grid, scenario, outputDir, seed)
+    # Compiled before the workers are started, so they do not each compile the kernels
+    for job in jobs:
+        if job["config"] is not None:
+            loadKernels(job["config"])
+    results = runJobs(jobs, runJob, workers, timeout, logger)
+
+    names = list(grid)
+    with open(os.path.join(outputDir, "summary.csv"), "w", newline="") as summaryFile:
+        csvWrite = csv.writer(summaryFile)
+        csvWrite.writerow(SUMMARY_HEADER[:3] + names + SUMMARY_HEADER[3:])
+        for job, result in zip(jobs, results):
+            row = [result.get(column, "") for column in SUMMARY_HEADER]
+            csvWrite.writerow(row[:3] + [job["settings"][name] for name in names] + row[3:])
+
+    return results
@@ -0,0 +1,304 @@
+import multiprocessing
+import os
+import traceback
+import weakref
+from multiprocessing import shared_memory
+from Data.GridSimulation import *
+
+
+class SharedArrays:
+    """
+    NumPy arrays kept in one block of shared memory, which other processes can attach to by the name of the block.
+    """
+    def __init__(self, layout, name=None):
+        """
+        :param layout: list(tuple(str, str, tuple)) = name, dtype string and shape of every array.
+        :param name: str = name of an existing block to attach to. A new block is created if None.
+        """
+        self.layout = layout
+        offsets = []
+        size = 0
+        for key, dtype, shape in layout:
+            offsets.append(size)
+            # Every array starts on a cache line of its own
+            size += -(-int(np.prod(shape)) * np.dtype(dtype).itemsize // 64) * 64
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=max(size, 1))
+        self.name = self.memory.name
+        self.arrays = {key: np.ndarray(shape, dtype=dtype, buffer=self.memory.buf, offset=offset)
+                       for (key, dtype, shape), offset in zip(layout, offsets)}
+
+    def close(self):
+        """
+        Detaches from the block, and frees it if this process created it. The arrays must not be used afterwards.
+        :return: None
+        """
+        self.arrays = {}
+        try:
+            self.memory.close()
+        except BufferError:
+            # Arrays handed out earlier are still in use, the block is unmapped once they are gone
+            pass
+        if self.owner:
+            self.memory.unlink()
+
+
+def stateArrays(arrays, index):
+    """
+    :param arrays: dict = shared arrays laid out by TiledSimulation.startTiles.
+    :param index: int = 0 or 1, which of the two states to pick.
+    :return: dict = arrays of the state, keyed by GridState attribute name.
+    """
+    prefix = "state%s." % index
+    return {name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
+
+
+def splitRows(simSizeY, tiles):
+    """
+    :param simSizeY: int = side length of the simulation in y-direction.
+    :param tiles: int = amount of tiles.
+    :return: list(tuple(int, int)) = first and last row of every tile, as even as possible.
+    """
+    tiles = max(1, min(tiles, simSizeY))
+    bounds = np.linspace(0, simSizeY, tiles + 1).astype(int)
+    return [(int(first), int(stop) - 1) for first, stop in zip(bounds[:-1], bounds[1:])]
+
+
+class TileStepper(GridSimulation):
+    """
+    Steps one band of rows of a TiledSimulation. The band reads the state at the start of the day one row past its
+    edges (the halo) and works out the spread from the halo rows itself, so it only writes its own rows and does not
+    need to wait for the other tiles during a day. All random numbers come from RowStreams, so the halo rows draw the
+    same numbers as the tile that owns them.
+    """
+    def __init__(self, simulationSettings, arrays, firstRow, lastRow, seed):
+        """
+        :param simulationSettings: SimulationConfig = settings of the simulation.
+        :param arrays: dict = arrays of both states and the infection cohorts, laid out by TiledSimulation.
+        :param firstRow: int = first row of the band.
+        :param lastRow: int = last row of the band.
+        :param seed: numpy.random.SeedSequence = seed of the simulation.
+        """
+        self.arrays = arrays
+        self.firstRow = firstRow
+        self.lastRow = lastRow
+        self.states = []
+        super().__init__(simulationSettings, seed=seed)
+
+    def makeSimulation(self):
+        self.simSizeY, self.simSizeX = self.arrays["state0.population"].shape
+        self.spreadTargets = neighbourTargets(self.simSizeX, self.simSizeY, self.spreadBoundary)
+        self.states = [GridState(self.simSizeX, self.simSizeY, stateArrays(self.arrays, i)) for i in (0, 1)]
+        counts = self.arrays["cohorts"]
+        self.cohorts = InfectionCohorts(len(counts), self.simSizeX, self.simSizeY, counts)
+        # Marks the cells spread to while the active cells are found, always cleared again afterwards
+        self.marks = np.zeros((self.simSizeY, self.simSizeX), dtype=bool)
+        self.sourceRows = np.unique(np.arange(self.firstRow - 2, self.lastRow + 3) % self.simSizeY)
+        self.haloRows = np.unique(np.arange(self.firstRow - 1, self.lastRow + 2) % self.simSizeY)
+
+    def findTileCells(self, front):
+        """
+        Works out the active cells of the band and its halo rows from the state at the start of the day.
+        :param front: GridState = state at the start of the day.
+        :return: numpy.ndarray = sorted flat indices of the active cells of the band and its halo rows.
+        """
+        # Only infected cells up to two rows away can spread to the halo rows
+        rowIndices, xPos = np.nonzero(front.isInfected[self.sourceRows])
+        sources = self.sourceRows[rowIndices] * self.simSizeX + xPos
+        neighbours = self.spreadTargets.reshape(len(NEIGHBOURS), -1)[:, sources]
+        neighbours = neighbours[neighbours >= 0]
+
+        marks = self.marks.reshape(-1)
+        marks[neighbours] = True
+        rowIndices, xPos = np.nonzero(self.marks[self.haloRows])
+        marks[neighbours] = False
+        return self.haloRows[rowIndices] * self.simSizeX + xPos
+
+    def stepTile(self, t, frontIndex):
+        """
+        Simulates one day of the band.
+        :param t: int = current day.
+        :param frontIndex: int = which of the two states holds the start of the day.
+        :return: tuple(int, int, int, int) = people infected, dead and recovered in the band today, and the amount of
+        cells of the band it worked on.
+        """
+        front = self.states[frontIndex]
+        back = self.states[1 - frontIndex]
+        haloCells = self.findTileCells(front)
+        rows = haloCells // self.simSizeX
+        ownCells = (rows >= self.firstRow) & (rows <= self.lastRow)
+        cells = haloCells[ownCells]
+        back.copyFrom(front, cells)
+        self.cohorts.advance(t, cells)
+        self.newRecovered = 0
+        self.newInfected = 0
+        self.newDead = 0
+
+        streams = RowStreams(self.seedSequence, t, self.simSizeX)
+        self.rng = streams.select(haloCells)
+        incoming = self.calcIncoming(front, haloCells, t)
+        self.infectCells(back, cells, incoming[ownCells], t)
+        self.rng = streams.select(cells)
+        self.killDisease(back, cells, t)
+        self.updateCellData(back, cells)
+        return self.newInfected, self.newDead, self.newRecovered, len(cells)
+
+    def addActiveCells(self, newlyInfected):
+        # The active cells are found again from the state every day
+        pass
+
+
+def tileProcess(simulationSettings, layout, name, firstRow, lastRow, seed, connection):
+    """
+    Steps a band of rows every time a day is sent through connection, until None is sent.
+    :return: None
+    """
+    shared = SharedArrays(layout, name)
+    try:
+        stepper = TileStepper(simulationSettings, shared.arrays, firstRow, lastRow, seed)
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            try:
+                connection.send(("done", stepper.stepTile(*message)))
+            except Exception:
+                connection.send(("failed", traceback.format_exc()))
+    finally:
+        stepper = None
+        shared.close()
+        connection.close()
+
+
+def stopTiles(processes, connections, shared):
+    for connection in connections:
+        try:
+            connection.send(None)
+        except OSError:
+            pass
+    for process in processes:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+    for connection in connections:
+        connection.close()
+    shared.close()
+
+
+class TiledSimulation(GridSimulation):
+    """
+    Runs the grid engine with the field split into bands of rows (tiles), each stepped by its own process. Both
+    states and the infection cohorts are kept in shared memory, and the processes meet at the end of every day to
+    add up the day's totals. The results for a seed are the same for any amount of tiles, but differ from those of
+    GridSimulation, which draws its random numbers from one stream.
+    """
+    def __init__(self, simulationSettings, **kwargs):
+        self.shared = None
+        self.sharedStates = []
+        self.steppers = []
+        self.processes = []
+        self.connections = []
+        self.frontIndex = 0
+        self.stopper = None
+        super().__init__(simulationSettings, **kwargs)
+        self.tiles = self.simSettings.tiles or os.cpu_count() or 1
+
+    def startTiles(self):
+        """
+        Moves the states and the infection cohorts into shared memory and starts a process for every tile. Inside a
+        daemonic process, such as a run of a sweep, the tiles are stepped one after the other in this process.
+        :return: None
+        """
+        arrays = {}
+        for i, state in enumerate((self.state, self.backState)):
+            arrays.update({"state%s.%s" % (i, name): array for name, array in state.__dict__.items()})
+        arrays["cohorts"] = self.cohorts.counts
+        layout = [(name, array.dtype.str, array.shape) for name, array in arrays.items()]
+        self.shared = SharedArrays(layout)
+        for name, array in arrays.items():
+            np.copyto(self.shared.arrays[name], array)
+
+        self.sharedStates = [GridState(self.simSizeX, self.simSizeY, stateArrays(self.shared.arrays, i))
+                             for i in (0, 1)]
+        self.frontIndex = 0
+        self.state, self.backState = self.sharedStates
+        self.cohorts = InfectionCohorts(self.cohorts.window, self.simSizeX, self.simSizeY,
+                                        self.shared.arrays["cohorts"])
+
+        config = self.simSettings.withSettings(VERBOSITY=0, PROFILE=0)
+        bands = splitRows(self.simSizeY, self.tiles)
+        if multiprocessing.current_process().daemon or len(bands) == 1:
+            self.steppers = [TileStepper(config, self.shared.arrays, firstRow, lastRow, self.seedSequence)
+                             for firstRow, lastRow in bands]
+        else:
+            for firstRow, lastRow in bands:
+                receiver, sender = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=tileProcess, daemon=True,
+                                                  args=(config, layout, self.shared.name, firstRow, lastRow,
+                                                        self.seedSequence, sender))
+                process.start()
+                sender.close()
+                self.processes.append(process)
+                self.connections.append(receiver)
+        # Frees the shared memory even if closeTiles is never called
+        self.stopper = weakref.finalize(self, stopTiles, self.processes, self.connections, self.shared)
+        self.logger.log(PHASE, "Stepping the field in %s tiles", len(bands))
+
+    def closeTiles(self):
+        """
+        Stops the tile processes and moves the states back out of shared memory.
+        :return: None
+        """
+        if self.shared is None:
+            return
+        state = GridState(self.simSizeX, self.simSizeY)
+        state.copyFrom(self.state)
+        backState = GridState(self.simSizeX, self.simSizeY)
+        backState.copyFrom(self.backState)
+        self.cohorts = InfectionCohorts.fromCounts(self.cohorts.counts)
+        self.state, self.backState = state, backState
+        self.sharedStates = []
+        self.steppers = []
+        self.stopper()
+        self.processes = []
+        self.connections = []
+        self.shared = None
+
+    def stepTime(self, t):
+        self.logger.log(PHASE, "Simulating day %s...", t)
+        if self.shared is None:
+            self.startTiles()
+        self.newRecovered = 0
+        self.newInfected = 0
+        self.newDead = 0
+        self.steppedCells = 0
+
+        # Every tile has to finish the day before the totals are added up and the next day starts
+        results = [stepper.stepTile(t, self.frontIndex) for stepper in self.steppers]
+        for connection in self.connections:
+            connection.send((t, self.frontIndex))
+        for connection in self.connections:
+            status, result = connection.recv()
+            if status != "done":
+                raise RuntimeError("A tile failed on day %s:\n%s" % (t, result))
+            results.append(result)
+        for newInfected, newDead, newRecovered, steppedCells in results:
+            self.newInfected += newInfected
+            self.newDead += newDead
+            self.newRecovered += newRecovered
+            self.steppedCells += steppedCells
+
+        self.frontIndex = 1 - self.frontIndex
+        self.state = self.sharedStates[self.frontIndex]
+        self.backState = self.sharedStates[1 - self.frontIndex]
+
+        self.calcStats()
+
+        self.recordDay(t)
+        self.printStats(t)
+
+    def runSimulation(self):
+        try:
+            super().runSimulation()
+        finally:
+            self.closeTiles()
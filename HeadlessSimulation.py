@@ -0,0 +1,212 @@
+import argparse
+import sys
+import traceback
+from Data.GridSimulation import *
+from Data.Sweep import *
+from Data.Ensemble import *
+from Data.CommandLine import *
+
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description="Runs the disease simulation without asking for any input.")
+    addSettingsArguments(parser)
+    parser.add_argument("--scenario", default=None,
+                        help="scenario file with the initially infected cells, needed unless resuming")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random numbers, random if not given")
+    parser.add_argument("--days", type=int, default=None, help="amount of days to simulate, overrides the settings")
+    parser.add_argument("--output", default=None,
+                        help="file the daily statistics are written to, data.csv (or the extension of "
+                             "DATA_FILE_FORMAT) if not given")
+    parser.add_argument("--snapshots", default=None,
+                        help="records the grids of every day to this file, as with RECORD_SNAPSHOTS=1")
+    parser.add_argument("--frames", default=None,
+                        help="saves pictures of the field to this directory, or to this animated GIF if it ends in "
+                             ".gif, every EXPORT_FRAME_DAYS days")
+    parser.add_argument("--checkpoint", default="checkpoint.npz",
+                        help="file the simulation is saved to every CHECKPOINT_DAYS days")
+    parser.add_argument("--resume", default=None,
+                        help="carries on the run saved in this checkpoint file instead of starting a new one, the "
+                             "settings file and scenario are not used. The data and snapshot files of the saved run "
+                             "are continued unless --output or --snapshots is given")
+    parser.add_argument("--profile", nargs="?", const="metrics.csv", default=None,
+                        help="times every phase of every day and writes the metrics to this file, metrics.csv if no "
+                             "file is given, as with PROFILE=1. Use --set PROFILE=2 to also trace the memory")
+    parser.add_argument("--sweep", default=None,
+                        help="sweep file, simulates every combination of the settings in it in parallel")
+    parser.add_argument("--replicates", type=int, default=None,
+                        help="runs an ensemble of up to this many replicates in parallel and writes statistics over "
+                             "them to ensemble.csv")
+    parser.add_argument("--min-replicates", type=int, default=10,
+                        help="replicates an ensemble runs before checking the tolerance")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="stops an ensemble once the 95%% confidence interval of the mean of the tolerance "
+                             "columns is narrower than this fraction of the mean on every day")
+    parser.add_argument("--tolerance-columns", default="Total Infection Cases",
+                        help="comma separated data file columns checked against the tolerance")
+    parser.add_argument("--check-kernels", action="store_true",
+                        help="runs --replicates replicates (20 if not given) with both the NumPy and the compiled "
+                             "kernels and exits with 0 if they give statistically equivalent results")
+    parser.add_argument("--quantiles", default="0.05,0.5,0.95", help="comma separated quantiles of an ensemble")
+    parser.add_argument("--output-dir", default="sweep",
+                        help="directory the results of a sweep or ensemble are written to")
+    parser.add_argument("--workers", type=int, default=None, help="runs at the same time, all CPUs if not given")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds after which a run of a sweep is stopped")
+    return parser.parse_args(argv)
+
+
+def getOverrides(arguments):
+    """
+    :param arguments: argparse.Namespace = parsed command line arguments.
+    :return: dict = settings changed by the command line, including turning off anything that would wait for the
+    user.
+    """
+    overrides = parseOverrides(arguments.set)
+    if arguments.days is not None:
+        overrides["SIMULATION_RUN_TIME"] = arguments.days
+    if arguments.snapshots is not None:
+        overrides["RECORD_SNAPSHOTS"] = 1
+    if arguments.frames is not None:
+        overrides["EXPORT_FRAMES"] = EXPORT_GIF if arguments.frames.lower().endswith(".gif") else EXPORT_PNG
+    if arguments.profile is not None:
+        overrides["PROFILE"] = max(int(overrides.get("PROFILE", PROFILE_TIME)), PROFILE_TIME)
+    overrides["RUN_SLOWLY"] = 0
+    overrides["DRAW_SIMULATION"] = 0
+    return overrides
+
+
+def loadConfig(arguments):
+    """
+    Reads the settings file and applies the command line overrides.
+    :param arguments: argparse.Namespace = parsed command line arguments.
+    :return: SimulationConfig
+    """
+    return loadSettings(arguments.settings, getOverrides(arguments))
+
+
+def main(argv=None):
+    arguments = parseArguments(argv)
+    if arguments.resume is not None:
+        return resume(arguments)
+
+    try:
+        if arguments.scenario is None:
+            raise ValueError("a scenario file is needed to start a new run")
+        config = loadConfig(arguments)
+        scenario = Scenario.fromFile(arguments.scenario)
+        grid = None
+        if arguments.sweep is not None:
+            grid = loadSweepGrid(arguments.sweep)
+            # Values that are not valid only fail their own runs, but an unknown setting would fail every run
+            for name in grid:
+                config.getSetting(name)
+    except (OSError, ValueError, TypeError) as error:
+        print("Could not load the simulation: %s" % error, file=sys.stderr)
+        return EXIT_BAD_INPUT
+
+    logger = Logger(config.verbosity)
+    if grid is not None:
+        return sweep(arguments, config, grid, scenario, logger)
+    if arguments.check_kernels:
+        return checkKernels(arguments, config, scenario, logger)
+    if arguments.replicates is not None:
+        return ensemble(arguments, config, scenario, logger)
+
+    def makeSimulation():
+        logger.log(SUMMARY, "Creating Simulation...")
+        return createSimulation(config, scenario=scenario, seed=arguments.seed, dataFile=arguments.output,
+                                snapshotFile=arguments.snapshots or "snapshots.dat",
+                                checkpointFile=arguments.checkpoint, framePath=arguments.frames,
+                                metricsFile=arguments.profile or "metrics.csv")
+    return run(makeSimulation, logger)
+
+
+def resume(arguments):
+    try:
+        overrides = getOverrides(arguments)
+        checkpoint = loadCheckpoint(arguments.resume)
+        config = SimulationConfig.fromDict(checkpoint[0]["settings"]).withSettings(**overrides)
+    except (OSError, ValueError, TypeError, KeyError) as error:
+        print("Could not load the checkpoint: %s" % error, file=sys.stderr)
+        return EXIT_BAD_INPUT
+
+    def makeSimulation():
+        # The files of the checkpointed run are carried on unless others are given
+        header = checkpoint[0]
+        return createSimulation(config, checkpoint=checkpoint, dataFile=arguments.output or header.get("dataPath"),
+                                snapshotFile=arguments.snapshots or header.get("snapshotPath") or "snapshots.dat",
+                                checkpointFile=arguments.resume,
+                                framePath=arguments.frames, metricsFile=arguments.profile or "metrics.csv")
+    return run(makeSimulation, Logger(config.verbosity))
+
+
+def run(makeSimulation, logger):
+    """
+    :param makeSimulation: function() = creates the simulation to run.
+    :param logger: Logger = logger for progress messages.
+    :return: int = exit code.
+    """
+    try:
+        simulation = makeSimulation()
+        logger.log(SUMMARY, "Starting simulation...")
+        simulation.runSimulation()
+    except KeyboardInterrupt:
+        print("Simulation interrupted.", file=sys.stderr)
+        return EXIT_FAILED
+    except Exception:
+        traceback.print_exc()
+        return EXIT_FAILED
+
+    logger.log(SUMMARY, "Simulation finished.")
+    return EXIT_OK
+
+
+def sweep(arguments, config, grid, scenario, logger):
+    logger.log(SUMMARY, "Starting sweep...")
+    try:
+        results = runSweep(config, grid, scenario, arguments.output_dir, arguments.workers, arguments.timeout,
+                           arguments.seed, logger)
+    except ValueError as error:
+        print("Could not start the sweep: %s" % error, file=sys.stderr)
+        return EXIT_BAD_INPUT
+    failed = [result for result in results if result["Status"] != "finished"]
+    logger.log(SUMMARY, "Sweep finished, %s of %s runs failed. The summary is in %s.", len(failed), len(results),
+               os.path.join(arguments.output_dir, "summary.csv"))
+    if failed:
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def ensemble(arguments, config, scenario, logger):
+    logger.log(SUMMARY, "Starting ensemble...")
+    try:
+        quantiles = [float(quantile) for quantile in arguments.quantiles.split(",")]
+        columns = [column.strip() for column in arguments.tolerance_columns.split(",")]
+        stats = runEnsemble(config, scenario, arguments.output_dir, arguments.replicates, arguments.workers,
+                            arguments.timeout, arguments.seed, quantiles, arguments.tolerance, columns,
+                            arguments.min_replicates, logger)
+    except ValueError as error:
+        print("Could not start the ensemble: %s" % error, file=sys.stderr)
+        return EXIT_BAD_INPUT
+    if stats.count == 0:
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def checkKernels(arguments, config, scenario, logger):
+    logger.log(SUMMARY, "Checking the compiled kernels...")
+    try:
+        result = compareKernels(config, scenario, arguments.replicates or 20, arguments.workers, arguments.timeout,
+                                arguments.seed, logger=logger)
+    except ValueError as error:
+        print("Could not check the kernels: %s" % error, file=sys.stderr)
+        return EXIT_BAD_INPUT
+    if not result["equivalent"]:
+        print("The compiled kernels do not give statistically equivalent results to the NumPy kernels.",
+              file=sys.stderr)
+        return EXIT_FAILED
+    logger.log(SUMMARY, "The compiled kernels give statistically equivalent results to the NumPy kernels.")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,14 @@
-import csv
 from Data.Simulation import *
+from Data.GridSimulation import *
 
-settings = []
-with open("SimulationSettings.csv", "r") as settingsFile:
-    rows = csv.reader(settingsFile, delimiter="=")
-    for row in rows:
-        try:
-            if list(row[0])[0] == "#":
-                continue
-            else:
-                settings += row
-        except IndexError:
-            continue
-print("Simulation settings loaded from file.")
+settings = SimulationConfig.fromFile("SimulationSettings.csv")
+logger = Logger(settings.verbosity)
+logger.log(SUMMARY, "Simulation settings loaded from file.")
 
-print("Creating Simulation...")
-simulation = Simulation(settings)
-print("Simulation created!")
-print("Starting simulation...")
+logger.log(SUMMARY, "Creating Simulation...")
+simulation = createSimulation(settings)
+logger.log(SUMMARY, "Simulation created!")
+logger.log(SUMMARY, "Starting simulation...")
 simulation.runSimulation()
 input("Simulation finished, press enter to exit")
 quit()
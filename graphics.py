@@ -62,6 +62,12 @@ http://mcsp.wartburg.edu/zelle/python for a quick reference"""
 
 __version__ = "5.0"
 
+# Local changes
+#     * GraphWin.batch() context manager that holds back autoflush while
+#       many objects are drawn or changed and updates once at the end
+#     * GraphWin.drawAll, undrawAll, setFillAll and setOutlineAll for
+#       sequences of objects
+
 # Version 5 8/26/2016
 #     * update at bottom to fix MacOS issue causing askopenfile() to hang
 #     * update takes an optional parameter specifying update rate
@@ -304,6 +310,49 @@ class GraphWin(tk.Canvas):
         """Update drawing to the window"""
         self.__checkOpen()
         self.update_idletasks()
+
+    def batch(self):
+        """Returns a context manager that turns autoflush off while
+        many objects are drawn or changed, and updates the window once
+        when the block ends:
+
+            with win.batch():
+                for shape in shapes:
+                    shape.draw(win)
+
+        Batches may be nested, only the outermost one updates."""
+        return _Batch(self)
+
+    def drawAll(self, objects):
+        """Draw every object in objects with a single update"""
+        with self.batch():
+            for obj in objects:
+                obj.draw(self)
+
+    def undrawAll(self, objects):
+        """Undraw every object in objects with a single update"""
+        with self.batch():
+            for obj in objects:
+                obj.undraw()
+
+    def setFillAll(self, objects, colors):
+        """Set the fill color of every object in objects with a single
+        update. colors is either one color for all of them or a
+        sequence with a color for each object."""
+        self.__reconfigAll(objects, "fill", colors)
+
+    def setOutlineAll(self, objects, colors):
+        """Set the outline color of every object in objects with a
+        single update. colors is either one color for all of them or a
+        sequence with a color for each object."""
+        self.__reconfigAll(objects, "outline", colors)
+
+    def __reconfigAll(self, objects, option, settings):
+        if isinstance(settings, str):
+            settings = [settings] * len(objects)
+        with self.batch():
+            for obj, setting in zip(objects, settings):
+                obj._reconfig(option, setting)
         
     def getMouse(self):
         """Wait for mouse click and return Point object representing
@@ -399,6 +448,26 @@ class GraphWin(tk.Canvas):
         self.update()
         
                       
+class _Batch:
+
+    """Internal context manager returned by GraphWin.batch"""
+
+    def __init__(self, graphwin):
+        self.graphwin = graphwin
+        self.autoflush = False
+
+    def __enter__(self):
+        self.autoflush = self.graphwin.autoflush
+        self.graphwin.autoflush = False
+        return self.graphwin
+
+    def __exit__(self, *exception):
+        self.graphwin.autoflush = self.autoflush
+        if self.autoflush and not self.graphwin.isClosed():
+            _root.update()
+        return False
+
+
 class Transform:
 
     """Internal class for 2-D coordinate transformations"""
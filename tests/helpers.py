@@ -0,0 +1,28 @@
+from Data.GridSimulation import *
+
+# Field of 20 by 20 cells, small enough to simulate in a fraction of a second
+SMALL_FIELD = {"URBAN_AREA": 100, "SURROUNDING_AREA": 300, "URBAN_POPULATION": 40000,
+               "SURROUNDING_POPULATION": 20000}
+
+
+def makeSmallConfig(**settings):
+    """
+    :param settings: settings that differ from the defaults, keyed by either the settings file or attribute name.
+    :return: SimulationConfig = settings of a simulation on a small field that prints nothing and writes no data
+    file unless settings ask for one.
+    """
+    defaults = dict(SMALL_FIELD, VERBOSITY=0, CREATE_DATA_FILE=0)
+    return SimulationConfig().withSettings(**defaults).withSettings(**settings)
+
+
+def runDays(config, scenario, seed, days=None):
+    """
+    Steps a simulation without writing any files.
+    :return: tuple(Simulation, list(list)) = the simulation and its stats of every day.
+    """
+    simulation = createSimulation(config, scenario=scenario, seed=seed)
+    rows = []
+    for t in range(config.runTime if days is None else days):
+        simulation.stepTime(t)
+        rows.append(simulation.getStats(t))
+    return simulation, rows
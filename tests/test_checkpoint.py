@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from tests.helpers import *
+
+SCENARIO = Scenario(cells=[(10, 10, 0.05)], randomCells=[(2, 0.05)])
+ENGINES = (0, 1, 2)
+
+
+def makeCheckpointConfig(engine, days):
+    return makeSmallConfig(SIMULATION_RUN_TIME=days, SIMULATION_ENGINE=engine, COMPILED_KERNELS=0, TILES=2,
+                           CREATE_DATA_FILE=1, RECORD_SNAPSHOTS=1, CHECKPOINT_DAYS=5)
+
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def runSimulation(self, config, name, **kwargs):
+        simulation = createSimulation(config, dataFile=self.path(name + ".csv"), snapshotFile=self.path(name + ".dat"),
+                                      checkpointFile=self.path(name + ".npz"), **kwargs)
+        simulation.runSimulation()
+        return simulation
+
+    def readFile(self, name):
+        with open(self.path(name), "rb") as dataFile:
+            return dataFile.read()
+
+    def testResumedRunMatchesUninterruptedRun(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                self.checkResume(engine)
+
+    def testCheckpointHoldsTheState(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                self.checkRestore(engine)
+
+    def checkResume(self, engine):
+        self.runSimulation(makeCheckpointConfig(engine, 10), "whole", scenario=SCENARIO, seed=3)
+        self.runSimulation(makeCheckpointConfig(engine, 5), "parts", scenario=SCENARIO, seed=3)
+
+        checkpoint = loadCheckpoint(self.path("parts.npz"))
+        self.assertEqual(checkpoint[0]["day"], 5)
+        config = SimulationConfig.fromDict(checkpoint[0]["settings"]).withSettings(SIMULATION_RUN_TIME=10)
+        resumed = self.runSimulation(config, "parts", checkpoint=checkpoint)
+        self.assertEqual(resumed.startDay, 5)
+
+        self.assertEqual(self.readFile("parts.csv"), self.readFile("whole.csv"))
+        # The zip entries of a checkpoint carry the time they were written, so their contents are compared instead
+        wholeHeader, wholeGrids = loadCheckpoint(self.path("whole.npz"))
+        partsHeader, partsGrids = loadCheckpoint(self.path("parts.npz"))
+        for name in ("dataPath", "snapshotPath"):
+            self.assertEqual(os.path.basename(partsHeader.pop(name)), "parts" + os.path.splitext(wholeHeader[name])[1])
+            wholeHeader.pop(name)
+        self.assertEqual(partsHeader, wholeHeader)
+        for name in wholeGrids:
+            np.testing.assert_array_equal(partsGrids[name], wholeGrids[name])
+        # The snapshot file of the shorter run is grown to hold the extra days
+        wholeHeader, wholeGrids = loadSnapshots(self.path("whole.dat"))
+        partsHeader, partsGrids = loadSnapshots(self.path("parts.dat"))
+        self.assertEqual(partsHeader["shape"], wholeHeader["shape"])
+        for name in SNAPSHOT_FIELDS:
+            np.testing.assert_array_equal(partsGrids[name], wholeGrids[name])
+
+    def checkRestore(self, engine):
+        simulation = self.runSimulation(makeCheckpointConfig(engine, 5), "run", scenario=SCENARIO, seed=4)
+        header, grids = loadCheckpoint(self.path("run.npz"))
+        restored = createSimulation(makeCheckpointConfig(engine, 5), checkpoint=(header, grids))
+        for name in CHECKPOINT_FIELDS:
+            np.testing.assert_array_equal(np.asarray(restored.getCellGrids([name])[name]),
+                                          np.asarray(simulation.getCellGrids([name])[name]))
+        np.testing.assert_array_equal(restored.cohorts.counts, simulation.cohorts.counts)
+        self.assertEqual(restored.getStats(4), simulation.getStats(4))
+        self.assertEqual(restored.rng.bit_generator.state, simulation.rng.bit_generator.state)
+
+    def testCheckpointNamesTheFilesOfTheRun(self):
+        self.runSimulation(makeCheckpointConfig(1, 5), "run", scenario=SCENARIO, seed=5)
+        header = loadCheckpoint(self.path("run.npz"))[0]
+        self.assertEqual(header["dataPath"], self.path("run.csv"))
+        self.assertEqual(header["snapshotPath"], self.path("run.dat"))
+
+    def testDoesNotContinueFilesOfAnotherRun(self):
+        self.runSimulation(makeCheckpointConfig(1, 5), "run", scenario=SCENARIO, seed=5)
+        self.runSimulation(makeCheckpointConfig(1, 8), "other", scenario=SCENARIO, seed=6)
+        checkpoint = loadCheckpoint(self.path("run.npz"))
+        config = makeCheckpointConfig(1, 10)
+        otherData = self.readFile("other.csv")
+        resumed = createSimulation(config, checkpoint=checkpoint, dataFile=self.path("other.csv"),
+                                   snapshotFile=self.path("run.dat"), checkpointFile=self.path("resumed.npz"))
+        with self.assertRaises(ValueError):
+            resumed.runSimulation()
+        self.assertEqual(self.readFile("other.csv"), otherData)
+
+        resumed = createSimulation(config, checkpoint=checkpoint, dataFile=self.path("run.csv"),
+                                   snapshotFile=self.path("other.dat"), checkpointFile=self.path("resumed.npz"))
+        with self.assertRaises(ValueError):
+            resumed.runSimulation()
+
+
+if __name__ == "__main__":
+    unittest.main()
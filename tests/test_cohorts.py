@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+from tests.helpers import *
+
+SCENARIO = Scenario(cells=[(10, 10, 0.05)], randomCells=[(3, 0.05)])
+
+
+class InfectionCohortsTest(unittest.TestCase):
+    def testWrapsAroundAfterMoreDaysThanTheWindow(self):
+        cohorts = InfectionCohorts(4, 2, 1)
+        cells = np.arange(2)
+        cohorts.record(0, cells, np.array([5, 0]))
+        for day in range(1, 11):
+            cohorts.advance(day, cells)
+            cohorts.record(day, cells, np.array([1, 2]))
+        # Days 10, 9 and 8 keep their own slots, the oldest slot collects day 7 and everything before it
+        byAge = cohorts.flatCounts[np.argsort(cohorts.ages(10))]
+        np.testing.assert_array_equal(byAge, [[1, 2], [1, 2], [1, 2], [5 + 7, 2 * 7]])
+        self.assertEqual(cohorts.slot(14).tolist(), [1, 2])
+
+    def testEveryoneRecoversAtTheLongestLifetime(self):
+        minIncubation, maxLifetime = 2, 6
+        for age, expected in ((maxLifetime - 1, 80), (maxLifetime, 100)):
+            with self.subTest(age=age):
+                cohorts = InfectionCohorts(maxLifetime + 1, 1, 1)
+                cells = np.arange(1)
+                cohorts.record(0, cells, np.array([100]))
+                for day in range(1, age + 1):
+                    cohorts.advance(day, cells)
+                weights = lifetimeReached(cohorts.ages(age), minIncubation, maxLifetime)
+                removed = cohorts.remove(cells, weights[:, None], np.zeros(1))
+                self.assertEqual(removed[0], expected)
+                self.assertEqual(cohorts.counts.sum(), 100 - expected)
+
+    def testCohortsAddUpToTheInfectedPopulation(self):
+        for engine in (0, 1, 2):
+            with self.subTest(engine=engine):
+                config = makeSmallConfig(SIMULATION_ENGINE=engine, TILES=3, COMPILED_KERNELS=0)
+                simulation, rows = runDays(config, SCENARIO, 5, 25)
+                if hasattr(simulation, "closeTiles"):
+                    simulation.closeTiles()
+                infectedPop = np.asarray(simulation.getCellGrids(["infectedPop"])["infectedPop"])
+                self.assertGreater(rows[-1][2], rows[0][2])
+                np.testing.assert_array_equal(simulation.cohorts.counts.sum(axis=0), infectedPop)
+
+
+if __name__ == "__main__":
+    unittest.main()
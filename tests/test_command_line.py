@@ -0,0 +1,21 @@
+import unittest
+from Data.CommandLine import *
+from tests.test_settings import SETTINGS_FILE
+
+
+class CommandLineTest(unittest.TestCase):
+    def testOverridesAreApplied(self):
+        config = loadSettings(SETTINGS_FILE, parseOverrides(["URBAN_AREA = 200", "SIMULATION_ENGINE=1"]))
+        self.assertEqual((config.uArea, config.engine), (200, 1))
+
+    def testRejectsMalformedOverride(self):
+        with self.assertRaises(ValueError):
+            parseOverrides(["URBAN_AREA"])
+
+    def testRejectsUnknownSetting(self):
+        with self.assertRaises(ValueError):
+            loadSettings(SETTINGS_FILE, {"NOT_A_SETTING": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
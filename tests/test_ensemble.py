@@ -0,0 +1,104 @@
+import csv
+import os
+import tempfile
+import unittest
+import numpy as np
+from Data.Ensemble import *
+from tests.helpers import *
+
+
+class FailingScenario(Scenario):
+    def getSeedGrids(self, simSizeX, simSizeY, rng):
+        raise RuntimeError("no seed grids")
+
+
+def makeEnsembleConfig():
+    return makeSmallConfig(SIMULATION_RUN_TIME=4, SIMULATION_ENGINE=1, COMPILED_KERNELS=0)
+
+
+class RunningMomentsTest(unittest.TestCase):
+    def testMatchesNumpy(self):
+        values = np.random.default_rng(3).normal(10, 2, size=(50, 4, 3))
+        moments = RunningMoments((4, 3))
+        for array in values:
+            moments.update(array)
+        np.testing.assert_allclose(moments.mean, values.mean(axis=0))
+        np.testing.assert_allclose(moments.std(), values.std(axis=0, ddof=1))
+
+    def testStdOfOneArrayIsZero(self):
+        moments = RunningMoments(2)
+        moments.update(np.array([1.0, 2.0]))
+        np.testing.assert_array_equal(moments.std(), [0, 0])
+
+
+class StreamingQuantileTest(unittest.TestCase):
+    def testExactForFewerThanFiveArrays(self):
+        values = np.random.default_rng(4).uniform(size=(4, 6))
+        for probability in (0.05, 0.5, 0.95):
+            quantile = StreamingQuantile(probability)
+            for array in values:
+                quantile.update(array)
+            np.testing.assert_allclose(quantile.value(), np.quantile(values, probability, axis=0))
+
+    def testCloseToNumpyForLongStreams(self):
+        values = np.random.default_rng(5).normal(0, 1, size=(2000, 3, 2))
+        for probability in (0.05, 0.5, 0.95):
+            quantile = StreamingQuantile(probability)
+            for array in values:
+                quantile.update(array)
+            np.testing.assert_allclose(quantile.value(), np.quantile(values, probability, axis=0), atol=0.1)
+
+    def testStaysWithinTheRangeOfTheStream(self):
+        values = np.random.default_rng(6).exponential(size=(200, 5))
+        quantile = StreamingQuantile(0.95)
+        for array in values:
+            quantile.update(array)
+        self.assertTrue((quantile.value() >= values.min(axis=0)).all())
+        self.assertTrue((quantile.value() <= values.max(axis=0)).all())
+
+
+class EnsembleStatsTest(unittest.TestCase):
+    def testWritesEveryDayAndColumn(self):
+        rows = [[[day] + [run + day] * (len(DATA_HEADER) - 1) for day in range(3)] for run in range(4)]
+        stats = EnsembleStats(3, (0.5,))
+        for replicateRows in rows:
+            stats.update(replicateRows)
+        self.assertEqual(stats.count, 4)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "ensemble.csv")
+            stats.write(path)
+            with open(path, newline="") as ensembleFile:
+                written = list(csv.DictReader(ensembleFile))
+        self.assertEqual(len(written), 3)
+        column = DATA_HEADER[1]
+        self.assertEqual(float(written[2]["%s Mean" % column]), 3.5)
+        self.assertEqual(float(written[2]["%s Q50" % column]), 3.5)
+        self.assertAlmostEqual(float(written[0]["%s Std" % column]), np.std([0, 1, 2, 3], ddof=1), places=4)
+
+    def testRelativeHalfWidth(self):
+        stats = EnsembleStats(1, ())
+        for value in (9.0, 11.0):
+            stats.update([[0] + [value] * (len(DATA_HEADER) - 1)])
+        expected = CONFIDENCE_Z * np.std([9, 11], ddof=1) / np.sqrt(2) / 10
+        self.assertAlmostEqual(stats.relativeHalfWidth([DATA_HEADER[1]]), expected)
+
+
+class RunEnsembleTest(unittest.TestCase):
+    def testSameSeedGivesSameStatistics(self):
+        scenario = Scenario(cells=[(10, 10, 0.05)])
+        with tempfile.TemporaryDirectory() as directory:
+            first = runEnsemble(makeEnsembleConfig(), scenario, directory, 3, workers=2, seed=9)
+            second = runEnsemble(makeEnsembleConfig(), scenario, directory, 3, workers=1, seed=9)
+            self.assertTrue(os.path.exists(os.path.join(directory, "ensemble.csv")))
+        self.assertEqual(first.count, 3)
+        np.testing.assert_array_equal(first.moments.mean, second.moments.mean)
+
+    def testEveryReplicateFailing(self):
+        with tempfile.TemporaryDirectory() as directory:
+            stats = runEnsemble(makeEnsembleConfig(), FailingScenario(), directory, 2, workers=2, seed=1)
+            self.assertEqual(stats.count, 0)
+            self.assertFalse(os.path.exists(os.path.join(directory, "ensemble.csv")))
+
+
+if __name__ == "__main__":
+    unittest.main()
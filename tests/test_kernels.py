@@ -0,0 +1,48 @@
+import importlib.util
+import unittest
+import numpy as np
+from tests.helpers import *
+
+SCENARIO = Scenario(cells=[(10, 10, 0.05)], randomCells=[(3, 0.05)])
+
+
+@unittest.skipIf(importlib.util.find_spec("numba") is None, "Numba is not installed")
+class CompiledKernelsTest(unittest.TestCase):
+    def testSameResultsAsNumpy(self):
+        for engine in (1, 2):
+            for spreadBoundary in (0, 1, 2, 3):
+                settings = {"SPREAD_BOUNDARY": spreadBoundary}
+                if spreadBoundary == 1:
+                    settings.update(AMOUNT_OF_MASKS_TYPE_1=5000, AMOUNT_OF_MASKS_TYPE_2=5000)
+                with self.subTest(engine=engine, **settings):
+                    config = makeSmallConfig(SIMULATION_ENGINE=engine, TILES=2, **settings)
+                    numpySimulation, numpyRows = runDays(config.withSettings(COMPILED_KERNELS=0), SCENARIO, 13, 10)
+                    compiledSimulation, compiledRows = runDays(config.withSettings(COMPILED_KERNELS=1), SCENARIO, 13,
+                                                               10)
+                    self.assertIsNone(numpySimulation.kernels)
+                    self.assertIsNotNone(compiledSimulation.kernels)
+                    self.assertEqual(compiledRows, numpyRows)
+                    for name, array in numpySimulation.state.__dict__.items():
+                        np.testing.assert_array_equal(getattr(compiledSimulation.state, name), array)
+                    for simulation in (numpySimulation, compiledSimulation):
+                        if hasattr(simulation, "closeTiles"):
+                            simulation.closeTiles()
+
+    def testObjectEngineNeverLoadsKernels(self):
+        self.assertIsNone(loadKernels(SimulationConfig().withSettings(SIMULATION_ENGINE=0, COMPILED_KERNELS=1)))
+
+    def testAutomaticKernelsOnlyOnLargeFields(self):
+        config = SimulationConfig().withSettings(SIMULATION_ENGINE=1, COMPILED_KERNELS=2)
+        self.assertIsNone(loadKernels(config))
+        self.assertIsNotNone(loadKernels(config.withSettings(SURROUNDING_AREA=COMPILED_KERNELS_MIN_CELLS)))
+
+    def testSettingsListIsConvertedBeforeLoadingKernels(self):
+        config = makeSmallConfig(SIMULATION_ENGINE=1, COMPILED_KERNELS=1)
+        settings = [item for name in SETTING_NAMES for item in (name, config.getSetting(name))]
+        simulation = GridSimulation(settings, scenario=SCENARIO, seed=13)
+        self.assertEqual(simulation.simSettings, config)
+        self.assertIsNotNone(simulation.kernels)
+
+
+if __name__ == "__main__":
+    unittest.main()
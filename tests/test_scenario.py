@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from Data.Scenario import *
+
+
+class ScenarioTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def writeScenario(self, text):
+        path = os.path.join(self.directory.name, "scenario.csv")
+        with open(path, "w") as scenarioFile:
+            scenarioFile.write(text)
+        return path
+
+    def assertInvalidLine(self, text, lineNumber, reason=""):
+        with self.assertRaises(ValueError) as raised:
+            Scenario.fromFile(self.writeScenario(text))
+        self.assertIn("Invalid line %s" % lineNumber, str(raised.exception))
+        self.assertIn(reason, str(raised.exception))
+
+    def testReadsEveryKindOfLine(self):
+        scenario = Scenario.fromFile(self.writeScenario("# comment\n\nCELL=5,6,0.01\nRANDOM=2, 0.05\n"
+                                                        "REGION=1,2,3,4,0.1\n"))
+        self.assertEqual(scenario.cells, [(5, 6, 0.01)])
+        self.assertEqual(scenario.randomCells, [(2, 0.05)])
+        self.assertEqual(scenario.regions, [(1, 2, 3, 4, 0.1)])
+
+    def testRejectsMalformedLines(self):
+        self.assertInvalidLine("CELL=1,1,0.1\nCELL=1,1\n", 2)
+        self.assertInvalidLine("SQUARE=1,1,0.1\n", 1)
+        self.assertInvalidLine("CELL=a,1,0.1\n", 1)
+
+    def testRejectsFractionsOutsideZeroToOne(self):
+        self.assertInvalidLine("CELL=1,1,1.5\n", 1, "between 0 and 1")
+        self.assertInvalidLine("REGION=1,1,2,2,-0.1\n", 1, "between 0 and 1")
+        self.assertInvalidLine("RANDOM=3,2\n", 1, "between 0 and 1")
+        scenario = Scenario.fromFile(self.writeScenario("CELL=1,1,0\nCELL=2,2,1\n"))
+        self.assertEqual(len(scenario.cells), 2)
+
+    def testRejectsNegativeRandomAmount(self):
+        self.assertInvalidLine("RANDOM=-2,0.1\n", 1, "must not be negative")
+
+    def testSeedGrids(self):
+        scenario = Scenario(cells=[(2, 3, 0.5), (50, 50, 0.5)], randomCells=[(4, 0.25)],
+                            regions=[(8, 8, 12, 12, 0.125)])
+        infFraction, isSeed = scenario.getSeedGrids(10, 10, np.random.default_rng(1))
+        # The region is cut off at the edge of the field and the cell outside it is ignored
+        self.assertTrue(isSeed[8:, 8:].all())
+        self.assertEqual(infFraction[3, 2], 0.5)
+        self.assertLessEqual(isSeed.sum(), 4 + 4 + 1)
+        self.assertGreaterEqual(isSeed.sum(), 4 + 1)
+        self.assertEqual(set(np.unique(infFraction[isSeed])) - {0.5, 0.25, 0.125}, set())
+        self.assertFalse(infFraction[~isSeed].any())
+
+    def testSeedGridsDependOnlyOnTheGenerator(self):
+        scenario = Scenario(randomCells=[(5, 0.1)])
+        first = scenario.getSeedGrids(20, 10, np.random.default_rng(7))[1]
+        second = scenario.getSeedGrids(20, 10, np.random.default_rng(7))[1]
+        self.assertEqual(first.sum(), 5)
+        np.testing.assert_array_equal(first, second)
+
+
+if __name__ == "__main__":
+    unittest.main()
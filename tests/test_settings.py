@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from Data.Settings import *
+
+SETTINGS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "SimulationSettings.csv")
+
+
+class SimulationConfigTest(unittest.TestCase):
+    def assertInvalid(self, message, **settings):
+        with self.assertRaises(ValueError) as raised:
+            SimulationConfig().withSettings(**settings)
+        self.assertIn(message, str(raised.exception))
+
+    def testSettingsFileIsValid(self):
+        config = SimulationConfig.fromFile(SETTINGS_FILE)
+        self.assertEqual(config.toDict().keys(), SETTING_NAMES.keys())
+
+    def testWithSettingsTakesBothNames(self):
+        config = SimulationConfig().withSettings(URBAN_AREA=200, surrArea="300")
+        self.assertEqual((config.uArea, config.surrArea), (200, 300))
+        self.assertEqual(SimulationConfig().uArea, 1500)
+
+    def testDictRoundTrip(self):
+        config = SimulationConfig().withSettings(SPREAD_RATE=2.5, SIMULATION_ENGINE=1)
+        self.assertEqual(SimulationConfig.fromDict(config.toDict()), config)
+
+    def testRejectsUnknownSetting(self):
+        with self.assertRaises(ValueError):
+            SimulationConfig.fromDict({"NOT_A_SETTING": 1})
+        with self.assertRaises(ValueError):
+            SimulationConfig().getSetting("NOT_A_SETTING")
+
+    def testRejectsValueOfWrongType(self):
+        self.assertInvalid("URBAN_AREA", URBAN_AREA="large")
+
+    def testRejectsEmptyPopulation(self):
+        self.assertInvalid("must not both be 0", URBAN_POPULATION=0, SURROUNDING_POPULATION=0)
+
+    def testRejectsNegativeRecoveryTime(self):
+        self.assertInvalid("RECOVERY_TIME", RECOVERY_TIME=-1)
+
+    def testRejectsRatesAddingUpToMoreThanOne(self):
+        self.assertInvalid("DEATH_RATE and RECOVERY_RATE", DEATH_RATE=0.5, RECOVERY_RATE=0.6)
+        SimulationConfig().withSettings(DEATH_RATE=0.3, RECOVERY_RATE=0.7)
+
+    def testRejectsOutOfRangeSettings(self):
+        self.assertInvalid("URBAN_AREA", URBAN_AREA=0)
+        self.assertInvalid("SPREAD_BOUNDARY", SPREAD_BOUNDARY=4)
+        self.assertInvalid("MIN_INCUBATION_PERIOD", MIN_INCUBATION_PERIOD=20, MAX_INCUBATION_PERIOD=10)
+        self.assertInvalid("PROFILE", PROFILE=3)
+
+    def testReportsEveryProblem(self):
+        with self.assertRaises(ValueError) as raised:
+            SimulationConfig().withSettings(RECOVERY_TIME=-1, SIMULATION_ENGINE=5)
+        self.assertIn("RECOVERY_TIME", str(raised.exception))
+        self.assertIn("SIMULATION_ENGINE", str(raised.exception))
+
+    def testRejectsMalformedLine(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "settings.csv")
+            with open(path, "w") as settingsFile:
+                settingsFile.write("# comment\nURBAN_AREA=100=200\n")
+            with self.assertRaises(ValueError):
+                SimulationConfig.fromFile(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
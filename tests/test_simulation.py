@@ -0,0 +1,18 @@
+import unittest
+from tests.helpers import *
+
+
+class CalcNewInfectionsTest(unittest.TestCase):
+    def testMasksInAnEmptyCell(self):
+        config = makeSmallConfig()
+        simulation = createSimulation(config, scenario=Scenario(cells=[(10, 10, 0.05)]), seed=1)
+        simulation.growthFactors = [2.0]
+        cell = Cell(0, 0, 0.5)
+        cell.amountOfMasksType1 = 100
+        self.assertEqual(simulation.calcNewInfections(cell, 0, 0), 0)
+        cell.population = 1000
+        self.assertEqual(simulation.calcNewInfections(cell, 0, 0), int(1000 - 1000 * 0.1 * config.maskFactors[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
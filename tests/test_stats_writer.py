@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from Data.StatsWriter import *
+
+HEADER = ["Day", "Total Infection Cases", "Percentage Currently Infected"]
+ROWS = [[0, 10, 0.5], [1, 14, 0.75], [2, 21, 1.25], [3, 30, 1.5], [4, 41, 2.0]]
+
+
+class StatsWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def makePath(self, dataFormat):
+        return os.path.join(self.directory.name, "data" + DATA_FILE_EXTENSIONS[dataFormat])
+
+    def testRoundTrip(self):
+        for dataFormat in STATS_WRITERS:
+            with self.subTest(dataFormat=dataFormat):
+                path = self.makePath(dataFormat)
+                with makeStatsWriter(path, HEADER, dataFormat, flushDays=2) as writer:
+                    for row in ROWS:
+                        writer.write(row)
+                self.assertEqual(readStats(path, dataFormat), ROWS)
+
+    def testResumesInTheMiddleOfTheFile(self):
+        for dataFormat in STATS_WRITERS:
+            with self.subTest(dataFormat=dataFormat):
+                path = self.makePath(dataFormat)
+                with makeStatsWriter(path, HEADER, dataFormat) as writer:
+                    for row in ROWS[:3]:
+                        writer.write(row)
+                    position = writer.position()
+                    # Rows written after the checkpoint, which the resumed run writes again
+                    writer.write([3, 99, 9.5])
+                with makeStatsWriter(path, HEADER, dataFormat, resumeFrom=position) as writer:
+                    for row in ROWS[3:]:
+                        writer.write(row)
+                self.assertEqual(readStats(path, dataFormat), ROWS)
+
+    def testResumedNpyFileLoadsWithNumpy(self):
+        path = self.makePath(FORMAT_BINARY)
+        with makeStatsWriter(path, HEADER, FORMAT_BINARY) as writer:
+            for row in ROWS[:2]:
+                writer.write(row)
+            position = writer.position()
+            writer.write([2, 99, 9.5])
+        with makeStatsWriter(path, HEADER, FORMAT_BINARY, resumeFrom=position) as writer:
+            for row in ROWS[2:]:
+                writer.write(row)
+        records = np.load(path)
+        self.assertEqual(records.shape, (len(ROWS),))
+        np.testing.assert_array_equal(records["Total Infection Cases"], [row[1] for row in ROWS])
+        np.testing.assert_array_equal(records["Percentage Currently Infected"], [row[2] for row in ROWS])
+
+    def testDoesNotResumeAnotherFile(self):
+        for dataFormat in STATS_WRITERS:
+            with self.subTest(dataFormat=dataFormat):
+                path = self.makePath(dataFormat)
+                with makeStatsWriter(path, HEADER, dataFormat) as writer:
+                    for row in ROWS[:3]:
+                        writer.write(row)
+                    position = writer.position()
+                with makeStatsWriter(path, HEADER, dataFormat) as writer:
+                    for row in ROWS[2:]:
+                        writer.write(row)
+                with open(path, "rb") as dataFile:
+                    contents = dataFile.read()
+                with self.assertRaises(ValueError):
+                    makeStatsWriter(path, HEADER, dataFormat, resumeFrom=position)
+                with open(path, "rb") as dataFile:
+                    self.assertEqual(dataFile.read(), contents)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import csv
+import os
+import tempfile
+import unittest
+import HeadlessSimulation
+from Data.CommandLine import *
+from tests.test_settings import SETTINGS_FILE
+
+
+class SweepTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.scenarioFile = self.writeFile("scenario.csv", "RANDOM=3,0.05\n")
+
+    def writeFile(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as textFile:
+            textFile.write(text)
+        return path
+
+    def runSweep(self, sweepText, *arguments):
+        """
+        :return: tuple(int, list(dict)) = exit code of HeadlessSimulation and the rows of summary.csv.
+        """
+        outputDir = os.path.join(self.directory.name, "sweep")
+        argv = ["--settings", SETTINGS_FILE, "--scenario", self.scenarioFile, "--seed", "1",
+                "--sweep", self.writeFile("sweep.csv", sweepText), "--output-dir", outputDir, "--workers", "2",
+                "--set", "URBAN_AREA=100", "--set", "SURROUNDING_AREA=300", "--set", "VERBOSITY=0"]
+        exitCode = HeadlessSimulation.main(argv + list(arguments))
+        summaryPath = os.path.join(outputDir, "summary.csv")
+        if not os.path.exists(summaryPath):
+            return exitCode, []
+        with open(summaryPath, "r", newline="") as summaryFile:
+            return exitCode, list(csv.DictReader(summaryFile))
+
+    def testFinishedSweep(self):
+        exitCode, rows = self.runSweep("SPREAD_RATE=2.5,4\n", "--days", "3")
+        self.assertEqual(exitCode, EXIT_OK)
+        self.assertEqual([(row["Run"], row["SPREAD_RATE"], row["Status"]) for row in rows],
+                         [("0", "2.5", "finished"), ("1", "4", "finished")])
+
+    def testTimedOutRunOnlyStopsItself(self):
+        exitCode, rows = self.runSweep("SIMULATION_RUN_TIME=2,100000\n", "--timeout", "0.5")
+        self.assertEqual(exitCode, EXIT_FAILED)
+        self.assertEqual([row["Status"] for row in rows], ["finished", "timed out"])
+        self.assertEqual(rows[0]["Error"], "")
+        self.assertIn("stopped after 0.5 seconds", rows[1]["Error"])
+        self.assertEqual(rows[1]["Total Dead"], "")
+
+    def testBadOverrideOnlyFailsItsRun(self):
+        exitCode, rows = self.runSweep("SPREAD_RATE=2.5,-1\n", "--days", "3")
+        self.assertEqual(exitCode, EXIT_FAILED)
+        self.assertEqual([row["Status"] for row in rows], ["finished", "failed"])
+        self.assertIn("SPREAD_RATE", rows[1]["Error"])
+        self.assertNotEqual(rows[0]["Total Infection Cases"], "")
+
+    def testUnknownSettingIsBadInput(self):
+        exitCode, rows = self.runSweep("NOT_A_SETTING=1,2\n", "--days", "3")
+        self.assertEqual(exitCode, EXIT_BAD_INPUT)
+        self.assertEqual(rows, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+from Data.TiledSimulation import *
+from tests.helpers import *
+
+# Seeds along the top and bottom rows, so infections cross the edges of the field and, with a periodic boundary,
+# wrap around into the halo rows of the first and last tile
+SCENARIO = Scenario(cells=[(10, 10, 0.05)], randomCells=[(3, 0.05)],
+                    regions=[(0, 0, 1, 19, 0.02), (0, 0, 19, 0, 0.02), (5, 19, 14, 19, 0.03)])
+
+
+def runTiles(tiles, spreadBoundary, days=8):
+    config = makeSmallConfig(SIMULATION_ENGINE=2, TILES=tiles, COMPILED_KERNELS=0, SPREAD_BOUNDARY=spreadBoundary)
+    simulation, rows = runDays(config, SCENARIO, 11, days)
+    simulation.closeTiles()
+    return rows, np.copy(simulation.state.infectedPop)
+
+
+class SplitRowsTest(unittest.TestCase):
+    def testCoversEveryRowOnce(self):
+        for simSizeY, tiles in ((20, 3), (7, 7), (5, 9)):
+            bands = splitRows(simSizeY, tiles)
+            rows = [row for first, last in bands for row in range(first, last + 1)]
+            self.assertEqual(rows, list(range(simSizeY)))
+            self.assertEqual(len(bands), min(tiles, simSizeY))
+
+
+class TiledSimulationTest(unittest.TestCase):
+    def testResultsDoNotDependOnTheAmountOfTiles(self):
+        for spreadBoundary in (0, 1, 2, 3):
+            rows, infectedPop = runTiles(1, spreadBoundary)
+            self.assertGreater(rows[-1][2], rows[0][2])
+            for tiles in (2, 3, 20):
+                with self.subTest(spreadBoundary=spreadBoundary, tiles=tiles):
+                    tiledRows, tiledInfectedPop = runTiles(tiles, spreadBoundary)
+                    self.assertEqual(tiledRows, rows)
+                    np.testing.assert_array_equal(tiledInfectedPop, infectedPop)
+
+    def testPeriodicBoundaryWrapsAcrossTiles(self):
+        rows = runTiles(3, 3)[0]
+        absorbingRows = runTiles(3, 1)[0]
+        # Infections spread over the top edge come in on the bottom row instead of being lost
+        self.assertGreater(rows[-1][2], absorbingRows[-1][2])
+
+
+if __name__ == "__main__":
+    unittest.main()